@@ -0,0 +1,83 @@
+import math
+from typing import Dict, Iterator, Optional, Tuple
+
+
+SCORE_LEVELS = (1, 2, 3, 4, 5)
+
+
+def iter_leaves(scores: Dict, prefix: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], int]]:
+    """(path, score) for every leaf of a nested scores dict."""
+    for key, value in scores.items():
+        if isinstance(value, dict):
+            yield from iter_leaves(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+class ItemStats:
+    """count, sum, sum of squares and a 1-5 histogram for one schema item."""
+
+    __slots__ = ("count", "total", "total_sq", "histogram")
+
+    def __init__(self, count: int = 0, total: float = 0, total_sq: float = 0, histogram=None):
+        self.count = count
+        self.total = total
+        self.total_sq = total_sq
+        self.histogram = list(histogram) if histogram is not None else [0] * len(SCORE_LEVELS)
+
+    def add(self, score, sign: int = 1):
+        """Add one score, or remove it again with sign=-1."""
+        self.count += sign
+        self.total += sign * score
+        self.total_sq += sign * score * score
+        if score in SCORE_LEVELS:
+            self.histogram[score - 1] += sign
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return max(self.total_sq / self.count - mean * mean, 0.0)
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def __repr__(self):
+        return (f"ItemStats(count={self.count}, total={self.total}, total_sq={self.total_sq}, "
+                f"histogram={self.histogram})")
+
+
+class ScoreAggregates:
+    """Running per-subject, per-item statistics maintained on every score write.
+
+    "history" covers every round ever recorded; "current" covers only each
+    student's latest round, so adding a round first removes the student's
+    previous latest from it. Both updates are O(items).
+    """
+
+    SCOPES = ("history", "current")
+
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, Dict[Tuple[str, ...], ItemStats]]] = {scope: {} for scope in self.SCOPES}
+
+    def add_round(self, subject: str, scores: Dict, replaced_latest: Optional[Dict] = None):
+        history = self.stats["history"].setdefault(subject, {})
+        current = self.stats["current"].setdefault(subject, {})
+        for path, score in iter_leaves(scores):
+            history.setdefault(path, ItemStats()).add(score)
+            current.setdefault(path, ItemStats()).add(score)
+        if replaced_latest:
+            for path, score in iter_leaves(replaced_latest):
+                current.setdefault(path, ItemStats()).add(score, sign=-1)
+
+    def get(self, subject: str, scope: str = "current") -> Dict[Tuple[str, ...], ItemStats]:
+        if scope not in self.SCOPES:
+            raise ValueError(f"Unknown aggregate scope: {scope}")
+        return self.stats[scope].get(subject, {})
@@ -3,9 +3,19 @@ import pandas as pd
 import json
 import os
 import plotly.graph_objects as go
-from typing import Dict, Optional
 import requests  # 用于 HTTP 请求
-from llm_hub import deepseek_chat
+from itertools import islice
+from typing import Optional
+from batch_reports import BatchReportJob
+from bulk_import import bulk_import, scores_template
+from class_stats import get_class_overview
+from feedback import FeedbackGenerator, estimate_tokens
+from feedback_cache import FeedbackCache
+from llm_hub import MAX_PROMPT_TOKENS, PROVIDERS, default_router
+from radar_charts import RadarFigureCache
+from report_store import ReportStore
+from student_db import get_shared_database
+from sqlite_db import SQLiteStudentDatabase
 
 # Load EVALUATION_SCHEMA
 if os.path.exists("EVALUATION_SCHEMA.json"):
@@ -105,146 +115,89 @@ else:
     with open("PROMPT_TEMPLATES.json", "w", encoding="utf-8") as f:
         json.dump(PROMPT_TEMPLATES, f, ensure_ascii=False, indent=2)
 
-# Universal chat function
-
-
-# StudentDatabase class (unchanged except for minor optimizations)
-class StudentDatabase:
-    def __init__(self, csv_file: str = "students.csv", json_file: str = "scores.json"):
-        self.csv_file = csv_file
-        self.json_file = json_file
-        self.students = {}
-        self.load_students()
-        self.load_scores()
-
-    def load_students(self):
-        if os.path.exists(self.csv_file):
-            df = pd.read_csv(self.csv_file)
-            for _, row in df.iterrows():
-                self.students[str(row["student_id"])] = {
-                    "name": row["name"],
-                    "scores": {}
-                }
-        else:
-            default_students = [
-                {"student_id": "001", "name": "张伟"},
-                {"student_id": "002", "name": "李娜"},
-                {"student_id": "003", "name": "王芳"},
-                {"student_id": "004", "name": "刘洋"},
-                {"student_id": "005", "name": "陈晨"},
-                {"student_id": "006", "name": "杨磊"},
-                {"student_id": "007", "name": "赵静"},
-                {"student_id": "008", "name": "周浩"}
-            ]
-            self.students = {s["student_id"]: {"name": s["name"], "scores": {}} for s in default_students}
-            self.save_students()
-
-    def save_students(self):
-        df = pd.DataFrame([
-            {"student_id": sid, "name": info["name"]}
-            for sid, info in self.students.items()
-        ])
-        df.to_csv(self.csv_file, index=False, encoding="utf-8")
-
-    def load_scores(self):
-        if os.path.exists(self.json_file):
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                scores_data = json.load(f)
-                for student_id, subjects in scores_data.items():
-                    if student_id in self.students:
-                        self.students[student_id]["scores"] = subjects
-
-    def save_scores(self):
-        scores_data = {sid: info["scores"] for sid, info in self.students.items()}
-        with open(self.json_file, "w", encoding="utf-8") as f:
-            json.dump(scores_data, f, ensure_ascii=False, indent=2)
-
-    def add_student(self, student_id: str, name: str):
-        if student_id not in self.students:
-            self.students[student_id] = {"name": name, "scores": {}}
-            self.save_students()
-
-    def update_scores(self, student_id: str, subject: str, scores: Dict):
-        if student_id not in self.students:
-            raise ValueError(f"Student {student_id} does not exist")
-        if subject not in self.students[student_id]["scores"]:
-            self.students[student_id]["scores"][subject] = []
-        self.students[student_id]["scores"][subject].append(scores)
-        self.save_scores()
-
-    def get_latest_scores(self, student_id: str, subject: str) -> Optional[Dict]:
-        if (student_id in self.students and
-                subject in self.students[student_id]["scores"] and
-                self.students[student_id]["scores"][subject]):
-            return self.students[student_id]["scores"][subject][-1]
-        return None
-
-    def get_previous_scores(self, student_id: str, subject: str) -> Optional[Dict]:
-        if (student_id in self.students and
-                subject in self.students[student_id]["scores"] and
-                len(self.students[student_id]["scores"][subject]) > 1):
-            return self.students[student_id]["scores"][subject][-2]
-        return None
-
-# FeedbackGenerator class (updated to use provider and api_key)
-class FeedbackGenerator:
-    def __init__(self, schema: Dict, prompt_templates: Dict):
-        self.schema = schema
-        self.prompt_templates = prompt_templates
-
-    def format_score_details(self, subject: str, scores: Dict, previous_scores: Optional[Dict]) -> str:
-        details = []
-        for category, subcategories in self.schema[subject].items():
-            details.append(f"{category}：")
-            if isinstance(subcategories, dict):
-                for subcategory, items in subcategories.items():
-                    for item in items:
-                        current_score = scores.get(category, {}).get(subcategory, {}).get(item, 3)
-                        prev_score = (previous_scores.get(category, {}).get(subcategory, {}).get(item, None)
-                                     if previous_scores else None)
-                        line = f"- {item}：{current_score}/5"
-                        if prev_score is not None:
-                            change = "进步" if current_score > prev_score else "下降" if current_score < prev_score else "持平"
-                            line += f"（与上次相比：{change}）"
-                        details.append(line)
-            elif isinstance(subcategories, list):
-                for item in subcategories:
-                    current_score = scores.get(category, {}).get(item, 3)
-                    prev_score = (previous_scores.get(category, {}).get(item, None)
-                                 if previous_scores else None)
-                    line = f"- {item}：{current_score}/5"
-                    if prev_score is not None:
-                        change = "进步" if current_score > prev_score else "下降" if current_score < prev_score else "持平"
-                        line += f"（与上次相比：{change}）"
-                    details.append(line)
-        return "\n".join(details)
-
-    def generate_feedback(self, student_id: str, subject: str, scores: Dict, db: StudentDatabase, provider: str, api_key: str) -> str:
-        previous_scores = db.get_previous_scores(student_id, subject)
-        score_details = self.format_score_details(subject, scores, previous_scores)
-        prompt = self.prompt_templates[subject].format(score_details=score_details)
-        feedback = deepseek_chat(user_prompt=prompt, model=provider, api_key=api_key)
-        return feedback
-
 # Streamlit App
 st.set_page_config(page_title="学生评价系统", layout="wide")
 
 # Sidebar
 st.sidebar.title("配置")
 # LLM 提供商选择
-provider = st.sidebar.selectbox("选择 LLM 提供商", ["DeepSeek", "OpenAI", "智谱"], index=0)
+provider = st.sidebar.selectbox("选择 LLM 提供商", list(PROVIDERS), index=0)
 # API 密钥输入
 api_key = st.sidebar.text_input("输入 API 密钥", type="password", key="api_key_input")
+# 自动路由：按实时延迟选择最快的可用提供商，失败时切换（其他提供商的密钥读取环境变量）
+auto_route = st.sidebar.checkbox("自动选择最快的提供商并在失败时切换", value=True, key="auto_route")
+# 对冲：请求超过 p95 应答时间仍未返回时补发一份，先返回者胜出（补发次数受预算限制）
+hedge = st.sidebar.checkbox("慢请求对冲（超过 p95 延迟时补发）", value=False, key="hedge")
+# 紧凑提示词：按分数分组列出项目，只标注有变化的项目，减少输入 token
+compact = st.sidebar.checkbox("紧凑提示词（按分数分组，省略未变化项）", value=False, key="compact_prompt")
+has_api_key = bool(api_key) or any(
+    p.resolve_api_key() for name, p in PROVIDERS.items() if auto_route or name == provider)
 
 st.sidebar.title("学科选择")
 subject = st.sidebar.selectbox("选择学科", list(EVALUATION_SCHEMA.keys()), index=0)
 
-# Initialize database and feedback generator
-db = StudentDatabase()
-generator = FeedbackGenerator(EVALUATION_SCHEMA, PROMPT_TEMPLATES)
+# Initialize database and feedback generator (shared across reruns and sessions)
+@st.cache_resource
+def get_sqlite_database() -> SQLiteStudentDatabase:
+    return SQLiteStudentDatabase()
+
+
+@st.cache_resource
+def get_radar_cache() -> RadarFigureCache:
+    return RadarFigureCache()
+
+
+@st.cache_resource
+def get_report_store() -> ReportStore:
+    return ReportStore()
+
+
+@st.cache_resource
+def get_feedback_generator() -> FeedbackGenerator:
+    return FeedbackGenerator(EVALUATION_SCHEMA, PROMPT_TEMPLATES, cache=FeedbackCache(),
+                             max_prompt_tokens=MAX_PROMPT_TOKENS)
+
+
+if os.environ.get("STUDENT_DB_BACKEND") == "sqlite":
+    db = get_sqlite_database()
+else:
+    db = get_shared_database(storage="log", snapshot_format=os.environ.get("STUDENT_DB_SNAPSHOT", "json"))
+generator = get_feedback_generator()
+radar_cache = get_radar_cache()
+report_store = get_report_store()
+schema_table = generator.compiled
+
+STUDENT_OPTION_LIMIT = 50
+ROSTER_PAGE_SIZES = [20, 50, 100]
+
+
+def select_student(key: str) -> Optional[str]:
+    """Search box plus a selectbox keyed by student_id; returns the selected id, or None if nothing matches."""
+    query = st.text_input("搜索学生（姓名、拼音、首字母或学号）", key=f"{key}_query")
+    if query:
+        options = db.search_students(query, limit=STUDENT_OPTION_LIMIT)
+    else:
+        options = list(islice(db.students, STUDENT_OPTION_LIMIT))
+    if not options:
+        if db.students:
+            st.info("没有匹配的学生。")
+        return None
+    return st.selectbox("选择学生", options, key=key,
+                        format_func=lambda sid: f"{db.students[sid]['name']}（{sid}）")
+
+cache_stats = generator.cache.stats()
+st.sidebar.caption(f"报告缓存：命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}，共 {cache_stats['entries']} 条")
+for provider_stats in default_router.stats():
+    if provider_stats["requests"]:
+        latency = provider_stats["latency"]
+        st.sidebar.caption(
+            f"{provider_stats['name']}：延迟 {'--' if latency is None else f'{latency:.1f} 秒'}，"
+            f"错误率 {provider_stats['error_rate']:.0%}{'' if provider_stats['healthy'] else '（熔断中）'}")
+if default_router.hedges:
+    st.sidebar.caption(f"对冲请求：{default_router.hedges} 次，其中 {default_router.hedge_wins} 次先于原请求返回")
 
 # Multi-page navigation
-page = st.sidebar.radio("导航", ["介绍", "学生信息", "学生能力展示", "问卷填写", "报告生成"])
+page = st.sidebar.radio("导航", ["介绍", "学生信息", "学生能力展示", "班级概览", "问卷填写", "报告生成"])
 
 if page == "介绍":
     st.title("学生评价系统介绍")
@@ -275,156 +228,258 @@ if page == "介绍":
 elif page == "学生信息":
     st.title("学生信息管理")
     st.subheader("学生名单")
+    filter_cols = st.columns([1, 2, 1, 1])
+    class_filter = filter_cols[0].selectbox("班级", ["全部"] + db.classes(), key="roster_class")
+    roster_query = filter_cols[1].text_input("搜索（姓名、拼音、首字母或学号）", key="roster_query")
+    page_size = filter_cols[2].selectbox("每页人数", ROSTER_PAGE_SIZES, key="roster_page_size")
+    pending_only = filter_cols[3].checkbox(f"仅显示{subject}待生成报告", key="roster_pending")
+    filters = dict(class_name=None if class_filter == "全部" else class_filter, query=roster_query or None,
+                   pending_subject=subject if pending_only else None)
+    total = db.list_students(0, 0, **filters).total
+    page_count = max(1, -(-total // page_size))
+    page_number = st.number_input("页码", min_value=1, max_value=page_count, value=1, step=1, key="roster_page")
+    roster_page = db.list_students((min(page_number, page_count) - 1) * page_size, page_size, **filters)
+    pending_ids = db.pending_student_ids(subject, roster_page.student_ids)
     students_df = pd.DataFrame([
-        {"student_id": sid, "name": info["name"]}
-        for sid, info in db.students.items()
-    ])
-    st.dataframe(students_df, use_container_width=False, width=600, height=400, hide_index=True)
+        {"学号": sid, "姓名": db.students[sid]["name"], "班级": db.students[sid].get("class", ""),
+         "待生成报告": sid in pending_ids}
+        for sid in roster_page.student_ids
+    ], columns=["学号", "姓名", "班级", "待生成报告"])
+    st.dataframe(students_df, use_container_width=False, width=600, hide_index=True)
+    st.caption(f"共 {total} 名学生，第 {min(page_number, page_count)} / {page_count} 页")
 
     st.subheader("添加新学生")
     with st.form("add_student_form"):
         new_id = st.text_input("学号")
         new_name = st.text_input("姓名")
+        new_class = st.text_input("班级（可选）")
         submit = st.form_submit_button("添加")
         if submit and new_id and new_name:
-            db.add_student(new_id, new_name)
+            db.add_student(new_id, new_name, new_class.strip())
             st.success(f"已添加学生 {new_name} (学号: {new_id})")
             st.rerun()
 
     st.subheader("编辑学生信息")
-    student_ids = list(db.students.keys())
-    if student_ids:
-        edit_id = st.selectbox("选择学生", student_ids, key="edit_student")
+    edit_id = select_student("edit_student")
+    if edit_id is not None:
         current_name = db.students[edit_id]["name"]
         with st.form("edit_student_form"):
             updated_name = st.text_input("姓名", value=current_name)
             submit_edit = st.form_submit_button("更新")
             if submit_edit and updated_name:
-                db.students[edit_id]["name"] = updated_name
-                db.save_students()
+                db.rename_student(edit_id, updated_name)
                 st.success(f"已更新学生 {edit_id} 的姓名为 {updated_name}")
                 st.rerun()
 
+    st.subheader("批量导入")
+    st.caption("名单文件需包含 student_id、name 两列（class 班级列可选）；成绩文件每行一次评价，每个评价项一列，分数为 1-5 的整数，导入后直接计入历史记录。")
+    st.download_button(f"下载{subject}成绩模板", scores_template(schema_table, subject).encode("utf-8-sig"),
+                       file_name=f"{subject}_成绩模板.csv", mime="text/csv")
+    with st.form("bulk_import_form"):
+        roster_file = st.file_uploader("学生名单 (CSV/Excel)", type=["csv", "xlsx", "xls"])
+        scores_file = st.file_uploader(f"{subject}成绩 (CSV/Excel)", type=["csv", "xlsx", "xls"])
+        submit_import = st.form_submit_button("导入")
+    if submit_import and (roster_file or scores_file):
+        try:
+            report = bulk_import(db, schema_table, roster=roster_file, scores=scores_file, subject=subject)
+        except ImportError:
+            st.error("读取 Excel 文件需要安装 openpyxl，或将文件另存为 CSV 后导入。")
+        else:
+            if report.errors:
+                st.error(f"发现 {len(report.errors)} 处错误，未导入任何数据。")
+                st.dataframe(pd.DataFrame(report.errors[:200], columns=["文件", "行号", "错误"]), hide_index=True)
+            else:
+                st.success(f"已导入 {report.students} 名学生、{report.rounds} 条评价，"
+                           f"共 {report.rows} 行，用时 {report.elapsed:.2f} 秒（{report.rows_per_sec:,.0f} 行/秒）")
+
 elif page == "学生能力展示":
     st.title("学生能力展示")
-    student_names = [info["name"] for info in db.students.values()]
-    if student_names:
-        selected_name = st.selectbox("选择学生", student_names)
-        selected_id = next(sid for sid, info in db.students.items() if info["name"] == selected_name)
-        scores = db.get_latest_scores(selected_id, subject)
-        
-        if scores:
-            for category, subcategories in EVALUATION_SCHEMA[subject].items():
+    selected_id = select_student("show_student")
+    if selected_id is not None:
+        overlay = st.checkbox("叠加上一轮与班级平均", key="radar_overlay")
+        figures = radar_cache.figures(db, schema_table, selected_id, subject, overlay=overlay)
+        if figures:
+            for category, spec in figures:
                 st.subheader(category)
-                labels = []
-                values = []
-                if isinstance(subcategories, dict):
-                    for subcategory, items in subcategories.items():
-                        for item in items:
-                            labels.append(f"{subcategory}-{item}")
-                            values.append(scores.get(category, {}).get(subcategory, {}).get(item, 3))
-                elif isinstance(subcategories, list):
-                    for item in subcategories:
-                        labels.append(item)
-                        values.append(scores.get(category, {}).get(item, 3))
-                
-                fig = go.Figure(data=go.Scatterpolar(
-                    r=values + [values[0]],
-                    theta=labels + [labels[0]],
-                    fill='toself'
-                ))
-                fig.update_layout(
-                    polar=dict(radialaxis=dict(visible=True, range=[0, 5])),
-                    showlegend=False,
-                    title=f"{selected_name} 的{category}表现"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(json.loads(spec), use_container_width=True)
         else:
             st.warning("该学生暂无评价数据。")
-    else:
+    elif not db.students:
         st.warning("暂无学生数据。")
 
+elif page == "班级概览":
+    st.title("班级概览")
+    overview = get_class_overview(db, schema_table, subject)
+    if overview.student_ids:
+        schema_items = schema_table.items(subject)
+        labels = [entry.label for entry in schema_items]
+        names = [db.students[sid]["name"] for sid in overview.student_ids]
+
+        st.subheader("各项得分热力图（最近一轮）")
+        heatmap = go.Figure(data=go.Heatmap(
+            z=overview.latest,
+            x=labels,
+            y=names,
+            zmin=1,
+            zmax=5,
+            colorscale="RdYlGn"
+        ))
+        heatmap.update_layout(height=max(300, 28 * len(names)), yaxis=dict(autorange="reversed"))
+        st.plotly_chart(heatmap, use_container_width=True)
+
+        st.subheader("班级平均 / 中位数")
+        for category, start, stop in schema_table.category_ranges(subject):
+            category_labels = labels[start:stop]
+            fig = go.Figure()
+            for trace_name, values in (("平均分", overview.mean[start:stop]), ("中位数", overview.median[start:stop])):
+                values = [round(float(v), 2) for v in values]
+                fig.add_trace(go.Scatterpolar(
+                    r=values + [values[0]],
+                    theta=category_labels + [category_labels[0]],
+                    fill='toself',
+                    name=trace_name
+                ))
+            fig.update_layout(
+                polar=dict(radialaxis=dict(visible=True, range=[0, 5])),
+                title=f"班级{category}表现"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("进步 / 退步排行（与上一轮相比的平均变化）")
+        col_up, col_down = st.columns(2)
+        with col_up:
+            st.markdown("**进步最大**")
+            if overview.most_improved:
+                st.dataframe(pd.DataFrame(
+                    [{"姓名": db.students[sid]["name"], "平均变化": round(delta, 2)} for sid, delta in overview.most_improved]
+                ), hide_index=True)
+            else:
+                st.write("暂无")
+        with col_down:
+            st.markdown("**退步最大**")
+            if overview.most_declined:
+                st.dataframe(pd.DataFrame(
+                    [{"姓名": db.students[sid]["name"], "平均变化": round(delta, 2)} for sid, delta in overview.most_declined]
+                ), hide_index=True)
+            else:
+                st.write("暂无")
+    else:
+        st.warning("该学科暂无评价数据。")
+
 elif page == "问卷填写":
     st.title("学生评价问卷")
-    student_names = [info["name"] for info in db.students.values()]
-    if student_names:
-        selected_name = st.selectbox("选择学生", student_names, key="eval_student")
-        selected_id = next(sid for sid, info in db.students.items() if info["name"] == selected_name)
+    selected_id = select_student("eval_student")
+    if selected_id is not None:
+        selected_name = db.students[selected_id]["name"]
         
         st.subheader("评价维度")
-        scores = {}
+        values = []
         with st.form("evaluation_form"):
-            for category, subcategories in EVALUATION_SCHEMA[subject].items():
-                scores[category] = {}
-                st.markdown(f"**{category}**")
-                if isinstance(subcategories, dict):
-                    for subcategory, items in subcategories.items():
-                        st.markdown(f"*{subcategory}*")
-                        scores[category][subcategory] = {}
-                        for item in items:
-                            score = st.radio(
-                                f"{item}",
-                                [1, 2, 3, 4, 5],
-                                index=2,
-                                horizontal=True,
-                                key=f"{selected_id}_{category}_{subcategory}_{item}"
-                            )
-                            scores[category][subcategory][item] = score
-                elif isinstance(subcategories, list):
-                    for item in subcategories:
-                        score = st.radio(
-                            f"{item}",
-                            [1, 2, 3, 4, 5],
-                            index=2,
-                            horizontal=True,
-                            key=f"{selected_id}_{category}_{item}"
-                        )
-                        scores[category][item] = score
+            category = subcategory = None
+            for entry in schema_table.items(subject):
+                if entry.category != category:
+                    category, subcategory = entry.category, None
+                    st.markdown(f"**{category}**")
+                if entry.subcategory is not None and entry.subcategory != subcategory:
+                    subcategory = entry.subcategory
+                    st.markdown(f"*{subcategory}*")
+                score = st.radio(
+                    f"{entry.item}",
+                    [1, 2, 3, 4, 5],
+                    index=2,
+                    horizontal=True,
+                    key=f"{selected_id}_{'_'.join(entry.path)}"
+                )
+                values.append(score)
+            scores = schema_table.nest(subject, values)
             submit_scores = st.form_submit_button("提交评价")
             
             if submit_scores:
-                scores_new = {}
-                if os.path.exists("scores_new.json"):
-                    with open("scores_new.json", "r", encoding="utf-8") as f:
-                        scores_new = json.load(f)
-                if selected_id not in scores_new:
-                    scores_new[selected_id] = {}
-                if subject not in scores_new[selected_id]:
-                    scores_new[selected_id][subject] = []
-                scores_new[selected_id][subject].append(scores)
-                with open("scores_new.json", "w", encoding="utf-8") as f:
-                    json.dump(scores_new, f, ensure_ascii=False, indent=2)
+                db.enqueue_pending(selected_id, subject, scores)
                 st.success(f"已为 {selected_name} 保存评价数据！")
-    else:
+    elif not db.students:
         st.warning("暂无学生数据。")
 
 elif page == "报告生成":
     st.title("反馈报告生成")
-    student_names = [info["name"] for info in db.students.values()]
-    if student_names:
-        selected_name = st.selectbox("选择学生", student_names, key="report_student")
-        selected_id = next(sid for sid, info in db.students.items() if info["name"] == selected_name)
-        
-        scores_new = {}
-        if os.path.exists("scores_new.json"):
-            with open("scores_new.json", "r", encoding="utf-8") as f:
-                scores_new = json.load(f)
+    selected_id = select_student("report_student")
+    if selected_id is not None:
+        selected_name = db.students[selected_id]["name"]
         
-        if (selected_id in scores_new and
-                subject in scores_new[selected_id] and
-                scores_new[selected_id][subject]):
-            latest_scores = scores_new[selected_id][subject][-1]
+        latest_scores = db.get_pending(selected_id, subject)
+        if latest_scores is not None:
+            prompt_tokens = estimate_tokens(generator.build_prompt(selected_id, subject, latest_scores, db, compact))
+            st.caption(f"提示词约 {prompt_tokens} tokens（单次请求上限 {MAX_PROMPT_TOKENS}）")
             if st.button("生成反馈报告"):
-                if not api_key:
+                if not has_api_key:
                     st.error("请在侧边栏输入 API 密钥！")
                 else:
-                    feedback = generator.generate_feedback(selected_id, subject, latest_scores, db, provider, api_key)
                     st.markdown(f"**{selected_name} 的反馈报告**")
-                    st.write(feedback)
-                    
-                    db.update_scores(selected_id, subject, latest_scores)
-                    st.success("已更新学生评价数据到 scores.json")
+                    report_placeholder = st.empty()
+                    feedback = ""
+                    failed = False
+                    try:
+                        for chunk in generator.generate_feedback_stream(selected_id, subject, latest_scores, db, provider, api_key,
+                                                                        auto_route=auto_route, hedge=hedge,
+                                                                        compact=compact):
+                            feedback += chunk
+                            report_placeholder.markdown(feedback + "▌")
+                    except Exception as e:
+                        failed = True
+                        st.error(f"生成反馈报告失败：{e}")
+                    report_placeholder.markdown(feedback)
+
+                    # Only a complete, non-empty report moves the round it was written for into history
+                    if not failed and feedback.strip():
+                        round_number = db.history_length(selected_id, subject) + 1
+                        try:
+                            db.promote_pending(selected_id, subject, expected_scores=latest_scores)
+                        except ValueError:
+                            st.warning("生成期间该学生的问卷已被更新或已生成报告，本次报告未保存，请重新生成。")
+                        else:
+                            report_store.put(selected_id, subject, round_number, feedback)
+                            st.success("已更新学生评价数据")
         else:
             st.warning("该学生暂无最新评价数据，请先填写问卷。")
-    else:
-        st.warning("暂无学生数据。")
\ No newline at end of file
+
+        st.subheader("全班批量生成")
+        batch_size = st.number_input("每次请求合并的学生数", min_value=1, max_value=10, value=5,
+                                     help="多名学生共用一次请求以减少调用次数；解析失败的学生会自动单独重试")
+        batch_job = BatchReportJob(generator, db, subject, provider, api_key, auto_route=auto_route,
+                                   hedge=hedge, batch_size=int(batch_size), compact=compact,
+                                   report_store=report_store)
+        pending_count = len(batch_job.pending_students())
+        st.write(f"待生成报告的学生：{pending_count} 人（中断后再次点击将从上次进度继续）")
+        if st.button("为全班生成报告", disabled=pending_count == 0):
+            if not has_api_key:
+                st.error("请在侧边栏输入 API 密钥！")
+            else:
+                progress_bar = st.progress(0.0)
+                progress_text = st.empty()
+
+                def show_progress(progress):
+                    finished = progress.done + progress.failed + progress.skipped
+                    progress_bar.progress(finished / progress.total if progress.total else 1.0)
+                    eta = progress.eta_seconds
+                    progress_text.write(
+                        f"已完成 {progress.done} / {progress.total}，失败 {progress.failed}，跳过 {progress.skipped}，"
+                        f"速度 {progress.reports_per_min:.1f} 份/分钟，"
+                        f"预计剩余 {'--' if eta is None else f'{eta:.0f} 秒'}"
+                    )
+
+                result = batch_job.run(progress_callback=show_progress)
+                if result.aborted:
+                    st.warning("触发接口限流，任务已暂停，稍后再次点击即可继续。")
+                elif result.failed:
+                    st.warning(f"{result.failed} 名学生生成失败，可再次点击重试。")
+                else:
+                    st.success("全班报告已生成。")
+                if result.skipped:
+                    st.info(f"{result.skipped} 名学生在生成期间被其他会话更新或已生成报告，已跳过。")
+                # Only this run's reports; earlier ones are in the report store and the export
+                for sid, feedback in result.reports.items():
+                    if sid in db.students:
+                        with st.expander(f"{db.students[sid]['name']}（学号 {sid}）"):
+                            st.markdown(feedback)
+    elif not db.students:
+        st.warning("暂无学生数据。")
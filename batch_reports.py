@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+
+from report_store import ReportStore
+
+
+def scores_hash(scores: Dict) -> str:
+    return hashlib.sha256(json.dumps(scores, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_journal(journal_file: str = "reports.jsonl") -> Dict[tuple, str]:
+    """(student_id, subject, round, scores_hash) -> feedback for every report already generated.
+
+    round is the 1-based history position the report's round took when it was
+    promoted (None in records written before rounds were journaled).
+    """
+    journal = {}
+    if not os.path.exists(journal_file):
+        return journal
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # line torn by a crash mid-append; later records are still valid
+            key = (record["student_id"], record["subject"], record.get("round"), record["scores_hash"])
+            journal[key] = record["feedback"]
+    return journal
+
+
+class BatchProgress:
+    """Counters for a running batch job, with throughput and ETA derived from them.
+
+    reports holds student_id -> feedback for the rounds this run promoted.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0  # round promoted or re-submitted by another session while its report was generated
+        self.resumed = 0
+        self.aborted = False
+        self.reports: Dict[str, str] = {}
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def reports_per_min(self) -> float:
+        generated = self.done - self.resumed
+        return generated / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        remaining = self.total - self.done - self.failed - self.skipped
+        if remaining <= 0:
+            return 0.0
+        if self.reports_per_min <= 0:
+            return None
+        return remaining / self.reports_per_min * 60
+
+
+class BatchReportJob:
+    """Generate reports for every student with a pending evaluation in the database.
+
+    Each finished report is appended to journal_file before the pending round
+    is promoted into history, so rerunning the job after a crash or a
+    rate-limit abort skips finished students and promotes journaled ones
+    without calling the LLM again.
+    """
+
+    def __init__(self, generator, db, subject: str, provider: str, api_key: str,
+                 journal_file: str = "reports.jsonl", concurrency: int = 8, auto_route: bool = True,
+                 hedge: bool = False, batch_size: int = 1, compact: bool = False,
+                 report_store: Optional[ReportStore] = None):
+        self.generator = generator
+        self.db = db
+        self.subject = subject
+        self.provider = provider
+        self.api_key = api_key
+        self.journal_file = journal_file
+        self.concurrency = concurrency
+        self.auto_route = auto_route
+        self.hedge = hedge
+        self.batch_size = batch_size
+        self.compact = compact
+        self.report_store = report_store  # keeps every promoted round's report for export
+
+    def pending_students(self) -> Dict[str, Dict]:
+        """student_id -> latest pending round for this subject."""
+        return self.db.pending_students(self.subject)
+
+    def load_journal(self) -> Dict[tuple, str]:
+        return load_journal(self.journal_file)
+
+    def _journal(self, student_id: str, round_number: int, scores: Dict, feedback: str):
+        record = {
+            "student_id": student_id,
+            "subject": self.subject,
+            "round": round_number,
+            "scores_hash": scores_hash(scores),
+            "feedback": feedback,
+            "finished_at": time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(self.journal_file, "a+b") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line  # terminate a line torn by an earlier crash
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _promote(self, student_id: str, round_number: int, scores: Dict, feedback: str) -> bool:
+        """Promote the round the report was written for; False if another session got there first."""
+        try:
+            self.db.promote_pending(student_id, self.subject, expected_scores=scores)
+        except ValueError:
+            return False  # the journal keeps the report; a newer round stays pending for the next run
+        if self.report_store is not None:
+            self.report_store.put(student_id, self.subject, round_number, feedback)
+        return True
+
+    def run(self, progress_callback: Optional[Callable[[BatchProgress], None]] = None) -> BatchProgress:
+        pending = self.pending_students()
+        journal = self.load_journal()
+        progress = BatchProgress(len(pending))
+
+        # A pending round becomes history round len(history) + 1; keying the resume check on that
+        # position (not just the scores) keeps reports of earlier rounds with equal scores from matching
+        round_numbers = {sid: self.db.history_length(sid, self.subject) + 1 for sid in pending}
+        to_generate = {}
+        for student_id, scores in pending.items():
+            journaled = journal.get((student_id, self.subject, round_numbers[student_id], scores_hash(scores)))
+            if journaled is not None:
+                if self._promote(student_id, round_numbers[student_id], scores, journaled):
+                    progress.reports[student_id] = journaled
+                    progress.done += 1
+                    progress.resumed += 1
+                else:
+                    progress.skipped += 1
+            else:
+                to_generate[student_id] = scores
+        if progress_callback:
+            progress_callback(progress)
+
+        results = self.generator.generate_feedback_batch(
+            list(to_generate), self.subject, self.db, self.provider, self.api_key,
+            scores_by_student=to_generate, concurrency=self.concurrency, auto_route=self.auto_route,
+            hedge=self.hedge, batch_size=self.batch_size, compact=self.compact)
+        try:
+            for result in results:
+                if result.error is None:
+                    self._journal(result.student_id, round_numbers[result.student_id],
+                                  to_generate[result.student_id], result.feedback)
+                    if self._promote(result.student_id, round_numbers[result.student_id],
+                                     to_generate[result.student_id], result.feedback):
+                        progress.reports[result.student_id] = result.feedback
+                        progress.done += 1
+                    else:
+                        progress.skipped += 1
+                else:
+                    progress.failed += 1
+                    response = getattr(result.error, "response", None)
+                    if isinstance(result.error, requests.exceptions.HTTPError) and response is not None \
+                            and response.status_code == 429:
+                        # Retries are exhausted; stop here and let the next run resume
+                        progress.aborted = True
+                if progress_callback:
+                    progress_callback(progress)
+                if progress.aborted:
+                    break
+        finally:
+            results.close()
+        return progress
@@ -0,0 +1,162 @@
+"""A/B of the verbose and compact prompt encodings.
+
+Offline (always): prompt size in characters and estimated tokens for single
+and batched prompts. It also checks that both encodings carry exactly the same
+information: every item's score and its change since the last round are
+decoded back out of each rendering and compared.
+
+Live (--live N, needs an API key for --provider in the environment): N
+students are reported with each encoding. The harness compares latency,
+report length and the report structure, i.e. the bold headings and "- 项目："
+bullets the template asks for.
+
+Run from the repository root:
+    python -m benchmarks.ab_prompt_compaction --students 200
+    python -m benchmarks.ab_prompt_compaction --live 5 --provider DeepSeek
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feedback import COMPACT_LEGEND, FeedbackGenerator, estimate_tokens  # noqa: E402
+from llm_hub import PROVIDERS  # noqa: E402
+
+VERBOSE_LINE = re.compile(r"^- (.+?)：(\d+)/5(?:（与上次相比：(进步|下降|持平)）)?$")
+COMPACT_BAND = re.compile(r"^(\d+)分 (.+)$")
+MARKS = {"↑": "进步", "↓": "下降"}
+SECTION_LINE = re.compile(r"^\s*(?:\*\*(.+?)\*\*|- ([^：:]+)[：:])")
+
+
+def decode_verbose(details: str) -> dict:
+    decoded = {}
+    category = None
+    for line in details.splitlines():
+        match = VERBOSE_LINE.match(line)
+        if match:
+            decoded[(category, match.group(1))] = (int(match.group(2)), match.group(3))
+        else:
+            category = line.rstrip("：")
+    return decoded
+
+
+def decode_compact(details: str) -> dict:
+    lines = details.splitlines()
+    has_previous = bool(lines) and lines[0] == COMPACT_LEGEND
+    decoded = {}
+    for line in lines[1:] if has_previous else lines:
+        category, _, bands = line.partition("：")
+        for band in bands.split("；"):
+            score, names = COMPACT_BAND.match(band).groups()
+            for name in names.split("、"):
+                mark = MARKS.get(name[-1])
+                item = name[:-1] if mark else name
+                decoded[(category, item)] = (int(score), mark or ("持平" if has_previous else None))
+    return decoded
+
+
+def report_sections(text: str) -> set:
+    """Bold headings and bullet labels of a report (or of the template's format block)."""
+    sections = set()
+    for line in text.splitlines():
+        match = SECTION_LINE.match(line)
+        if match and (match.group(1) or match.group(2)).strip() not in ("...", ""):
+            sections.add((match.group(1) or match.group(2)).strip())
+    return sections
+
+
+def random_round(generator: FeedbackGenerator, subject: str, rng: random.Random, base=None):
+    n_items = len(generator.compiled.items(subject))
+    if base is None:
+        values = [rng.randint(1, 5) for _ in range(n_items)]
+    else:
+        # Most items stay put between rounds, a few move by one
+        values = [min(5, max(1, v + rng.choice((-1, 1)))) if rng.random() < 0.25 else v
+                  for v in generator.compiled.values(subject, base, 3)]
+    return generator.compiled.nest(subject, values)
+
+
+def offline(generator: FeedbackGenerator, subject: str, n_students: int, batch_size: int, seed: int):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n_students):
+        previous = random_round(generator, subject, rng) if i % 2 else None
+        records.append((random_round(generator, subject, rng, previous), previous))
+
+    print(f"{subject}: {n_students} students, half with a previous round")
+    sizes = {}
+    for compact in (False, True):
+        details = [generator.format_score_details(subject, scores, previous, compact) for scores, previous in records]
+        prompts = [generator.template(subject, compact).format(score_details=text) for text in details]
+        batches = [generator.build_batch_prompt(subject, {f"S{j}": details[j] for j in range(i, i + batch_size)},
+                                                compact)
+                   for i in range(0, n_students - batch_size + 1, batch_size)]
+        sizes[compact] = (statistics.mean(map(estimate_tokens, prompts)),
+                          statistics.mean(map(estimate_tokens, batches)) if batches else 0.0)
+        print(f"  {'compact' if compact else 'verbose':<8} single prompt {statistics.mean(map(len, prompts)):7.0f} chars"
+              f"  ~{sizes[compact][0]:6.0f} tokens   batch of {batch_size} ~{sizes[compact][1]:7.0f} tokens")
+    saved = f"  estimated input tokens saved: {1 - sizes[True][0] / sizes[False][0]:.0%} single"
+    if sizes[False][1]:
+        saved += f", {1 - sizes[True][1] / sizes[False][1]:.0%} batched"
+    print(saved)
+
+    mismatches = 0
+    for scores, previous in records:
+        verbose = decode_verbose(generator.format_score_details(subject, scores, previous))
+        compact = decode_compact(generator.format_score_details(subject, scores, previous, compact=True))
+        if verbose != compact:
+            mismatches += 1
+    print(f"  same scores and changes in both encodings: {n_students - mismatches}/{n_students} students")
+    return records
+
+
+def live(generator: FeedbackGenerator, subject: str, records, provider: str):
+    expected = report_sections(generator.prompt_templates[subject].split("{score_details}")[-1])
+    print(f"live A/B on {provider}, {len(records)} students, expected sections: {sorted(expected)}")
+    for compact in (False, True):
+        latencies, lengths, coverage = [], [], []
+        for scores, previous in records:
+            details = generator.format_score_details(subject, scores, previous, compact)
+            prompt = generator.template(subject, compact).format(score_details=details)
+            start = time.perf_counter()
+            report = generator.router.chat(prompt, preferred=provider, failover=False)
+            latencies.append(time.perf_counter() - start)
+            lengths.append(len(report))
+            coverage.append(len(expected & report_sections(report)) / len(expected))
+        print(f"  {'compact' if compact else 'verbose':<8} latency {statistics.mean(latencies):5.2f} s"
+              f"  report {statistics.mean(lengths):6.0f} chars  sections present {statistics.mean(coverage):.0%}"
+              f"  (worst {min(coverage):.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--subject", default="语文")
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--live", type=int, default=0, help="students to report with each encoding")
+    parser.add_argument("--provider", default="DeepSeek", choices=list(PROVIDERS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    with open(os.path.join(root, "PROMPT_TEMPLATES.json"), "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    generator = FeedbackGenerator(schema, templates)
+
+    records = offline(generator, args.subject, args.students, args.batch_size, args.seed)
+    if args.live:
+        if not PROVIDERS[args.provider].resolve_api_key():
+            sys.exit(f"--live needs {PROVIDERS[args.provider].env_api_key} in the environment")
+        live(generator, args.subject, records[:args.live], args.provider)
+
+
+if __name__ == "__main__":
+    main()
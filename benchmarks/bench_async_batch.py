@@ -0,0 +1,151 @@
+"""Whole-class reports: one student after another versus generate_feedback_batch.
+
+A local OpenAI-compatible mock answers every request after a random delay
+(most calls are quick, a few are slow), and records how many requests were in
+flight at once and how fast they arrived. With concurrency C the batch should
+take about the time of the slowest few calls rather than their sum and never
+have more than C requests in flight. The rate limiter allows a burst of
+`rate` requests on top of `rate` per second, so no one-second window should
+see more than twice the rate.
+
+The mock is reached through DEEPSEEK_API_URL, which llm_hub reads at import.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_batch --students 40 --concurrency 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def start_backend(fast: float, slow: float, slow_ratio: float, seed: int):
+    lock = threading.Lock()
+    stats = {}
+
+    def reset():
+        with lock:
+            stats.update(rng=random.Random(seed), requests=0, in_flight=0, peak=0, arrivals=[], latencies=[])
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                stats["peak"] = max(stats["peak"], stats["in_flight"])
+                stats["arrivals"].append(time.monotonic())
+                rng = stats["rng"]
+                delay = slow if rng.random() < slow_ratio else rng.uniform(fast / 2, fast * 1.5)
+                stats["latencies"].append(delay)
+            time.sleep(delay)
+            with lock:
+                stats["in_flight"] -= 1
+            body = json.dumps({"choices": [{"message": {"content": "该生近期表现稳定。"}}]},
+                              ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    reset()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/chat/completions", stats, reset
+
+
+def peak_rate(arrivals) -> int:
+    """Most requests that arrived within any one-second window."""
+    arrivals = sorted(arrivals)
+    start, best = 0, 0
+    for end, t in enumerate(arrivals):
+        while t - arrivals[start] > 1.0:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def sample_scores(schema: dict, subject: str, offset: int) -> dict:
+    """A full round for subject with scores cycling through 1..5."""
+    scores, n = {}, offset
+    for category, subcategories in schema[subject].items():
+        if isinstance(subcategories, dict):
+            scores[category] = {}
+            for subcategory, items in subcategories.items():
+                scores[category][subcategory] = {item: (n + i) % 5 + 1 for i, item in enumerate(items)}
+                n += len(items)
+        else:
+            scores[category] = {item: (n + i) % 5 + 1 for i, item in enumerate(subcategories)}
+            n += len(subcategories)
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="provider rate limit (requests/s)")
+    parser.add_argument("--fast", type=float, default=0.2, help="typical response time (s)")
+    parser.add_argument("--slow", type=float, default=1.5, help="response time of a slow call (s)")
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, url, stats, reset = start_backend(args.fast, args.slow, args.slow_ratio, args.seed)
+    os.environ["DEEPSEEK_API_URL"] = url
+    import llm_hub
+    from feedback import FeedbackGenerator
+    from student_db import StudentDatabase
+    llm_hub.PROVIDER_RATE_LIMITS["DeepSeek"] = args.rate
+
+    with open(os.path.join(ROOT, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    subject = "语文" if "语文" in schema else next(iter(schema))
+    template = "以下是学生的打分（5分制）：\n\n{score_details}\n\n请生成一段简短的学习反馈。"
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "students.csv")
+        with open(csv_file, "w", encoding="utf-8") as f:
+            f.write("student_id,name\n" + "".join(f"S{i:03d},学生{i}\n" for i in range(args.students)))
+        db = StudentDatabase(csv_file, os.path.join(directory, "scores.json"))
+        student_ids = list(db.students)
+        for i, sid in enumerate(student_ids):
+            db.update_scores(sid, subject, sample_scores(schema, subject, i))
+        generator = FeedbackGenerator(schema, {subject: template})
+
+        print(f"{args.students} students, {args.fast * 1e3:.0f} ms typical / {args.slow * 1e3:.0f} ms slow "
+              f"({args.slow_ratio:.0%}) responses, concurrency {args.concurrency}, rate limit {args.rate:g}/s")
+        for label in ("sequential", "batch"):
+            reset()
+            start = time.perf_counter()
+            if label == "sequential":
+                failed = 0
+                for sid in student_ids:
+                    generator.generate_feedback(sid, subject, db.get_latest_scores(sid, subject), db,
+                                                "DeepSeek", "k")
+            else:
+                results = list(generator.generate_feedback_batch(student_ids, subject, db, "DeepSeek", "k",
+                                                                 concurrency=args.concurrency))
+                failed = sum(result.error is not None for result in results)
+            elapsed = time.perf_counter() - start
+            slowest = sorted(stats["latencies"], reverse=True)
+            print(f"{label:<10} {elapsed:6.2f} s  (sum of calls {sum(slowest):5.2f} s, slowest {slowest[0]:4.2f} s)"
+                  f"  requests {stats['requests']}  peak in flight {stats['peak']}"
+                  f"  peak {peak_rate(stats['arrivals'])} req in 1 s  failed {failed}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Class-wide report generation: one request per student versus several students per request.
+
+A local OpenAI-compatible mock charges a fixed overhead per request plus a
+cost per prompt character, and answers batched prompts with the JSON
+reports format. It deliberately garbles one student in every batch reply so
+the per-student fallback path is exercised and counted.
+
+Run from the repository root:
+    python -m benchmarks.bench_batched_prompts --students 60
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_hub  # noqa: E402
+from feedback import FeedbackGenerator  # noqa: E402
+from llm_hub import ChatProvider, ProviderRouter  # noqa: E402
+from schema import CompiledSchema  # noqa: E402
+from student_db import StudentDatabase  # noqa: E402
+
+TEMPLATE = """
+你是一位语文老师，根据学生的评价分数生成“近期学习水平及状态反馈”。以下是学生的打分（5分制，5为优秀，1为较差）：
+
+{score_details}
+
+请按照以下格式生成反馈：先总结整体表现，再分别说明优势与需要改进之处，最后给出具体建议。
+"""
+STUDENT_HEADER = re.compile(r"学生 (\S+)：")
+
+
+def start_backend(overhead: float, per_kchar: float):
+    lock = threading.Lock()
+    counter = {"requests": 0, "prompt_chars": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = payload["messages"][-1]["content"]
+            with lock:
+                counter["requests"] += 1
+                counter["prompt_chars"] += len(prompt)
+            time.sleep(overhead + per_kchar * len(prompt) / 1000)
+            if payload.get("response_format", {}).get("type") == "json_object":
+                ids = STUDENT_HEADER.findall(prompt)
+                reports = [{"student_id": sid, "feedback": f"{sid} 的反馈"} for sid in ids[1:]]
+                reports.append({"student_id": ids[0], "feedback": ""})  # garbled: must fall back
+                content = "```json\n" + json.dumps({"reports": reports}, ensure_ascii=False) + "\n```"
+            else:
+                content = "单独生成的反馈"
+            body = json.dumps({"choices": [{"message": {"content": content}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/chat/completions", counter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--overhead", type=float, default=0.05, help="fixed cost per request (s)")
+    parser.add_argument("--per-kchar", type=float, default=0.005, help="cost per 1000 prompt characters (s)")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    compiled = CompiledSchema(schema)
+    subject = "语文" if "语文" in compiled.tables else next(iter(compiled.tables))
+    n_items = len(compiled.items(subject))
+    llm_hub.PROVIDER_RATE_LIMITS["DeepSeek"] = 1000.0  # measure request overhead, not the limiter
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "students.csv")
+        with open(csv_file, "w", encoding="utf-8") as f:
+            f.write("student_id,name\n" + "".join(f"S{i:04d},学生{i}\n" for i in range(args.students)))
+        db = StudentDatabase(csv_file, os.path.join(directory, "scores.json"))
+        db.bulk_import([], [(sid, subject, compiled.nest(subject, [(i + r + j) % 5 + 1 for j in range(n_items)]))
+                            for r in range(2) for i, sid in enumerate(db.students)])
+        student_ids = list(db.students)
+
+        print(f"{args.students} students, concurrency {args.concurrency}, "
+              f"{args.overhead * 1e3:.0f} ms per request + {args.per_kchar * 1e3:.0f} ms per 1000 prompt chars")
+        for batch_size in (1, 5, 10):
+            server, url, counter = start_backend(args.overhead, args.per_kchar)
+            router = ProviderRouter({"DeepSeek": ChatProvider("DeepSeek", url, "mock")})
+            generator = FeedbackGenerator(schema, {subject: TEMPLATE}, router=router)
+            start = time.perf_counter()
+            results = list(generator.generate_feedback_batch(student_ids, subject, db, "DeepSeek", "k",
+                                                             concurrency=args.concurrency, auto_route=False,
+                                                             batch_size=batch_size))
+            elapsed = time.perf_counter() - start
+            server.shutdown()
+            failed = sum(result.error is not None for result in results)
+            fallbacks = sum(result.feedback == "单独生成的反馈" for result in results) if batch_size > 1 else 0
+            print(f"batch size {batch_size:>2}: {elapsed:6.2f} s  requests {counter['requests']:4d}"
+                  f"  prompt chars {counter['prompt_chars']:7d}  fallbacks {fallbacks:3d}  failed {failed}")
+
+
+if __name__ == "__main__":
+    main()
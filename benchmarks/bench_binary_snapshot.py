@@ -0,0 +1,82 @@
+"""Snapshot size and StudentDatabase load time: scores.json versus the binary snapshot.
+
+Run from the repository root:
+    python -m benchmarks.bench_binary_snapshot --students 50000 --rounds 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binary_snapshot import json_to_binary  # noqa: E402
+from schema import CompiledSchema  # noqa: E402
+from student_db import StudentDatabase  # noqa: E402
+
+
+def make_fixture(directory: str, n_students: int, n_rounds: int, compiled: CompiledSchema):
+    csv_file = os.path.join(directory, "students.csv")
+    json_file = os.path.join(directory, "scores.json")
+    rng = random.Random(0)
+    with open(csv_file, "w", encoding="utf-8") as f:
+        f.write("student_id,name\n")
+        for i in range(n_students):
+            f.write(f"S{i:06d},学生{i}\n")
+    # Stream the JSON out student by student; the fixture itself can be large
+    with open(json_file, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(n_students):
+            histories = {
+                subject: [compiled.nest(subject, [rng.randint(1, 5) for _ in compiled.items(subject)])
+                          for _ in range(n_rounds)]
+                for subject in compiled.tables
+            }
+            f.write(("," if i else "") + f'"S{i:06d}": ' + json.dumps(histories, ensure_ascii=False, indent=2))
+        f.write("}")
+    return csv_file, json_file
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=10, help="rounds per student and subject")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        compiled = CompiledSchema(json.load(f))
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file, json_file = make_fixture(directory, args.students, args.rounds, compiled)
+        binary_file = os.path.join(directory, "scores.bin")
+        _, convert_time = timed(lambda: json_to_binary(json_file, binary_file))
+        json_size, binary_size = os.path.getsize(json_file), os.path.getsize(binary_file)
+
+        json_db, json_time = timed(lambda: StudentDatabase(csv_file, json_file))
+        del json_db
+        binary_db, binary_time = timed(lambda: StudentDatabase(csv_file, json_file, snapshot_format="binary"))
+        sample = f"S{args.students // 2:06d}"
+        _, access_time = timed(lambda: [binary_db.get_latest_scores(sample, subject) for subject in compiled.tables])
+
+    total_rounds = args.students * args.rounds * len(compiled.tables)
+    print(f"{args.students} students x {args.rounds} rounds x {len(compiled.tables)} subjects = {total_rounds:,} rounds")
+    print(f"scores.json: {json_size:>14,} bytes")
+    print(f"scores.bin:  {binary_size:>14,} bytes  ({json_size / binary_size:.0f}x smaller)")
+    print(f"json -> binary conversion: {convert_time:8.2f} s")
+    print(f"load scores.json:          {json_time:8.2f} s")
+    print(f"load scores.bin (mmap):    {binary_time:8.2f} s  ({json_time / binary_time:.0f}x faster)")
+    print(f"first latest-round access: {access_time * 1e6:8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Onboarding a school: bulk_import() versus one add_student/update_scores call per row.
+
+Generates a roster and a wide 语文 scores file (one round per student), imports
+them into an empty database with each backend, and times the old per-row path
+on a sample for comparison. The per-row estimate is a lower bound: in json
+mode each call rewrites files that keep growing with the roster.
+
+Run from the repository root:
+    python -m benchmarks.bench_bulk_import --students 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_import import bulk_import, parse_scores, scores_template  # noqa: E402
+from schema import CompiledSchema  # noqa: E402
+from sqlite_db import SQLiteStudentDatabase  # noqa: E402
+from student_db import StudentDatabase  # noqa: E402
+
+SUBJECT = "语文"
+
+
+def make_files(directory: str, n_students: int, compiled: CompiledSchema):
+    roster = os.path.join(directory, "roster.csv")
+    scores = os.path.join(directory, "scores_wide.csv")
+    rng = random.Random(0)
+    with open(roster, "w", encoding="utf-8") as f:
+        f.write("student_id,name\n")
+        for i in range(n_students):
+            f.write(f"S{i:06d},学生{i}\n")
+    n_items = len(compiled.items(SUBJECT))
+    with open(scores, "w", encoding="utf-8") as f:
+        f.write(scores_template(compiled, SUBJECT))
+        for i in range(n_students):
+            f.write(f"S{i:06d}," + ",".join(str(rng.randint(1, 5)) for _ in range(n_items)) + "\n")
+    return roster, scores
+
+
+def open_backend(directory: str, backend: str):
+    csv_file = os.path.join(directory, f"{backend}_students.csv")
+    json_file = os.path.join(directory, f"{backend}_scores.json")
+    with open(csv_file, "w", encoding="utf-8") as f:
+        f.write("student_id,name\n")
+    if backend == "sqlite":
+        return SQLiteStudentDatabase(os.path.join(directory, "students.db"), csv_file, json_file,
+                                     pending_file=os.path.join(directory, "none.json"))
+    return StudentDatabase(csv_file, json_file, storage=backend,
+                           pending_file=os.path.join(directory, "none.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=200, help="rows timed on the per-row path")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        compiled = CompiledSchema(json.load(f))
+
+    print(f"{args.students} students, 1 {SUBJECT} round each ({len(compiled.items(SUBJECT))} items)")
+    with tempfile.TemporaryDirectory() as directory:
+        roster, scores = make_files(directory, args.students, compiled)
+        rounds, _, _ = parse_scores(scores, compiled, SUBJECT)
+        for backend in ("json", "log", "sqlite"):
+            db = open_backend(directory, backend)
+            report = bulk_import(db, compiled, roster=roster, scores=scores, subject=SUBJECT)
+            assert not report.errors and report.rounds == args.students, report.errors[:5]
+
+            per_row = open_backend(tempfile.mkdtemp(dir=directory), backend)
+            start = time.perf_counter()
+            for student_id, subject, round_scores in rounds[:args.sample]:
+                per_row.add_student(student_id, student_id)
+                per_row.update_scores(student_id, subject, round_scores)
+            per_row_rate = args.sample * 2 / (time.perf_counter() - start)  # two input rows per student
+            print(f"{backend:>6}: bulk {report.elapsed:6.2f} s ({report.rows_per_sec:9,.0f} rows/s)   "
+                  f"per-row {per_row_rate:7,.0f} rows/s -> {args.students * 2 / per_row_rate:8.1f} s estimated")
+            if backend == "sqlite":
+                db.close()
+                per_row.close()
+
+
+if __name__ == "__main__":
+    main()
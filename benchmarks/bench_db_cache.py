@@ -0,0 +1,76 @@
+"""Per-rerun cost of obtaining a StudentDatabase, before and after caching.
+
+Before: app.py built StudentDatabase() on every Streamlit rerun.
+After: app.py calls get_shared_database(), which only stat()s the backing files.
+
+Run from the repository root:
+    python -m benchmarks.bench_db_cache --students 2000 --rounds 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_db import StudentDatabase, get_shared_database  # noqa: E402
+
+
+def make_fixture(directory: str, n_students: int, n_rounds: int, schema: dict):
+    csv_file = os.path.join(directory, "students.csv")
+    json_file = os.path.join(directory, "scores.json")
+    with open(csv_file, "w", encoding="utf-8") as f:
+        f.write("student_id,name\n")
+        for i in range(n_students):
+            f.write(f"S{i:06d},学生{i}\n")
+    round_scores = {
+        subject: {
+            category: ({sub: {item: 3 for item in items} for sub, items in subcategories.items()}
+                       if isinstance(subcategories, dict) else {item: 3 for item in subcategories})
+            for category, subcategories in categories.items()
+        }
+        for subject, categories in schema.items()
+    }
+    scores_data = {
+        f"S{i:06d}": {subject: [round_scores[subject]] * n_rounds for subject in schema}
+        for i in range(n_students)
+    }
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(scores_data, f, ensure_ascii=False, indent=2)
+    return csv_file, json_file
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file, json_file = make_fixture(directory, args.students, args.rounds, schema)
+        before = timeit(lambda: StudentDatabase(csv_file, json_file), args.repeat)
+        get_shared_database(csv_file, json_file)  # warm the shared instance
+        after = timeit(lambda: get_shared_database(csv_file, json_file), args.repeat * 1000)
+
+    print(f"{args.students} students x {args.rounds} rounds x {len(schema)} subjects")
+    print(f"before (StudentDatabase per rerun):     {before * 1e3:10.3f} ms")
+    print(f"after  (get_shared_database per rerun): {after * 1e6:10.1f} us")
+    print(f"speedup: {before / after:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""format_score_details over many score records: nested schema walk vs compiled table.
+
+Run from the repository root:
+    python -m benchmarks.bench_format_details --records 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feedback import FeedbackGenerator  # noqa: E402
+
+
+def legacy_format_score_details(schema, subject, scores, previous_scores):
+    """The pre-compilation implementation, kept here as the baseline."""
+    details = []
+    for category, subcategories in schema[subject].items():
+        details.append(f"{category}：")
+        if isinstance(subcategories, dict):
+            for subcategory, items in subcategories.items():
+                for item in items:
+                    current_score = scores.get(category, {}).get(subcategory, {}).get(item, 3)
+                    prev_score = (previous_scores.get(category, {}).get(subcategory, {}).get(item, None)
+                                  if previous_scores else None)
+                    line = f"- {item}：{current_score}/5"
+                    if prev_score is not None:
+                        change = "进步" if current_score > prev_score else "下降" if current_score < prev_score else "持平"
+                        line += f"（与上次相比：{change}）"
+                    details.append(line)
+        elif isinstance(subcategories, list):
+            for item in subcategories:
+                current_score = scores.get(category, {}).get(item, 3)
+                prev_score = (previous_scores.get(category, {}).get(item, None)
+                              if previous_scores else None)
+                line = f"- {item}：{current_score}/5"
+                if prev_score is not None:
+                    change = "进步" if current_score > prev_score else "下降" if current_score < prev_score else "持平"
+                    line += f"（与上次相比：{change}）"
+                details.append(line)
+    return "\n".join(details)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--subject", default="语文")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    generator = FeedbackGenerator(schema, {})
+    compiled = generator.compiled
+
+    rng = random.Random(0)
+    n_items = len(compiled.items(args.subject))
+    records = []
+    for i in range(args.records):
+        scores = compiled.nest(args.subject, [rng.randint(1, 5) for _ in range(n_items)])
+        previous = compiled.nest(args.subject, [rng.randint(1, 5) for _ in range(n_items)]) if i % 2 else None
+        records.append((scores, previous))
+
+    start = time.perf_counter()
+    legacy = [legacy_format_score_details(schema, args.subject, s, p) for s, p in records]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_out = [generator.format_score_details(args.subject, s, p) for s, p in records]
+    compiled_time = time.perf_counter() - start
+
+    assert legacy == compiled_out, "compiled output differs from the legacy walk"
+    print(f"{args.records} records, {n_items} items each")
+    print(f"legacy walk:    {legacy_time:8.3f} s  ({args.records / legacy_time:10,.0f} records/s)")
+    print(f"compiled table: {compiled_time:8.3f} s  ({args.records / compiled_time:10,.0f} records/s)")
+    print(f"speedup: {legacy_time / compiled_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Tail latency of report requests with and without hedging, against a local mock endpoint.
+
+The mock answers most requests quickly but stalls on a small fraction of
+them (a slow replica, a cold cache, a queueing spike), which is what drives
+p99. With hedging, a request that has not answered by the provider's p95
+gets one budgeted duplicate; the first answer wins. Hedged requests are
+streamed, so the loser is disconnected at its first chunk: the mock counts
+the tokens it actually sent, which should stay close to one full reply per
+request.
+
+Run from the repository root:
+    python -m benchmarks.bench_hedged_requests --requests 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_hub  # noqa: E402
+from llm_hub import ChatProvider, HedgeBudget, ProviderRouter  # noqa: E402
+
+
+def start_backend(fast: float, slow: float, slow_rate: float, seed: int, tokens: int, per_token: float):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    counter = {"requests": 0, "tokens": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # small SSE chunks must not wait for delayed ACKs
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                counter["requests"] += 1
+                delay = slow if rng.random() < slow_rate else rng.uniform(0.5, 1.5) * fast
+            time.sleep(delay)
+            if not payload.get("stream"):
+                time.sleep(per_token * tokens)
+                with lock:
+                    counter["tokens"] += tokens
+                body = json.dumps({"choices": [{"message": {"content": "ok" * tokens}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                for _ in range(tokens):
+                    self.send_chunk(b'data: {"choices":[{"delta":{"content":"ok"}}]}\n\n')
+                    with lock:
+                        counter["tokens"] += 1
+                    time.sleep(per_token)
+                self.send_chunk(b"data: [DONE]\n\n")
+                self.send_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client dropped a losing hedge; stop generating
+
+        def send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/chat/completions", counter
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--fast", type=float, default=0.02, help="typical latency (s)")
+    parser.add_argument("--slow", type=float, default=0.5, help="latency of a stalled request (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--budget", type=float, default=0.1, help="hedges per request, long-run")
+    parser.add_argument("--tokens", type=int, default=50, help="tokens per reply")
+    parser.add_argument("--per-token", type=float, default=0.001, help="delay between tokens (s)")
+    args = parser.parse_args()
+
+    llm_hub.configure_http_pool(pool_size=4)
+
+    print(f"{args.requests} requests, {args.slow_rate:.0%} stall for {args.slow * 1e3:.0f} ms, "
+          f"hedge budget {args.budget:.0%}")
+    for label, hedge in (("no hedging", False), ("hedged", True)):
+        server, url, counter = start_backend(args.fast, args.slow, args.slow_rate, 1, args.tokens, args.per_token)
+        provider = ChatProvider("DeepSeek", url, "mock")
+        router = ProviderRouter({"DeepSeek": provider}, hedge_budget=HedgeBudget(ratio=args.budget))
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            router.chat("hi", preferred="DeepSeek", api_key="k", hedge=hedge)
+            latencies.append(time.perf_counter() - start)
+        time.sleep(args.slow + args.tokens * args.per_token)  # let abandoned duplicates finish before counting
+        server.shutdown()
+        print(f"{label:<11} p50 {percentile(latencies, 0.5) * 1e3:6.1f} ms  p95 {percentile(latencies, 0.95) * 1e3:6.1f} ms"
+              f"  p99 {percentile(latencies, 0.99) * 1e3:6.1f} ms  mean {statistics.mean(latencies) * 1e3:6.1f} ms"
+              f"  backend requests {counter['requests']} ({router.hedges} hedges, {router.hedge_wins} won)"
+              f"  tokens generated {counter['tokens'] / (args.requests * args.tokens):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup time and resident memory of StudentDatabase as the score history grows.
+
+For a fixed roster, builds binary snapshots with increasing rounds per student
+and opens each in a fresh process, once as a JSON snapshot (eager) and once as
+a binary snapshot (lazy: mapped, decoded per student on first access).
+
+Run from the repository root (Linux, for /proc/self/status):
+    python -m benchmarks.bench_lazy_history --students 2000 --rounds 5 50 500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from binary_snapshot import BinarySnapshot, binary_to_json, write_snapshot  # noqa: E402
+from schema import CompiledSchema  # noqa: E402
+
+PROBE = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+from student_db import StudentDatabase
+start = time.perf_counter()
+db = StudentDatabase({csv!r}, {json!r}, snapshot_format={fmt!r})
+startup = time.perf_counter() - start
+start = time.perf_counter()
+db.get_latest_scores("S000000", "语文"); db.get_previous_scores("S000000", "语文")
+first_access = time.perf_counter() - start
+rss = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS"))
+print(startup, first_access, rss)
+"""
+
+
+def make_snapshot(directory: str, n_students: int, n_rounds: int, compiled: CompiledSchema) -> str:
+    # One student's rounds are encoded once, then copied for everyone through the mapped fast path
+    seed_file = os.path.join(directory, "seed.bin")
+    rounds = [compiled.nest(subject, [(i + j) % 5 + 1 for j in range(len(compiled.items(subject)))])
+              for subject in compiled.tables for i in range(n_rounds)]
+    write_snapshot(seed_file, {"seed": {subject: rounds[k * n_rounds:(k + 1) * n_rounds]
+                                        for k, subject in enumerate(compiled.tables)}})
+    seed = BinarySnapshot(seed_file).histories()["seed"]
+    binary_file = os.path.join(directory, "scores.bin")
+    write_snapshot(binary_file, {f"S{i:06d}": dict(seed) for i in range(n_students)})
+    # Store the aggregates in the header, as StudentDatabase does when it writes a snapshot
+    snapshot = BinarySnapshot(binary_file)
+    write_snapshot(binary_file, snapshot.histories(), aggregates=snapshot.aggregates())
+    return binary_file
+
+
+def probe(csv_file: str, json_file: str, snapshot_format: str):
+    code = PROBE.format(root=ROOT, csv=csv_file, json=json_file, fmt=snapshot_format)
+    startup, first_access, rss_kb = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                                                   text=True).stdout.split()
+    return float(startup), float(first_access), int(rss_kb) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[5, 50, 500], help="rounds per student and subject")
+    parser.add_argument("--json-limit", type=int, default=200_000, help="skip the JSON probe above this many rounds")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        compiled = CompiledSchema(json.load(f))
+
+    print(f"{args.students} students, {len(compiled.tables)} subjects")
+    print(f"{'rounds':>10} | {'json startup':>12} {'json RSS':>9} | {'lazy startup':>12} {'lazy RSS':>9} "
+          f"{'first access':>12}")
+    for n_rounds in args.rounds:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_file = os.path.join(directory, "students.csv")
+            json_file = os.path.join(directory, "scores.json")
+            with open(csv_file, "w", encoding="utf-8") as f:
+                f.write("student_id,name\n" + "".join(f"S{i:06d},学生{i}\n" for i in range(args.students)))
+            make_snapshot(directory, args.students, n_rounds, compiled)
+            total = args.students * n_rounds * len(compiled.tables)
+
+            json_cells = " " * 23
+            if total <= args.json_limit:
+                binary_to_json(os.path.join(directory, "scores.bin"), json_file)
+                json_startup, _, json_rss = probe(csv_file, json_file, "json")
+                json_cells = f"{json_startup:10.2f} s {json_rss:6.0f} MB"
+            lazy_startup, first_access, lazy_rss = probe(csv_file, json_file, "binary")
+            print(f"{total:>10,} | {json_cells} | {lazy_startup:10.2f} s {lazy_rss:6.0f} MB "
+                  f"{first_access * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Report latency with a fixed provider versus ProviderRouter, against local mock endpoints.
+
+Three OpenAI-compatible mock servers stand in for DeepSeek, OpenAI and 智谱,
+each with its own latency and error rate. Halfway through, the fastest one
+degrades, to show the router moving traffic to whichever backend is
+currently best.
+
+Run from the repository root:
+    python -m benchmarks.bench_provider_router --requests 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_hub  # noqa: E402
+from llm_hub import ChatProvider, ProviderRouter  # noqa: E402
+
+
+class MockBackend:
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(0)
+        self.served = 0
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(backend.rng.expovariate(1 / backend.latency))
+                if backend.rng.random() < backend.error_rate:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                backend.served += 1
+                body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/chat/completions"
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(send, n_requests: int, degrade):
+    latencies, failures = [], 0
+    for i in range(n_requests):
+        if i == n_requests // 2:
+            degrade()
+        start = time.perf_counter()
+        try:
+            send()
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    llm_hub.configure_http_pool(max_retries=0)  # measure the router's failover, not urllib3's retries
+
+    for label, routed in (("fixed DeepSeek", False), ("router", True)):
+        backends = {"DeepSeek": MockBackend(0.02, 0.0), "OpenAI": MockBackend(0.04, 0.02),
+                    "智谱": MockBackend(0.08, 0.0)}
+        # Keys for the non-preferred providers normally come from the environment
+        providers = {name: ChatProvider(name, backend.url, "mock", env_api_key=f"BENCH_{i}_API_KEY")
+                     for i, (name, backend) in enumerate(backends.items())}
+        for i in range(len(providers)):
+            os.environ[f"BENCH_{i}_API_KEY"] = "k"
+        router = ProviderRouter(providers, rng=random.Random(0))
+
+        def degrade():
+            backends["DeepSeek"].latency = 0.15
+            backends["DeepSeek"].error_rate = 0.3
+
+        def send():
+            if routed:
+                router.chat("hi", preferred="DeepSeek", api_key="k")
+            else:
+                providers["DeepSeek"].chat("hi", api_key="k")
+
+        latencies, failures = run(send, args.requests, degrade)
+        used = {name: backend.served for name, backend in backends.items() if backend.served}
+        for backend in backends.values():
+            backend.server.shutdown()
+        print(f"{label:<15} mean {statistics.mean(latencies) * 1e3:7.1f} ms  p95 {percentile(latencies, 0.95) * 1e3:7.1f} ms"
+              f"  p99 {percentile(latencies, 0.99) * 1e3:7.1f} ms  failed {failures:3d}  served by {used}")
+
+
+if __name__ == "__main__":
+    main()
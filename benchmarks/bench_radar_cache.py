@@ -0,0 +1,99 @@
+"""Radar charts on 学生能力展示: rebuilding the figures versus RadarFigureCache.
+
+Before: every rerun built one go.Figure per category and st.plotly_chart
+serialized it. After: the figure JSON is built once per (student, round) and
+reruns only hand the cached spec to st.plotly_chart.
+
+Both paths are timed through the same marshalling st.plotly_chart performs.
+
+Run from the repository root:
+    python -m benchmarks.bench_radar_cache --students 20 --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import plotly.graph_objects as go
+import plotly.tools
+import plotly.utils
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radar_charts import RadarFigureCache  # noqa: E402
+from schema import CompiledSchema  # noqa: E402
+from student_db import StudentDatabase  # noqa: E402
+
+
+def plotly_chart(figure_or_data) -> str:
+    """What st.plotly_chart does with its argument before sending it to the browser."""
+    figure = plotly.tools.return_figure_from_figure_or_data(figure_or_data, validate_figure=True)
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def render_uncached(db, compiled: CompiledSchema, student_id: str, subject: str):
+    # The page as it was: schema walk and one go.Figure per category on every rerun
+    name = db.students[student_id]["name"]
+    scores = db.get_latest_scores(student_id, subject)
+    items = compiled.items(subject)
+    all_values = compiled.values(subject, scores, 3)
+    for category, start, stop in compiled.category_ranges(subject):
+        labels = [entry.label for entry in items[start:stop]]
+        values = all_values[start:stop]
+        fig = go.Figure(data=go.Scatterpolar(r=values + [values[0]], theta=labels + [labels[0]], fill='toself'))
+        fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=False,
+                          title=f"{name} 的{category}表现")
+        plotly_chart(fig)
+
+
+def render_cached(cache: RadarFigureCache, db, compiled: CompiledSchema, student_id: str, subject: str,
+                  overlay: bool):
+    for _, spec in cache.figures(db, compiled, student_id, subject, overlay=overlay):
+        plotly_chart(json.loads(spec))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50, help="reruns per student")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+        compiled = CompiledSchema(json.load(f))
+    subject = next(iter(compiled.tables))
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "students.csv")
+        with open(csv_file, "w", encoding="utf-8") as f:
+            f.write("student_id,name\n" + "".join(f"S{i:04d},学生{i}\n" for i in range(args.students)))
+        db = StudentDatabase(csv_file, os.path.join(directory, "scores.json"))
+        n_items = len(compiled.items(subject))
+        db.bulk_import([], [(sid, subject, compiled.nest(subject, [(i + r + j) % 5 + 1 for j in range(n_items)]))
+                            for r in range(2) for i, sid in enumerate(db.students)])
+        student_ids = list(db.students)
+
+        def timed(render) -> float:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for sid in student_ids:
+                    render(sid)
+            return (time.perf_counter() - start) / (args.repeat * len(student_ids))
+
+        uncached = timed(lambda sid: render_uncached(db, compiled, sid, subject))
+        cache = RadarFigureCache()
+        cached = timed(lambda sid: render_cached(cache, db, compiled, sid, subject, overlay=False))
+        overlay = timed(lambda sid: render_cached(cache, db, compiled, sid, subject, overlay=True))
+
+    print(f"{len(compiled.category_ranges(subject))} radar charts per student, "
+          f"{args.students} students x {args.repeat} reruns")
+    print(f"rebuild every rerun:       {uncached * 1e3:8.2f} ms per page")
+    print(f"figure cache:              {cached * 1e3:8.2f} ms per page  ({uncached / cached:.1f}x)")
+    print(f"figure cache, overlay:     {overlay * 1e3:8.2f} ms per page")
+    print(f"cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
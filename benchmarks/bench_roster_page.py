@@ -0,0 +1,78 @@
+"""Rendering one roster page: full-roster DataFrame versus StudentDatabase.list_students.
+
+Before: the 学生信息 page built a DataFrame of every student on each rerun.
+After: only the visible page is fetched (and filtered) through the StudentIndex.
+
+Run from the repository root:
+    python -m benchmarks.bench_roster_page --students 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_db import StudentDatabase  # noqa: E402
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华"
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def page_frame(db: StudentDatabase, page_size: int, **filters) -> pd.DataFrame:
+    roster_page = db.list_students(10 * page_size, page_size, **filters)
+    pending_ids = db.pending_student_ids("语文", roster_page.student_ids)
+    return pd.DataFrame([{"学号": sid, "姓名": db.students[sid]["name"], "班级": db.students[sid]["class"],
+                          "待生成报告": sid in pending_ids} for sid in roster_page.student_ids])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--classes", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "students.csv")
+        with open(csv_file, "w", encoding="utf-8") as f:
+            f.write("student_id,name,class\n")
+            for i in range(args.students):
+                name = rng.choice(SURNAMES) + "".join(rng.choices(GIVEN, k=rng.randint(1, 2)))
+                f.write(f"S{i:06d},{name},{i % args.classes + 1}班\n")
+        db = StudentDatabase(csv_file, os.path.join(directory, "scores.json"))
+        for i in range(0, args.students, 7):
+            db.pending.setdefault("语文", {})[f"S{i:06d}"] = [{}]
+
+        full = timeit(lambda: pd.DataFrame([{"student_id": sid, "name": info["name"]}
+                                            for sid, info in db.students.items()]), args.repeat)
+        cases = [
+            ("no filter", {}),
+            ("class", {"class_name": "7班"}),
+            ("search 'zh'", {"query": "zh"}),
+            ("pending in 语文", {"pending_subject": "语文"}),
+            ("class + search + pending", {"class_name": "7班", "query": "z", "pending_subject": "语文"}),
+        ]
+        print(f"{args.students} students in {args.classes} classes, page size {args.page_size}")
+        print(f"{'full roster DataFrame':<28} {full * 1e3:9.2f} ms")
+        for label, filters in cases:
+            elapsed = timeit(lambda: page_frame(db, args.page_size, **filters), args.repeat)
+            total = db.list_students(0, 0, **filters).total
+            print(f"{'page, ' + label:<28} {elapsed * 1e3:9.2f} ms  ({total} matching)")
+
+
+if __name__ == "__main__":
+    main()
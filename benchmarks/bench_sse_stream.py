@@ -0,0 +1,122 @@
+"""Time to first token: streaming (SSE) versus waiting for the whole completion.
+
+A local OpenAI-compatible stub "generates" a fixed Chinese report: it waits
+--prefill seconds, then emits one token every --per-token seconds. The
+non-streaming path gets the same reply in one JSON body after the full
+generation time. The streamed text is checked against the reply, so the SSE
+parser is exercised across keep-alive comments, event fields and multi-byte
+characters. An empty stream must fail over to the next provider instead of
+producing an empty report.
+
+Run from the repository root:
+    python -m benchmarks.bench_sse_stream --requests 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_hub import ChatProvider, ProviderRouter  # noqa: E402
+
+REPLY = ("**整体表现**\n该生近期学习状态稳定，课堂参与积极，作业完成质量较高。\n"
+         "**优势**\n- 阅读理解：能抓住文章主旨。\n- 书面表达：条理清晰，用词准确。\n"
+         "**需要改进之处**\n- 古诗文积累：背诵篇目偏少。\n**建议**\n每天坚持朗读与摘抄。")
+TOKENS = [REPLY[i:i + 3] for i in range(0, len(REPLY), 3)]
+
+
+def start_backend(prefill: float, per_token: float, empty: bool = False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(prefill)
+            if not payload.get("stream"):
+                time.sleep(per_token * len(TOKENS))
+                body = json.dumps({"choices": [{"message": {"content": REPLY}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            # Chunked like real SSE endpoints, so the client sees each event as soon as it is sent
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.send_chunk(b": keep-alive\n\nevent: message\n")
+            self.send_chunk(b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n')
+            for token in () if empty else TOKENS:
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                self.send_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                time.sleep(per_token)
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+            self.close_connection = True  # the client stops reading at [DONE] and drops the connection
+
+        def send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--prefill", type=float, default=0.3, help="delay before the first token (s)")
+    parser.add_argument("--per-token", type=float, default=0.02, help="delay between tokens (s)")
+    args = parser.parse_args()
+
+    server, url = start_backend(args.prefill, args.per_token)
+    empty_server, empty_url = start_backend(args.prefill, args.per_token, empty=True)
+    router = ProviderRouter({"DeepSeek": ChatProvider("DeepSeek", url, "mock")}, explore_rate=0)
+
+    print(f"{args.requests} requests, {len(TOKENS)} tokens, {args.prefill * 1e3:.0f} ms prefill "
+          f"+ {args.per_token * 1e3:.0f} ms per token")
+    blocking = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        assert router.chat("hi", preferred="DeepSeek", api_key="k") == REPLY
+        blocking.append(time.perf_counter() - start)
+
+    first_token, total, mismatches = [], [], 0
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        chunks = []
+        for chunk in router.chat_stream("hi", preferred="DeepSeek", api_key="k"):
+            if not chunks:
+                first_token.append(time.perf_counter() - start)
+            chunks.append(chunk)
+        total.append(time.perf_counter() - start)
+        mismatches += "".join(chunks) != REPLY
+    print(f"blocking   first text {statistics.median(blocking) * 1e3:7.1f} ms (median)")
+    print(f"streaming  first text {statistics.median(first_token) * 1e3:7.1f} ms (median), "
+          f"complete {statistics.median(total) * 1e3:7.1f} ms; "
+          f"parsed text matches the reply: {args.requests - mismatches}/{args.requests}")
+
+    # The preferred provider ends its stream without any text: the router must move on
+    os.environ["BENCH_SSE_API_KEY"] = "k"
+    failover = ProviderRouter({"DeepSeek": ChatProvider("DeepSeek", empty_url, "mock"),
+                               "OpenAI": ChatProvider("OpenAI", url, "mock", "BENCH_SSE_API_KEY")}, explore_rate=0)
+    stream = failover.chat_stream("hi", preferred="DeepSeek", api_key="k")
+    text = "".join(stream)
+    print(f"empty stream: served by {stream.provider}, reply {'OK' if text == REPLY else 'MISMATCH'}")
+    server.shutdown()
+    empty_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Resolving the selected student: linear name scan versus StudentIndex.
+
+Before: every page ran next(sid for sid, info in db.students.items() if info["name"] == name).
+After: db.find_students_by_name(name) / db.search_students(query).
+
+Run from the repository root:
+    python -m benchmarks.bench_student_index --students 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_index import StudentIndex  # noqa: E402
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华"
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    students = {f"S{i:06d}": {"name": rng.choice(SURNAMES) + "".join(rng.choices(GIVEN, k=rng.randint(1, 2)))}
+                for i in range(args.students)}
+    target = students[f"S{args.students - 1:06d}"]["name"]
+
+    build = timeit(lambda: StudentIndex(students), 1)
+    index = StudentIndex(students)
+    scan = timeit(lambda: next(sid for sid, info in students.items() if info["name"] == target), args.repeat)
+    lookup = timeit(lambda: index.by_name(target), args.repeat * 100)
+    search = timeit(lambda: index.search("zhangw"), args.repeat * 10)
+    rename = timeit(lambda: (index.rename("S000000", students["S000000"]["name"], "测试"),
+                             index.rename("S000000", "测试", students["S000000"]["name"])), args.repeat)
+
+    print(f"{args.students} students, {len(index.by_name(target))} named {target}")
+    print(f"index build:                  {build * 1e3:10.1f} ms (once per load)")
+    print(f"linear scan (next(...)):      {scan * 1e6:10.1f} us")
+    print(f"find_students_by_name:        {lookup * 1e6:10.2f} us")
+    print(f"search_students('zhangw'):    {search * 1e6:10.1f} us")
+    print(f"rename there and back:        {rename * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Multi-process, multi-thread write stress test for StudentDatabase.
+
+Every worker process opens its own StudentDatabase on the same files and runs
+several threads, each interleaving update_scores() on the shared default
+roster with enqueue_pending() / promote_pending() on a student of its own
+(promote consumes the whole queue, so writers must not share one). One
+process also compacts the log now and then. Afterwards a fresh instance must see every round exactly once:
+no lost updates, no duplicated records, no torn files.
+
+Run from the repository root:
+    python -m benchmarks.stress_concurrent_writes --processes 4 --threads 4 --writes 50
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_db import StudentDatabase  # noqa: E402
+
+SUBJECT = "语文"
+
+
+def worker(directory: str, storage: str, process_index: int, n_threads: int, n_writes: int, results):
+    db = StudentDatabase(os.path.join(directory, "students.csv"), os.path.join(directory, "scores.json"),
+                         storage=storage)
+    shared_ids = [sid for sid in sorted(db.students) if not sid.startswith("w")]
+
+    def run(thread_index: int):
+        own_id = f"w{process_index}-{thread_index}"
+        for i in range(n_writes):
+            scores = {"stress": {"writer": process_index * 1000 + thread_index, "seq": i}}
+            if i % 2:
+                db.update_scores(shared_ids[(process_index + thread_index + i) % len(shared_ids)], SUBJECT, scores)
+            else:
+                db.enqueue_pending(own_id, SUBJECT, scores)
+                db.promote_pending(own_id, SUBJECT)
+            if storage == "log" and process_index == 0 and thread_index == 0 and i % 10 == 9:
+                db.compact()
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(db._commit.fsyncs)
+
+
+def stress(storage: str, n_processes: int, n_threads: int, n_writes: int):
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "students.csv")
+        json_file = os.path.join(directory, "scores.json")
+        setup = StudentDatabase(csv_file, json_file, storage=storage)  # creates the default roster
+        for p in range(n_processes):
+            for t in range(n_threads):
+                setup.add_student(f"w{p}-{t}", f"写入者{p}-{t}")
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(directory, storage, p, n_threads, n_writes, results))
+            for p in range(n_processes)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        if any(process.exitcode for process in processes):
+            raise SystemExit(f"{storage}: a worker process failed")
+        fsyncs = sum(results.get() for _ in processes)
+
+        db = StudentDatabase(csv_file, json_file, storage=storage)
+        seen = [(r["stress"]["writer"], r["stress"]["seq"])
+                for info in db.students.values() for r in info["scores"].get(SUBJECT, [])]
+        expected = n_processes * n_threads * n_writes
+        writes = expected + n_processes * n_threads * (n_writes // 2)  # enqueue + promote count twice
+        ok = len(seen) == expected == len(set(seen)) and not any(db.pending.get(SUBJECT, {}).values())
+        print(f"{storage:>4}: {len(seen)}/{expected} rounds {'OK' if ok else 'MISMATCH'}, "
+              f"{writes / elapsed:8.0f} writes/s, {fsyncs} log fsyncs for {writes} writes")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=50, help="writes per thread")
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads x {args.writes} writes")
+    ok = all([stress(storage, args.processes, args.threads, args.writes) for storage in ("json", "log")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
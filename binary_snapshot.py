@@ -0,0 +1,272 @@
+"""Compact, memory-mappable alternative to the scores.json snapshot.
+
+Layout (little-endian, sections aligned to 8 bytes):
+
+    b"SCRSNAP1" | header length (uint64) | header JSON | padding
+    per subject: round counts (uint32 x students) | scores (uint8 x rounds x items)
+
+The header stores the student ids, each subject's item paths and section
+offsets (relative to the end of the header), optionally the ScoreAggregates of
+all rounds, plus the "_meta" dict of the JSON snapshot. Rounds are grouped by
+student in header order, oldest first; each round is one row of item scores,
+0 meaning "not scored".
+
+    python binary_snapshot.py scores.json scores.bin
+    python binary_snapshot.py scores.bin scores.json
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aggregates import ItemStats, ScoreAggregates, iter_leaves
+from file_store import atomic_write_bytes, atomic_write_text
+
+MAGIC = b"SCRSNAP1"
+META_KEY = "_meta"
+ALIGN = 8
+_LENGTH = struct.Struct("<Q")
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % ALIGN)
+
+
+class SubjectTable:
+    """One subject's mapped section: per-student round counts and the rounds x items score matrix.
+
+    rounds(start, stop) decodes one student's history and keeps the last
+    cache_size decoded histories in an LRU.
+    """
+
+    def __init__(self, subject: str, paths: List[Tuple[str, ...]], counts: np.ndarray, data: np.ndarray,
+                 cache_size: int = 256):
+        self.subject = subject
+        self.paths = paths
+        self.counts = counts
+        self.starts = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)[:-1])) if len(counts) else counts
+        self.data = data
+        self.rounds = lru_cache(maxsize=cache_size)(self._decode_rounds)
+
+    def _decode_rounds(self, start: int, stop: int) -> Tuple[Dict, ...]:
+        return tuple(self.decode(row) for row in range(start, stop))
+
+    def decode(self, row: int) -> Dict:
+        """Nested scores dict of one round."""
+        scores: Dict = {}
+        for path, value in zip(self.paths, self.data[row].tolist()):
+            if value:
+                node = scores
+                for key in path[:-1]:
+                    node = node.setdefault(key, {})
+                node[path[-1]] = value
+        return scores
+
+
+class MappedRounds(Sequence):
+    """One student's rounds of one subject: mapped rows first, then rounds appended since loading.
+
+    Behaves like the list of dicts it replaces; the mapped rows are decoded
+    together on first access and then served from the table's LRU.
+    """
+
+    __slots__ = ("table", "start", "stop", "tail")
+
+    def __init__(self, table: SubjectTable, start: int, stop: int):
+        self.table = table
+        self.start = start
+        self.stop = stop
+        self.tail: List[Dict] = []
+
+    def __len__(self):
+        return self.stop - self.start + len(self.tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        mapped = self.stop - self.start
+        if 0 <= index < mapped:
+            return self.table.rounds(self.start, self.stop)[index]
+        if mapped <= index < len(self):
+            return self.tail[index - mapped]
+        raise IndexError("round index out of range")
+
+    def append(self, scores: Dict):
+        self.tail.append(scores)
+
+    def __repr__(self):
+        return f"MappedRounds({self.table.subject!r}, mapped={self.stop - self.start}, appended={len(self.tail)})"
+
+
+class BinarySnapshot:
+    """Read-only memory map of a binary snapshot file; nothing is decoded up front.
+
+    Opening costs O(students) for the header and round counts, independent of
+    how many rounds the file holds; at most cache_size decoded histories per
+    subject are kept in memory.
+    """
+
+    def __init__(self, path: str, cache_size: int = 256):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a binary score snapshot")
+        header_start = len(MAGIC) + _LENGTH.size
+        (header_length,) = _LENGTH.unpack_from(self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[header_start:header_start + header_length].decode("utf-8"))
+        body = header_start + header_length
+        body += -body % ALIGN
+
+        self.student_ids: List[str] = header["students"]
+        self.meta: Dict = header.get("meta", {})
+        self._aggregate_rows = header.get("aggregates")
+        self.tables: Dict[str, SubjectTable] = {}
+        n_students = len(self.student_ids)
+        for section in header["subjects"]:
+            paths = [tuple(path) for path in section["items"]]
+            counts = np.frombuffer(self._mmap, dtype="<u4", count=n_students, offset=body + section["counts"])
+            data = np.frombuffer(self._mmap, dtype=np.uint8, count=section["rounds"] * len(paths),
+                                 offset=body + section["data"]).reshape(section["rounds"], len(paths))
+            self.tables[section["name"]] = SubjectTable(section["name"], paths, counts, data, cache_size)
+
+    def histories(self) -> Dict[str, Dict[str, MappedRounds]]:
+        """student_id -> {subject: MappedRounds} for every student with at least one round."""
+        histories: Dict[str, Dict[str, MappedRounds]] = {}
+        for table in self.tables.values():
+            for index in np.nonzero(table.counts)[0].tolist():
+                start = int(table.starts[index])
+                histories.setdefault(self.student_ids[index], {})[table.subject] = MappedRounds(
+                    table, start, start + int(table.counts[index]))
+        return histories
+
+    def aggregates(self) -> ScoreAggregates:
+        """ScoreAggregates of every mapped round.
+
+        Read from the header when the writer stored them; otherwise computed
+        column-wise from the map without decoding any round.
+        """
+        aggregates = ScoreAggregates()
+        if self._aggregate_rows is not None:
+            for scope, subject, path, count, total, total_sq, histogram in self._aggregate_rows:
+                aggregates.stats[scope].setdefault(subject, {})[tuple(path)] = ItemStats(
+                    count, total, total_sq, histogram)
+            return aggregates
+        levels = np.arange(256, dtype=np.int64)
+        for table in self.tables.values():
+            latest_rows = (table.starts + table.counts - 1)[table.counts > 0]
+            for scope, block in (("history", table.data), ("current", table.data[latest_rows])):
+                stats = aggregates.stats[scope].setdefault(table.subject, {})
+                for column, path in enumerate(table.paths):
+                    histogram = np.bincount(block[:, column], minlength=256)
+                    histogram[0] = 0
+                    count = int(histogram.sum())
+                    if count:
+                        stats[path] = ItemStats(count, int(histogram @ levels), int(histogram @ (levels * levels)),
+                                                histogram[1:6].tolist())
+        return aggregates
+
+
+def _encode(scores: Dict, index: Dict[Tuple[str, ...], int], row: np.ndarray):
+    for path, value in iter_leaves(scores):
+        if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 255:
+            raise ValueError(f"Score {value!r} at {'/'.join(path)} cannot be stored in a binary snapshot")
+        row[index[path]] = value
+
+
+def write_snapshot(path: str, histories: Dict[str, Dict[str, Sequence]], meta: Optional[Dict] = None,
+                   aggregates: Optional[ScoreAggregates] = None):
+    """Atomically write {student_id: {subject: [rounds]}} as a binary snapshot.
+
+    Rounds that are still mapped from another snapshot are copied row-wise
+    with numpy; only rounds held as dicts are encoded one by one. Pass the
+    histories' aggregates to store them in the header, so readers need not
+    scan the rounds to rebuild them.
+    """
+    student_ids = list(histories)
+    subjects: Dict[str, None] = {}
+    for subject_rounds in histories.values():
+        subjects.update(dict.fromkeys(subject_rounds))
+
+    sections = []
+    blocks = []
+    offset = 0
+    for subject in subjects:
+        per_student = [histories[sid].get(subject) or () for sid in student_ids]
+        index: Dict[Tuple[str, ...], int] = {}
+        for rounds in per_student:
+            if isinstance(rounds, MappedRounds):
+                for item_path in rounds.table.paths:
+                    index.setdefault(item_path, len(index))
+            for scores in (rounds.tail if isinstance(rounds, MappedRounds) else rounds):
+                for item_path, _ in iter_leaves(scores):
+                    index.setdefault(item_path, len(index))
+
+        counts = np.array([len(rounds) for rounds in per_student], dtype="<u4")
+        data = np.zeros((int(counts.sum()), len(index)), dtype=np.uint8)
+        row = 0
+        for rounds in per_student:
+            tail = rounds
+            if isinstance(rounds, MappedRounds):
+                mapped = rounds.stop - rounds.start
+                columns = [index[item_path] for item_path in rounds.table.paths]
+                data[row:row + mapped, columns] = rounds.table.data[rounds.start:rounds.stop]
+                row += mapped
+                tail = rounds.tail
+            for scores in tail:
+                _encode(scores, index, data[row])
+                row += 1
+
+        counts_bytes = counts.tobytes()
+        data_bytes = data.tobytes()
+        sections.append({"name": subject, "items": list(index), "rounds": len(data),
+                         "counts": offset, "data": offset + len(counts_bytes) + len(_padding(len(counts_bytes)))})
+        blocks += [counts_bytes, _padding(len(counts_bytes)), data_bytes, _padding(len(data_bytes))]
+        offset = sections[-1]["data"] + len(data_bytes) + len(_padding(len(data_bytes)))
+
+    header = {"students": student_ids, "subjects": sections, "meta": meta or {}}
+    if aggregates is not None:
+        header["aggregates"] = [
+            [scope, subject, list(item_path), stats.count, stats.total, stats.total_sq, stats.histogram]
+            for scope, subjects_stats in aggregates.stats.items()
+            for subject, items in subjects_stats.items()
+            for item_path, stats in items.items() if stats.count
+        ]
+    header = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix = MAGIC + _LENGTH.pack(len(header)) + header
+    atomic_write_bytes(path, [prefix, _padding(len(prefix))] + blocks)
+
+
+def json_to_binary(json_path: str, binary_path: str):
+    with open(json_path, "r", encoding="utf-8") as f:
+        scores_data = json.load(f)
+    meta = scores_data.pop(META_KEY, None)
+    write_snapshot(binary_path, scores_data, meta)
+
+
+def binary_to_json(binary_path: str, json_path: str):
+    snapshot = BinarySnapshot(binary_path)
+    histories = snapshot.histories()
+    scores_data = {sid: {subject: list(rounds) for subject, rounds in histories.get(sid, {}).items()}
+                   for sid in snapshot.student_ids}
+    if snapshot.meta:
+        scores_data[META_KEY] = snapshot.meta
+    atomic_write_text(json_path, json.dumps(scores_data, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python binary_snapshot.py SOURCE DEST  (scores.json -> scores.bin or back)")
+    source, dest = sys.argv[1:]
+    with open(source, "rb") as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    (binary_to_json if is_binary else json_to_binary)(source, dest)
+    print(f"{source} ({os.path.getsize(source):,} bytes) -> {dest} ({os.path.getsize(dest):,} bytes)")
@@ -0,0 +1,151 @@
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schema import CompiledSchema
+
+ID_COLUMN = "student_id"
+NAME_COLUMN = "name"
+CLASS_COLUMN = "class"  # optional in roster files
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+
+class ImportReport(NamedTuple):
+    rows: int  # data rows read from both files
+    students: int  # roster rows committed
+    rounds: int  # score rounds committed
+    errors: List[Tuple[str, int, str]]  # (file, line or 0, message); nothing is committed if non-empty
+    elapsed: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def item_column(path: Tuple[str, ...]) -> str:
+    """Wide-file column header for one schema item, e.g. "专业模块/古文/字词理解"."""
+    return "/".join(path)
+
+
+def scores_template(compiled: CompiledSchema, subject: str) -> str:
+    """CSV header row for a wide scores file of subject."""
+    return ",".join([ID_COLUMN] + [item_column(entry.path) for entry in compiled.items(subject)]) + "\n"
+
+
+def read_chunks(source, chunksize: int = 1000) -> Iterator[pd.DataFrame]:
+    """Stream a CSV (or Excel) file as string DataFrames of at most chunksize rows.
+
+    source is a path or a file-like object with a .name, such as a Streamlit
+    UploadedFile. Excel files cannot be streamed by pandas, so they are read
+    whole (this needs openpyxl) and then sliced.
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if os.path.splitext(name)[1].lower() in EXCEL_EXTENSIONS:
+        df = pd.read_excel(source, dtype=str, keep_default_na=False)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunksize,
+                               encoding="utf-8-sig")
+
+
+def parse_roster(source, chunksize: int = 1000) -> Tuple[List[Tuple[str, str, str]], List[Tuple[int, str]], int]:
+    """(student_id, name, class) rows, (line, message) errors and the row count of a roster file."""
+    students = []
+    errors = []
+    seen = set()
+    rows = 0
+    for chunk in read_chunks(source, chunksize):
+        missing = [column for column in (ID_COLUMN, NAME_COLUMN) if column not in chunk.columns]
+        if missing:
+            return [], [(1, f"缺少列：{', '.join(missing)}")], rows
+        first_line = rows + 2  # header is line 1
+        rows += len(chunk)
+        ids = chunk[ID_COLUMN].str.strip()
+        names = chunk[NAME_COLUMN].str.strip()
+        classes = chunk[CLASS_COLUMN].str.strip() if CLASS_COLUMN in chunk.columns else [""] * len(chunk)
+        for offset, (student_id, name, class_name) in enumerate(zip(ids, names, classes)):
+            line = first_line + offset
+            if not student_id or not name:
+                errors.append((line, "学号和姓名不能为空"))
+            elif student_id in seen:
+                errors.append((line, f"学号 {student_id} 重复"))
+            else:
+                seen.add(student_id)
+                students.append((student_id, name, class_name))
+    return students, errors, rows
+
+
+def parse_scores(source, compiled: CompiledSchema, subject: str, chunksize: int = 1000
+                 ) -> Tuple[List[Tuple[str, str, Dict]], List[Tuple[int, str]], int]:
+    """(student_id, subject, scores) rounds, (line, message) errors and the row count of a wide scores file.
+
+    The file has a student_id column plus one column per schema item (see
+    scores_template). Cells must be integers 1-5; blank cells leave the item
+    unscored. A student may appear on several rows, oldest round first.
+    """
+    items = compiled.items(subject)
+    columns = [item_column(entry.path) for entry in items]
+    rounds = []
+    errors = []
+    rows = 0
+    for chunk in read_chunks(source, chunksize):
+        missing = [column for column in [ID_COLUMN] + columns if column not in chunk.columns]
+        if missing:
+            return [], [(1, f"缺少列：{', '.join(missing[:5])}{' 等' if len(missing) > 5 else ''}")], rows
+        first_line = rows + 2
+        rows += len(chunk)
+
+        raw = chunk[columns].to_numpy(dtype=str)
+        values = pd.to_numeric(pd.Series(raw.ravel()), errors="coerce").to_numpy(dtype=float).reshape(raw.shape)
+        blank = np.char.str_len(np.char.strip(raw)) == 0
+        valid = blank | np.isin(values, (1, 2, 3, 4, 5))
+        bad_rows = ~valid.all(axis=1)
+        empty_rows = blank.all(axis=1)
+        ids = chunk[ID_COLUMN].str.strip().tolist()
+
+        for offset, student_id in enumerate(ids):
+            line = first_line + offset
+            if not student_id:
+                errors.append((line, "学号不能为空"))
+            elif bad_rows[offset]:
+                column = columns[int(np.argmin(valid[offset]))]
+                errors.append((line, f"{column} 的分数必须是 1-5 的整数"))
+            elif empty_rows[offset]:
+                errors.append((line, "没有任何分数"))
+            else:
+                row = [None if blank[offset, i] else int(v) for i, v in enumerate(values[offset])]
+                rounds.append((student_id, subject, compiled.nest(subject, row, skip=None)))
+    return rounds, errors, rows
+
+
+def bulk_import(db, compiled: CompiledSchema, roster=None, scores=None, subject: Optional[str] = None,
+                chunksize: int = 1000) -> ImportReport:
+    """Validate a roster file and/or a wide scores file, then commit both with one db.bulk_import call.
+
+    Imported rounds go straight into history (like update_scores), not into
+    the pending queue. If any row fails validation nothing is written.
+    """
+    started = time.perf_counter()
+    students, rounds, errors = [], [], []
+    rows = 0
+    if roster is not None:
+        students, roster_errors, count = parse_roster(roster, chunksize)
+        errors.extend(("名单", line, message) for line, message in roster_errors)
+        rows += count
+    if scores is not None:
+        rounds, score_errors, count = parse_scores(scores, compiled, subject, chunksize)
+        errors.extend(("成绩", line, message) for line, message in score_errors)
+        rows += count
+        known = set(db.students).union(student[0] for student in students)
+        unknown = {sid for sid, _, _ in rounds if sid not in known}
+        if unknown:
+            errors.extend(("成绩", 0, f"学号 {sid} 不在名单中") for sid in sorted(unknown))
+    if not errors and (students or rounds):
+        db.bulk_import(students, rounds)
+    committed = not errors
+    return ImportReport(rows, len(students) if committed else 0, len(rounds) if committed else 0,
+                        errors, time.perf_counter() - started)
@@ -0,0 +1,69 @@
+import threading
+import weakref
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from schema import CompiledSchema
+from score_matrix import ScoreMatrix
+
+
+class ClassOverview(NamedTuple):
+    subject: str
+    student_ids: List[str]  # students with at least one round, in roster order
+    latest: np.ndarray  # (students, items) float, NaN where unscored
+    mean: np.ndarray  # (items,) class mean of the latest round
+    median: np.ndarray  # (items,) class median of the latest round
+    improvement: np.ndarray  # (students,) mean latest-minus-previous delta, NaN without a previous round
+    most_improved: List[Tuple[str, float]]
+    most_declined: List[Tuple[str, float]]
+
+
+# database instance -> {subject: (db.version at compute time, overview)}
+_overview_cache = weakref.WeakKeyDictionary()
+_overview_lock = threading.Lock()
+
+
+def compute_class_overview(db, compiled: CompiledSchema, subject: str, top_n: int = 5) -> ClassOverview:
+    """Aggregate every student's latest and previous round in one vectorised pass."""
+    histories = {}
+    for sid in db.students:
+        latest = db.get_latest_scores(sid, subject)
+        if latest is None:
+            continue
+        previous = db.get_previous_scores(sid, subject)
+        histories[sid] = [previous, latest] if previous is not None else [latest]
+    matrix = ScoreMatrix.from_histories(histories, compiled, subject)
+
+    latest = matrix.as_float(matrix.latest())
+    deltas = matrix.deltas()
+    has_delta = ~np.isnan(deltas).all(axis=1) if len(matrix.student_ids) else np.zeros(0, dtype=bool)
+    improvement = np.full(len(matrix.student_ids), np.nan)
+    if has_delta.any():
+        improvement[has_delta] = np.nanmean(deltas[has_delta], axis=1)
+    ranked = [(matrix.student_ids[i], float(improvement[i])) for i in np.nonzero(has_delta)[0]]
+    ranked.sort(key=lambda pair: pair[1], reverse=True)
+
+    return ClassOverview(
+        subject=subject,
+        student_ids=matrix.student_ids,
+        latest=latest,
+        mean=matrix.class_mean(),
+        median=matrix.percentiles(50),
+        improvement=improvement,
+        most_improved=[pair for pair in ranked[:top_n] if pair[1] > 0],
+        most_declined=[pair for pair in reversed(ranked[-top_n:]) if pair[1] < 0],
+    )
+
+
+def get_class_overview(db, compiled: CompiledSchema, subject: str) -> ClassOverview:
+    """compute_class_overview, cached per database instance until its next write."""
+    version = db.version
+    with _overview_lock:
+        cached = _overview_cache.get(db, {}).get(subject)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    overview = compute_class_overview(db, compiled, subject)
+    with _overview_lock:
+        _overview_cache.setdefault(db, {})[subject] = (version, overview)
+    return overview
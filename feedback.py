@@ -0,0 +1,342 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from feedback_cache import FeedbackCache
+from llm_hub import DEFAULT_SYSTEM_PROMPT, PROVIDER_MODELS, ProviderRouter, default_router
+from schema import CompiledSchema
+
+_EMPTY: Dict = {}
+
+# Legend for compact score details, only emitted when there is a previous round to compare with
+COMPACT_LEGEND = "（↑进步，↓下降，未标注的项目与上次持平）"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough, deliberately high token count for budgeting prompts.
+
+    CJK characters and full-width punctuation count one token each (current
+    tokenizers use 0.6-1 per character); everything else counts one token per
+    four characters.
+    """
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + (len(text) - wide + 3) // 4
+
+
+def compact_template(template: str) -> str:
+    """The template with indentation and blank lines dropped; the wording and the markdown layout are kept."""
+    return "\n".join(line.strip() for line in template.splitlines() if line.strip())
+
+
+# Appended to the subject template when several students share one request
+BATCH_INSTRUCTIONS = """
+以上按"学生 学号"分段列出了 {count} 名学生的打分。请为每名学生分别按上述格式生成反馈，并且只输出一个 JSON 对象，不要输出其他内容：
+{{"reports": [{{"student_id": "学号", "feedback": "该学生的完整反馈"}}]}}
+reports 中每名学生恰好出现一次，student_id 与上面的学号一致。
+"""
+
+
+def parse_batch_reply(reply: str, student_ids: Iterable[str]) -> Dict[str, str]:
+    """student_id -> feedback for every well-formed entry of a batched JSON reply.
+
+    Tolerates code fences and text around the JSON object; entries with an
+    unknown or repeated id, or without non-empty feedback text, are left out
+    so the caller can regenerate those students one by one.
+    """
+    wanted = set(student_ids)
+    start, end = reply.find("{"), reply.rfind("}")
+    try:
+        data = json.loads(reply[start:end + 1]) if start != -1 else None
+    except ValueError:
+        return {}
+    reports = data.get("reports") if isinstance(data, dict) else None
+    parsed: Dict[str, str] = {}
+    for entry in reports if isinstance(reports, list) else ():
+        if not isinstance(entry, dict):
+            continue
+        student_id = str(entry.get("student_id", "")).strip()
+        feedback = entry.get("feedback")
+        if student_id in wanted and student_id not in parsed and isinstance(feedback, str) and feedback.strip():
+            parsed[student_id] = feedback.strip()
+    return parsed
+
+
+class FeedbackResult(NamedTuple):
+    student_id: str
+    feedback: Optional[str]
+    error: Optional[Exception]
+    elapsed: float
+
+
+class FeedbackGenerator:
+    def __init__(self, schema: Dict, prompt_templates: Dict, cache: Optional[FeedbackCache] = None,
+                 router: Optional[ProviderRouter] = None, max_prompt_tokens: Optional[int] = None):
+        self.schema = schema
+        self.compiled = CompiledSchema(schema)
+        self._lines: Dict[tuple, str] = {}
+        self.prompt_templates = prompt_templates
+        self._compact_templates: Dict[str, str] = {}
+        self.cache = cache
+        # Estimated-token budget per request (estimate_tokens); None means unlimited
+        self.max_prompt_tokens = max_prompt_tokens
+        # Every call goes through the router; with auto_route=False it only uses the chosen provider
+        self.router = router if router is not None else default_router
+
+    def format_score_details(self, subject: str, scores: Dict, previous_scores: Optional[Dict],
+                             compact: bool = False) -> str:
+        if compact:
+            return self._compact_score_details(subject, scores, previous_scores)
+        details = []
+        category = None
+        for run_category, container_path, items in self.compiled.container_runs(subject):
+            if run_category != category:
+                category = run_category
+                details.append(f"{category}：")
+            current = scores
+            previous = previous_scores or None
+            for key in container_path:
+                current = current.get(key, _EMPTY)
+                if previous is not None:
+                    previous = previous.get(key, _EMPTY)
+            for item in items:
+                current_score = current.get(item, 3)
+                prev_score = previous.get(item) if previous is not None else None
+                key = (item, current_score, prev_score)
+                line = self._lines.get(key)
+                if line is None:
+                    line = f"- {item}：{current_score}/5"
+                    if prev_score is not None:
+                        change = "进步" if current_score > prev_score else "下降" if current_score < prev_score else "持平"
+                        line += f"（与上次相比：{change}）"
+                    # Scores are small ints, so the distinct lines per item are few
+                    if len(self._lines) < 100000:
+                        self._lines[key] = line
+                details.append(line)
+        return "\n".join(details)
+
+    def _compact_score_details(self, subject: str, scores: Dict, previous_scores: Optional[Dict]) -> str:
+        """One line per category with items grouped by score, best first; only changed items carry ↑/↓."""
+        by_category: Dict[str, Dict] = {}
+        for category, container_path, items in self.compiled.container_runs(subject):
+            current = scores
+            previous = previous_scores or None
+            for key in container_path:
+                current = current.get(key, _EMPTY)
+                if previous is not None:
+                    previous = previous.get(key, _EMPTY)
+            by_score = by_category.setdefault(category, {})
+            for item in items:
+                current_score = current.get(item, 3)
+                prev_score = previous.get(item) if previous is not None else None
+                mark = "" if prev_score is None or prev_score == current_score else "↑" if current_score > prev_score else "↓"
+                by_score.setdefault(current_score, []).append(item + mark)
+        details = [COMPACT_LEGEND] if previous_scores else []
+        for category, by_score in by_category.items():
+            bands = sorted(by_score.items(), reverse=True)
+            details.append(f"{category}：" + "；".join(f"{score}分 {'、'.join(names)}" for score, names in bands))
+        return "\n".join(details)
+
+    def template(self, subject: str, compact: bool = False) -> str:
+        if not compact:
+            return self.prompt_templates[subject]
+        template = self._compact_templates.get(subject)
+        if template is None:
+            template = self._compact_templates[subject] = compact_template(self.prompt_templates[subject])
+        return template
+
+    def fits_budget(self, prompt: str) -> bool:
+        return self.max_prompt_tokens is None or estimate_tokens(prompt) <= self.max_prompt_tokens
+
+    def render_prompt(self, student_id: str, subject: str, scores: Dict, db,
+                      compact: bool = False) -> Tuple[str, str]:
+        """(score details, prompt) for one student.
+
+        A verbose prompt over max_prompt_tokens is re-rendered compact; a
+        prompt that is still over budget raises ValueError.
+        """
+        previous_scores = db.get_previous_scores(student_id, subject)
+        for mode in (True,) if compact else (False, True):
+            details = self.format_score_details(subject, scores, previous_scores, mode)
+            prompt = self.template(subject, mode).format(score_details=details)
+            if self.fits_budget(prompt):
+                return details, prompt
+        raise ValueError(f"Prompt for student {student_id} is ~{estimate_tokens(prompt)} tokens, "
+                         f"over the budget of {self.max_prompt_tokens}")
+
+    def build_prompt(self, student_id: str, subject: str, scores: Dict, db, compact: bool = False) -> str:
+        return self.render_prompt(student_id, subject, scores, db, compact)[1]
+
+    def build_batch_prompt(self, subject: str, details: Dict[str, str], compact: bool = False) -> str:
+        """One prompt for several students: the subject template once, each student's score details, JSON reply format."""
+        blocks = "\n\n".join(f"学生 {student_id}：\n{text}" for student_id, text in details.items())
+        return (self.template(subject, compact).format(score_details=blocks)
+                + BATCH_INSTRUCTIONS.format(count=len(details)))
+
+    def batch_chunks(self, subject: str, details: Dict[str, str], compact: bool = False) -> List[List[str]]:
+        """Split the students into consecutive runs whose batched prompt fits max_prompt_tokens."""
+        if self.max_prompt_tokens is None:
+            return [list(details)]
+        chunks: List[List[str]] = []
+        chunk: List[str] = []
+        for student_id in details:
+            candidate = chunk + [student_id]
+            if chunk and not self.fits_budget(
+                    self.build_batch_prompt(subject, {sid: details[sid] for sid in candidate}, compact)):
+                chunks.append(chunk)
+                candidate = [student_id]
+            chunk = candidate
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _cached(self, provider: str, prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(provider, PROVIDER_MODELS.get(provider, provider), DEFAULT_SYSTEM_PROMPT, prompt)
+
+    def _store(self, provider: str, prompt: str, feedback: str):
+        if self.cache is not None and feedback:  # never serve an empty reply from the cache
+            self.cache.put(provider, PROVIDER_MODELS.get(provider, provider), DEFAULT_SYSTEM_PROMPT, prompt, feedback)
+
+    def generate_feedback(self, student_id: str, subject: str, scores: Dict, db, provider: str, api_key: str,
+                          auto_route: bool = True, hedge: bool = False, compact: bool = False) -> str:
+        prompt = self.build_prompt(student_id, subject, scores, db, compact)
+        feedback = self._cached(provider, prompt)
+        if feedback is None:
+            served_by, feedback = self.router.chat(prompt, preferred=provider, api_key=api_key,
+                                                   failover=auto_route, hedge=hedge, with_provider=True)
+            self._store(served_by, prompt, feedback)
+        return feedback
+
+    def generate_feedback_stream(self, student_id: str, subject: str, scores: Dict, db, provider: str,
+                                 api_key: str, auto_route: bool = True, hedge: bool = False,
+                                 compact: bool = False) -> Iterator[str]:
+        """Like generate_feedback, but yields the feedback text incrementally as tokens arrive.
+
+        A cache hit is yielded as a single chunk; a fully streamed reply is cached
+        under the provider that served it.
+        The router only fails over or hedges before the first token arrives.
+        """
+        prompt = self.build_prompt(student_id, subject, scores, db, compact)
+        feedback = self._cached(provider, prompt)
+        if feedback is not None:
+            yield feedback
+            return
+        chunks = []
+        stream = self.router.chat_stream(prompt, preferred=provider, api_key=api_key, failover=auto_route,
+                                         hedge=hedge)
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._store(stream.provider, prompt, "".join(chunks))
+
+    async def agenerate_feedback_batch(self, student_ids: Iterable[str], subject: str, db, provider: str,
+                                       api_key: str, scores_by_student: Optional[Dict[str, Dict]] = None,
+                                       concurrency: int = 8, timeout: float = 30, auto_route: bool = True,
+                                       hedge: bool = False, batch_size: int = 1, compact: bool = False):
+        """Generate feedback for many students concurrently, yielding FeedbackResult as each completes.
+
+        At most `concurrency` requests are in flight; each provider's rate limiter
+        in llm_hub further caps the request rate, and with auto_route requests go
+        to the fastest healthy provider and fail over to the next. With hedge, a
+        request slower than its provider's p95 gets a budgeted duplicate. Scores default to each
+        student's latest round in db. Failures are reported per student in
+        FeedbackResult.error instead of aborting the batch.
+
+        With batch_size > 1, up to batch_size uncached students share one
+        request (build_batch_prompt) asking for a JSON reply; students missing
+        from or malformed in the reply, or whose batched request failed, are
+        regenerated with single requests.
+        Each student's feedback is cached under their single-student prompt and
+        the provider that actually answered, which with auto_route need not be
+        the preferred one.
+
+        With compact, prompts use the compact score encoding and template.
+        Batches are split so every request fits max_prompt_tokens.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        async def chat(prompt: str, json_mode: bool = False) -> Tuple[str, str]:
+            """(name of the provider that answered, reply)."""
+            return await self.router.achat(prompt, preferred=provider, api_key=api_key, timeout=timeout,
+                                           failover=auto_route, executor=executor, hedge=hedge,
+                                           json_mode=json_mode, with_provider=True)
+
+        async def generate_group(group: List[str]) -> List[FeedbackResult]:
+            async with semaphore:
+                start = time.perf_counter()
+                results = []
+                pending = {}  # student_id -> (score details, single-student prompt)
+                for student_id in group:
+                    try:
+                        if scores_by_student is not None:
+                            scores = scores_by_student.get(student_id)
+                        else:
+                            scores = db.get_latest_scores(student_id, subject)
+                        if scores is None:
+                            raise ValueError(f"Student {student_id} has no {subject} scores")
+                        details, prompt = self.render_prompt(student_id, subject, scores, db, compact)
+                        feedback = self._cached(provider, prompt)
+                    except Exception as e:
+                        results.append(FeedbackResult(student_id, None, e, time.perf_counter() - start))
+                        continue
+                    if feedback is not None:
+                        results.append(FeedbackResult(student_id, feedback, None, time.perf_counter() - start))
+                    else:
+                        pending[student_id] = (details, prompt)
+
+                details_by_student = {sid: details for sid, (details, _) in pending.items()}
+                for chunk in self.batch_chunks(subject, details_by_student, compact) if len(pending) > 1 else ():
+                    if len(chunk) < 2:
+                        continue
+                    batch_prompt = self.build_batch_prompt(
+                        subject, {sid: details_by_student[sid] for sid in chunk}, compact)
+                    try:
+                        served_by, reply = await chat(batch_prompt, json_mode=True)
+                    except Exception:
+                        # The batched request itself failed: its students stay pending for single requests
+                        continue
+                    for student_id, feedback in parse_batch_reply(reply, chunk).items():
+                        self._store(served_by, pending.pop(student_id)[1], feedback)
+                        results.append(FeedbackResult(student_id, feedback, None, time.perf_counter() - start))
+
+                for student_id, (_, prompt) in pending.items():
+                    try:
+                        served_by, feedback = await chat(prompt)
+                        self._store(served_by, prompt, feedback)
+                        results.append(FeedbackResult(student_id, feedback, None, time.perf_counter() - start))
+                    except Exception as e:
+                        results.append(FeedbackResult(student_id, None, e, time.perf_counter() - start))
+                return results
+
+        student_ids = list(student_ids)
+        batch_size = max(1, batch_size)
+        groups = [student_ids[i:i + batch_size] for i in range(0, len(student_ids), batch_size)]
+        tasks = [asyncio.ensure_future(generate_group(group)) for group in groups]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def generate_feedback_batch(self, student_ids: Iterable[str], subject: str, db, provider: str,
+                                api_key: str, **kwargs) -> Iterator[FeedbackResult]:
+        """Synchronous wrapper around agenerate_feedback_batch for Streamlit and scripts."""
+        loop = asyncio.new_event_loop()
+        results = self.agenerate_feedback_batch(student_ids, subject, db, provider, api_key, **kwargs)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
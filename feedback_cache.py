@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+CACHE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS feedback_cache (
+    key TEXT PRIMARY KEY,
+    feedback TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_cache_accessed ON feedback_cache (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_feedback_cache_created ON feedback_cache (created_at);
+"""
+
+
+def prompt_key(provider: str, model: str, system_prompt: str, user_prompt: str) -> str:
+    """sha256 over the exact request inputs; identical prompts share one entry."""
+    payload = json.dumps([provider, model, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FeedbackCache:
+    """Persistent content-addressed cache of generated feedback.
+
+    Entries older than max_age_seconds are treated as misses and purged;
+    when the stored feedback exceeds max_bytes or max_entries, the least
+    recently used entries are evicted. Entry and byte totals are kept in
+    memory, so puts and stats() do not scan the table; every
+    sync_interval_seconds a put purges expired entries and re-counts, which
+    also picks up entries written by other processes.
+    """
+
+    def __init__(self, db_file: str = "feedback_cache.db", max_entries: int = 10000,
+                 max_bytes: int = 50 * 1024 * 1024, max_age_seconds: Optional[float] = 30 * 24 * 3600,
+                 sync_interval_seconds: float = 3600):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(CACHE_SCHEMA_SQL)
+        self._entries, self._bytes = self._totals()
+        self._next_sync = time.monotonic() + sync_interval_seconds
+
+    def get(self, provider: str, model: str, system_prompt: str, user_prompt: str) -> Optional[str]:
+        key = prompt_key(provider, model, system_prompt, user_prompt)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT feedback, created_at FROM feedback_cache WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE feedback_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, provider: str, model: str, system_prompt: str, user_prompt: str, feedback: str):
+        key = prompt_key(provider, model, system_prompt, user_prompt)
+        size = len(feedback.encode("utf-8"))
+        now = time.time()
+        with self._lock, self.conn:
+            replaced = self.conn.execute("SELECT size FROM feedback_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO feedback_cache (key, feedback, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, feedback, size, now, now))
+            if replaced is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - replaced[0]
+            self._evict(now)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.max_age_seconds is not None and now - created_at > self.max_age_seconds
+
+    def _totals(self):
+        """(entries, bytes) counted from the table."""
+        return self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM feedback_cache").fetchone()
+
+    def _evict(self, now: float):
+        if time.monotonic() >= self._next_sync:
+            # Expired entries already read as misses, so purging them can wait for the periodic re-count
+            if self.max_age_seconds is not None:
+                cursor = self.conn.execute("DELETE FROM feedback_cache WHERE created_at < ?",
+                                           (now - self.max_age_seconds,))
+                self.evictions += cursor.rowcount
+            self._entries, self._bytes = self._totals()
+            self._next_sync = time.monotonic() + self.sync_interval_seconds
+        count, total = self._entries, self._bytes
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from least recently used until both limits hold again
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM feedback_cache ORDER BY accessed_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self.conn.executemany("DELETE FROM feedback_cache WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+        self._entries, self._bytes = count, total
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM feedback_cache")
+            self._entries, self._bytes = 0, 0
+
+    def stats(self) -> dict:
+        """Counters and the running entry/byte totals; reads no rows."""
+        with self._lock:
+            count, total = self._entries, self._bytes
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,146 @@
+import os
+import threading
+import uuid
+from typing import Iterable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def fsync_dir(path: str):
+    """Flush a directory entry so a completed rename survives a crash."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: str, text: str):
+    """Write text to a unique temp file, fsync it, then atomically rename it over path.
+
+    Readers see either the old or the new file, never a truncated one.
+    """
+    atomic_write_bytes(path, [text.encode("utf-8")])
+
+
+def atomic_write_bytes(path: str, chunks: Iterable[bytes]):
+    """atomic_write_text for binary content, written chunk by chunk."""
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(os.path.dirname(path))
+
+
+class FileLock:
+    """Exclusive advisory lock on path, shared by threads and processes.
+
+    Reentrant within a thread; other threads of the same process wait on an
+    in-process lock first, other processes on flock()/msvcrt.locking().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                os.close(fd)
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class GroupCommit:
+    """Coalesce fsync() calls from concurrent writers of one append-only file.
+
+    Writers append under their own lock, take a ticket with written(), release
+    that lock and then call wait_durable(). One waiter at a time runs fsync on
+    behalf of everyone whose data was written before it started, so N
+    concurrent writers cost far fewer than N fsyncs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fsyncs = 0
+        self._cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+
+    def written(self) -> int:
+        with self._cond:
+            self._written += 1
+            return self._written
+
+    def wait_durable(self, ticket: int):
+        with self._cond:
+            while self._synced < ticket:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                target = self._written
+                self._cond.release()
+                try:
+                    self._fsync()
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced = max(self._synced, target)
+                self.fsyncs += 1
+
+    def _fsync(self):
+        # fsync flushes the inode, so any descriptor of the file will do
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,139 @@
+"""Stream the full evaluation history as one row per (student, subject, round, item).
+
+    python history_export.py history.parquet --storage log --feedback
+    python history_export.py history.csv --subject 语文
+    python history_export.py history.csv --snapshot-format binary
+"""
+import argparse
+import csv
+import json
+import os
+from typing import Iterable, Iterator, Optional, Tuple
+
+from report_store import ReportStore
+from schema import CompiledSchema
+
+COLUMNS = ("student_id", "name", "subject", "round", "category", "subcategory", "item", "score")
+FEEDBACK_COLUMN = "feedback"
+
+
+def iter_history_rows(db, compiled: CompiledSchema, subjects: Optional[Iterable[str]] = None,
+                      reports: Optional[ReportStore] = None) -> Iterator[Tuple]:
+    """Yield COLUMNS tuples (plus feedback text if a report store is given) for every scored item.
+
+    Works through one student's history at a time, so with the SQLite backend
+    memory stays bounded by the largest single history. round is 1 for the
+    oldest round. Items that are no longer in the schema are skipped.
+    Reports are fetched one student at a time as well; rounds without a
+    stored report get None.
+    """
+    subjects = list(subjects) if subjects is not None else list(compiled.tables)
+    for student_id, info in list(db.students.items()):
+        name = info["name"]
+        student_reports = reports.for_student(student_id) if reports is not None else None
+        for subject in subjects:
+            items = compiled.items(subject)
+            for round_number, scores in enumerate(db.get_history(student_id, subject), start=1):
+                extra = ()
+                if student_reports is not None:
+                    extra = (student_reports.get((subject, round_number)),)
+                for entry, score in zip(items, compiled.values(subject, scores)):
+                    if score is not None:
+                        yield (student_id, name, subject, round_number, entry.category, entry.subcategory,
+                               entry.item, score) + extra
+
+
+def export_csv(db, compiled: CompiledSchema, path: str, subjects: Optional[Iterable[str]] = None,
+               reports: Optional[ReportStore] = None) -> int:
+    """Write the history to a UTF-8 (with BOM, for Excel) CSV file; returns the number of rows."""
+    header = COLUMNS + ((FEEDBACK_COLUMN,) if reports is not None else ())
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in iter_history_rows(db, compiled, subjects, reports):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_parquet(db, compiled: CompiledSchema, path: str, subjects: Optional[Iterable[str]] = None,
+                   reports: Optional[ReportStore] = None, batch_rows: int = 65536) -> int:
+    """Write the history to a Parquet file in row groups of batch_rows; returns the number of rows.
+
+    Needs pyarrow (installed with streamlit).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = [
+        pa.field("student_id", pa.string()),
+        pa.field("name", pa.string()),
+        pa.field("subject", pa.string()),
+        pa.field("round", pa.int32()),
+        pa.field("category", pa.string()),
+        pa.field("subcategory", pa.string()),
+        pa.field("item", pa.string()),
+        pa.field("score", pa.int8()),
+    ]
+    if reports is not None:
+        fields.append(pa.field(FEEDBACK_COLUMN, pa.string()))
+    arrow_schema = pa.schema(fields)
+
+    def to_batch(rows):
+        columns = zip(*rows)
+        return pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, fields)], schema=arrow_schema)
+
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, arrow_schema, compression="zstd") as writer:
+        for row in iter_history_rows(db, compiled, subjects, reports):
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                writer.write_batch(to_batch(batch))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(to_batch(batch))
+            count += len(batch)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the evaluation history to CSV or Parquet.")
+    parser.add_argument("output", help="output file; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--storage", choices=["json", "log", "sqlite"], default="log")
+    parser.add_argument("--snapshot-format", choices=["json", "binary"],
+                        help="snapshot the app writes (STUDENT_DB_SNAPSHOT); default: binary if scores.bin exists")
+    parser.add_argument("--subject", action="append", help="subject to export (repeatable); default all")
+    parser.add_argument("--feedback", action="store_true", help="add the stored report text of each round")
+    parser.add_argument("--reports", default="reports.db", help="report store written by the app")
+    parser.add_argument("--journal", default="reports.jsonl", help="batch journal merged into the store first")
+    args = parser.parse_args()
+
+    with open("EVALUATION_SCHEMA.json", "r", encoding="utf-8") as f:
+        compiled = CompiledSchema(json.load(f))
+    if args.storage == "sqlite":
+        from sqlite_db import SQLiteStudentDatabase
+        db = SQLiteStudentDatabase()
+    else:
+        from student_db import StudentDatabase
+        snapshot_format = args.snapshot_format or os.environ.get("STUDENT_DB_SNAPSHOT") or \
+            ("binary" if os.path.exists("scores.bin") else "json")
+        db = StudentDatabase(storage=args.storage, snapshot_format=snapshot_format)
+    reports = None
+    if args.feedback:
+        reports = ReportStore(args.reports)
+        if os.path.exists(args.journal):
+            reports.import_journal(args.journal)
+
+    if os.path.splitext(args.output)[1].lower() == ".parquet":
+        count = export_parquet(db, compiled, args.output, args.subject, reports)
+    else:
+        count = export_csv(db, compiled, args.output, args.subject, reports)
+    print(f"{count} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
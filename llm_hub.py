@@ -39,6 +39,104 @@ data = {
 
 
 import requests
+import asyncio
+import functools
+import json
+import queue
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 连接池配置：每个服务端点复用一个 keep-alive 会话，连接失败及 429/5xx 自动退避重试
+HTTP_POOL_SIZE = int(os.environ.get("LLM_HTTP_POOL_SIZE", 10))
+HTTP_MAX_RETRIES = int(os.environ.get("LLM_HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("LLM_HTTP_BACKOFF_FACTOR", 0.5))
+HTTP_RETRY_AFTER_MAX = float(os.environ.get("LLM_HTTP_RETRY_AFTER_MAX", 10))  # Retry-After 最多等待的秒数
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_SYSTEM_PROMPT = "你是一个专业的助手"
+# Per-request prompt budget in estimated tokens (feedback.estimate_tokens)
+MAX_PROMPT_TOKENS = int(os.environ.get("LLM_MAX_PROMPT_TOKENS", 4000))
+# 各提供商实际调用的模型名
+PROVIDER_MODELS = {
+    "DeepSeek": os.environ.get("DEEPSEEK_MODEL", "deepseek-chat"),
+    "OpenAI": os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
+    "智谱": os.environ.get("ZHIPUAI_MODEL", "glm-4-flash"),
+}
+DEEPSEEK_URL = os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com/chat/completions")
+OPENAI_URL = os.environ.get("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+ZHIPUAI_URL = os.environ.get("ZHIPUAI_API_URL", "https://open.bigmodel.cn/api/paas/v4/chat/completions")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class CappedRetry(Retry):
+    """服务端 Retry-After 要求的等待时间最多按 HTTP_RETRY_AFTER_MAX 秒计"""
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), HTTP_RETRY_AFTER_MAX)
+
+
+def configure_http_pool(pool_size=None, max_retries=None, backoff_factor=None):
+    """
+    修改连接池参数，并关闭已有会话（下次请求时按新参数重建）
+
+    参数:
+    pool_size (int): 每个端点保持的最大连接数
+    max_retries (int): 遇到 429/5xx 或连接错误时的最大重试次数（读超时不重试）
+    backoff_factor (float): 指数退避系数，第 n 次重试前等待 backoff_factor * 2^(n-1) 秒
+    """
+    global HTTP_POOL_SIZE, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR
+    if pool_size is not None:
+        HTTP_POOL_SIZE = pool_size
+    if max_retries is not None:
+        HTTP_MAX_RETRIES = max_retries
+    if backoff_factor is not None:
+        HTTP_BACKOFF_FACTOR = backoff_factor
+    close_sessions()
+
+
+def close_sessions():
+    """关闭所有已缓存的会话及其连接"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_session(url):
+    """
+    获取某个服务端点（scheme://host:port）共享的 requests.Session
+
+    同一端点的所有请求复用 TCP/TLS 连接，省去每次调用的握手开销。
+    """
+    parts = urlsplit(url)
+    endpoint = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(endpoint)
+        if session is None:
+            retry = CappedRetry(
+                total=HTTP_MAX_RETRIES,
+                read=0,  # 请求已发出后读超时/断开不重试：生成不是幂等的，重发会再计费一次
+                other=0,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=None,  # 聊天接口是 POST，默认不重试，这里对连接错误和上述状态码显式放开
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.headers.update({"Connection": "keep-alive"})
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[endpoint] = session
+        return session
 
 # def deepseek_chat(system_prompt=None, user_prompt=None, api_key=API_KEY):
 #     """
@@ -86,51 +184,706 @@ import requests
 #         print("原始响应:", response.text)
 #         raise
 
-def zhipuai_chat(system_prompt=None, user_prompt=None, api_key=API_KEY_zhipu):
+# 未显式传入 API 密钥时，各提供商从以下环境变量读取密钥
+PROVIDER_API_KEY_ENV = {
+    "DeepSeek": "API_KEY_Deepseek",
+    "OpenAI": "OPENAI_API_KEY",
+    "智谱": "ZHIPUAI_API_KEY",
+}
+
+# 值得切换到其他提供商重试的错误：网络/HTTP 错误（重试耗尽后）以及无法解析的响应
+FAILOVER_ERRORS = (requests.exceptions.RequestException, KeyError, IndexError, ValueError)
+
+
+class ChatProvider:
     """
-    调用DeepSeek API生成对话回复
-    
+    OpenAI 兼容的聊天补全接口（DeepSeek、OpenAI、智谱均采用此格式）
+
+    参数:
+    name (str): 提供商名称，与侧边栏选项一致
+    url (str): chat/completions 接口地址
+    model (str): 实际调用的模型名
+    env_api_key (str): 未显式传入密钥时读取的环境变量名
+    """
+
+    def __init__(self, name, url, model, env_api_key=None):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.env_api_key = env_api_key
+
+    def resolve_api_key(self, api_key=None):
+        """显式传入的密钥优先，否则读取环境变量；都没有时返回 None"""
+        if api_key:
+            return api_key
+        return os.environ.get(self.env_api_key) if self.env_api_key else None
+
+    def _request(self, user_prompt, system_prompt, api_key, stream, json_mode=False):
+        if not user_prompt:
+            raise ValueError("user_prompt参数不能为空")
+        if not api_key:
+            raise ValueError("api_key参数不能为空")
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        if stream:
+            headers["Accept"] = "text/event-stream"
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "stream": stream
+        }
+        if json_mode:
+            data["response_format"] = {"type": "json_object"}  # 要求模型只输出一个 JSON 对象
+        return headers, data
+
+    def chat(self, user_prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, api_key=None, timeout=30, json_mode=False):
+        """
+        发送一次非流式请求；json_mode 为 True 时要求以 JSON 对象格式回复
+
+        返回:
+        str: 模型生成的回复内容；回复为空时抛出 ValueError
+        """
+        headers, data = self._request(user_prompt, system_prompt, self.resolve_api_key(api_key), stream=False,
+                                      json_mode=json_mode)
+        try:
+            response = get_session(self.url).post(self.url, headers=headers, json=data, timeout=timeout)
+            response.raise_for_status()  # 处理HTTP错误状态码
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+        except requests.exceptions.RequestException as e:
+            print(f"{self.name} 请求失败: {str(e)}")
+            raise
+        except KeyError as e:
+            print(f"{self.name} 解析响应失败: {str(e)}")
+            print("原始响应:", response.text)
+            raise
+        if not content:
+            raise ValueError(f"{self.name} 返回了空回复")
+        return content
+
+    def chat_stream(self, user_prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, api_key=None, timeout=30,
+                    json_mode=False):
+        """
+        以流式（SSE）方式发送请求；timeout 为建立连接及相邻两个数据块之间的最长等待时间
+
+        返回:
+        Iterator[str]: 依次产出模型生成的文本增量；流中没有任何文本时抛出 ValueError
+        """
+        headers, data = self._request(user_prompt, system_prompt, self.resolve_api_key(api_key), stream=True,
+                                      json_mode=json_mode)
+        try:
+            with get_session(self.url).post(self.url, headers=headers, json=data, timeout=timeout,
+                                            stream=True) as response:
+                response.raise_for_status()
+                empty = True
+                for content in iter_sse_content(response.iter_lines()):
+                    empty = False
+                    yield content
+                if empty:
+                    raise ValueError(f"{self.name} 返回了空回复")
+        except requests.exceptions.RequestException as e:
+            print(f"{self.name} 请求失败: {str(e)}")
+            raise
+
+
+PROVIDERS = {
+    "DeepSeek": ChatProvider("DeepSeek", DEEPSEEK_URL, PROVIDER_MODELS["DeepSeek"], PROVIDER_API_KEY_ENV["DeepSeek"]),
+    "OpenAI": ChatProvider("OpenAI", OPENAI_URL, PROVIDER_MODELS["OpenAI"], PROVIDER_API_KEY_ENV["OpenAI"]),
+    "智谱": ChatProvider("智谱", ZHIPUAI_URL, PROVIDER_MODELS["智谱"], PROVIDER_API_KEY_ENV["智谱"]),
+}
+
+
+def get_provider(model):
+    """按名称取出已注册的提供商"""
+    provider = PROVIDERS.get(model)
+    if provider is None:
+        raise ValueError(f"不支持的模型提供商: {model}")
+    return provider
+
+
+class ProviderHealth:
+    """
+    单个提供商的请求统计：成功请求延迟与错误率的指数滑动平均、最近的应答时间样本，以及熔断状态
+
+    应答时间：非流式请求为整个请求的耗时，流式请求为首个文本片段到达的耗时。
+    """
+
+    def __init__(self, window=200):
+        self.latency = None  # 秒，只统计成功的请求
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # 熔断截止时间（time.monotonic）
+        self.last_used = 0.0
+        self.samples = {"chat": deque(maxlen=window), "stream": deque(maxlen=window)}
+
+    def expected_latency(self):
+        """平均每次成功所需的时间：延迟 / 成功率"""
+        if self.latency is None:
+            return None
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+    def percentile(self, kind, q, min_samples=1):
+        """最近成功请求应答时间的 q 分位数；样本少于 min_samples 时返回 None"""
+        samples = sorted(self.samples[kind])
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class HedgeBudget:
+    """
+    对冲请求的令牌桶：每个请求存入 ratio 个令牌（最多 burst 个），每次对冲消耗 1 个
+
+    长期来看对冲请求不超过总请求数的 ratio 倍，突发时最多连续对冲 burst 次。
+    对冲的请求都以流式发送，落败的一方在收到首个文本片段时即断开连接，
+    因此每次对冲的额外开销是一次提示词加上首个片段之前生成的 token，而不是一整份回复。
+    """
+
+    def __init__(self, ratio=0.1, burst=3.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """有令牌时消耗一个并返回 True"""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class RoutedStream:
+    """
+    ProviderRouter.chat_stream 的返回值：可迭代的文本片段
+
+    请求在第一次迭代时才发出；provider 为实际应答的提供商名，选定之前为 None。
+    """
+
+    def __init__(self, start):
+        self.provider = None
+        self._chunks = start(self)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self._chunks.close()
+
+
+class ProviderRouter:
+    """
+    在多个提供商之间按实时延迟与错误率路由请求，失败时自动切换到下一个
+
+    每次请求结束后按指数滑动平均（系数 alpha）更新该提供商的延迟与错误率，
+    候选顺序按"延迟 / 成功率"从小到大排列。连续失败 max_failures 次的提供商
+    熔断 cooldown 秒，到期后重新参与排序；全部熔断时仍按原顺序兜底尝试。
+    尚无样本的提供商与首选提供商同等看待（并列时首选优先），另有 explore_rate
+    的概率先尝试最久未使用的健康提供商，使统计能跟上各家的实时表现。
+
+    对冲（hedge=True）：请求超过该提供商最近应答时间的 hedge_quantile 分位数
+    （样本不足 hedge_min_samples 时为 hedge_delay 秒）仍未应答，就向下一个
+    候选提供商（没有时为同一提供商）补发一份相同的请求，先成功的结果胜出。
+    落败的流式请求在收到首个片段时即关闭连接；非流式请求无法中途中断，
+    其结果被丢弃。对冲次数受 hedge_budget 限制。
+
+    显式传入的 api_key 只用于首选提供商，其余提供商从环境变量读取密钥，
+    没有密钥的提供商不参与路由。
+    """
+
+    def __init__(self, providers=None, alpha=0.2, max_failures=3, cooldown=30.0, explore_rate=0.05, rng=None,
+                 hedge_quantile=0.95, hedge_min_samples=20, hedge_delay=8.0, hedge_budget=None):
+        self.providers = providers if providers is not None else PROVIDERS
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.explore_rate = explore_rate
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay
+        self.hedge_budget = hedge_budget if hedge_budget is not None else HedgeBudget()
+        self.hedges = 0  # 已补发的对冲请求
+        self.hedge_wins = 0  # 对冲请求先于原请求成功的次数
+        self._rng = rng or random.Random()
+        self._health = {name: ProviderHealth() for name in self.providers}
+        self._lock = threading.Lock()
+
+    def candidates(self, preferred=None, api_key=None, failover=True):
+        """
+        本次请求依次尝试的 (提供商, 密钥) 列表
+
+        参数:
+        preferred (str): 首选提供商（侧边栏所选）
+        api_key (str): 首选提供商的密钥
+        failover (bool): 为 False 时只使用首选提供商
+        """
+        if preferred is not None and preferred not in self.providers:
+            raise ValueError(f"不支持的模型提供商: {preferred}")
+        keys = {}
+        for name, provider in self.providers.items():
+            if failover or name == preferred:
+                key = provider.resolve_api_key(api_key if name == preferred else None)
+                if key:
+                    keys[name] = key
+        if not keys:
+            raise ValueError("api_key参数不能为空")
+
+        now = time.monotonic()
+        with self._lock:
+            health = {name: self._health.setdefault(name, ProviderHealth()) for name in keys}
+            known = [h.expected_latency() for h in health.values() if h.expected_latency() is not None]
+            baseline = health[preferred].expected_latency() if preferred in health else None
+            if baseline is None:
+                baseline = min(known) if known else 0.0
+
+            def rank(name):
+                estimate = health[name].expected_latency()
+                return (estimate if estimate is not None else baseline, name != preferred)
+
+            healthy = sorted((name for name in keys if health[name].open_until <= now), key=rank)
+            tripped = sorted((name for name in keys if health[name].open_until > now),
+                             key=lambda name: health[name].open_until)
+            if len(healthy) > 1 and self._rng.random() < self.explore_rate:
+                stalest = min(healthy, key=lambda name: health[name].last_used)
+                healthy.remove(stalest)
+                healthy.insert(0, stalest)
+        return [(self.providers[name], keys[name]) for name in healthy + tripped]
+
+    def record(self, name, latency, ok, kind="chat"):
+        """记录一次请求结果；latency 为秒，kind 为 "chat" 或 "stream"（此时 latency 为首个片段的耗时）"""
+        with self._lock:
+            health = self._health.setdefault(name, ProviderHealth())
+            health.requests += 1
+            health.last_used = time.monotonic()
+            health.error_rate += self.alpha * ((0.0 if ok else 1.0) - health.error_rate)
+            if ok:
+                health.latency = latency if health.latency is None else \
+                    health.latency + self.alpha * (latency - health.latency)
+                health.samples[kind].append(latency)
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if health.consecutive_failures >= self.max_failures:
+                    health.open_until = health.last_used + self.cooldown
+
+    def hedge_after(self, name, kind="chat"):
+        """对 name 的请求等待多久仍未应答时补发对冲请求（秒）"""
+        with self._lock:
+            health = self._health.setdefault(name, ProviderHealth())
+            delay = health.percentile(kind, self.hedge_quantile, self.hedge_min_samples)
+        return delay if delay is not None else self.hedge_delay
+
+    def stats(self):
+        """
+        各提供商当前的统计
+
+        返回:
+        List[dict]: name、model、latency（秒，无样本时为 None）、p95（秒）、error_rate、requests、failures、healthy
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "name": name,
+                "model": self.providers[name].model,
+                "latency": health.latency,
+                "p95": health.percentile("chat", 0.95) or health.percentile("stream", 0.95),
+                "error_rate": health.error_rate,
+                "requests": health.requests,
+                "failures": health.failures,
+                "healthy": health.open_until <= now,
+            } for name, health in self._health.items() if name in self.providers]
+
+    def _sequential(self, candidates, attempt, kind):
+        """
+        在当前线程中按 candidates 顺序执行 attempt(provider, key)，失败时切换到下一个
+
+        返回第一个成功的 (提供商名, 结果)；FAILOVER_ERRORS 以外的异常记录后直接抛出。
+        """
+        last_error = None
+        for provider, key in candidates:
+            start = time.monotonic()
+            try:
+                value = attempt(provider, key)
+            except BaseException as e:
+                self.record(provider.name, time.monotonic() - start, False, kind)
+                if not isinstance(e, FAILOVER_ERRORS):
+                    raise
+                last_error = e
+                continue
+            self.record(provider.name, time.monotonic() - start, True, kind)
+            return provider.name, value
+        raise last_error
+
+    def _dispatch(self, candidates, attempt, kind, hedge):
+        if hedge:
+            return self._race(candidates, attempt, kind, hedge)
+        return self._sequential(candidates, attempt, kind)
+
+    def _race(self, candidates, attempt, kind, hedge):
+        """
+        按 candidates 顺序执行 attempt(provider, key)，失败时切换，hedge 时对慢请求补发
+
+        每次尝试在独立线程中运行并自行记录统计；返回第一个成功的 (提供商名, 结果)。
+        结果已无人等待时（落败的对冲请求）调用 discard(结果) 释放资源。
+        FAILOVER_ERRORS 以外的异常不再切换，直接在调用方线程中抛出。
+        """
+        results = queue.Queue()
+        finished = threading.Event()
+        handoff = threading.Lock()  # 使"是否已有胜者"的判断与结果入队/清空互斥
+        remaining = iter(candidates)
+        primary = next(remaining)
+        fallback = list(remaining)
+
+        def launch(provider, key, is_hedge):
+            start = time.monotonic()
+
+            def run():
+                try:
+                    value = attempt(provider, key)
+                except BaseException as e:
+                    # 任何异常都要入队，否则调用方会一直等待这次尝试的结果
+                    self.record(provider.name, time.monotonic() - start, False, kind)
+                    results.put((provider, is_hedge, None, e))
+                    return
+                self.record(provider.name, time.monotonic() - start, True, kind)
+                with handoff:
+                    if not finished.is_set():
+                        results.put((provider, is_hedge, value, None))
+                        return
+                discard(value)
+
+            threading.Thread(target=run, daemon=True).start()
+
+        def settle():
+            """标记已结束，并释放已排队但无人领取的结果（两个请求几乎同时成功）"""
+            with handoff:
+                finished.set()
+                while not results.empty():
+                    _, _, other, _ = results.get_nowait()
+                    if other is not None:
+                        discard(other)
+
+        discard = getattr(attempt, "discard", lambda value: None)
+        self.hedge_budget.deposit()
+        launch(*primary, False)
+        in_flight = 1
+        hedge_at = time.monotonic() + self.hedge_after(primary[0].name, kind) if hedge else None
+        hedged = False
+        last_error = None
+        while in_flight:
+            wait = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+            try:
+                provider, is_hedge, value, error = results.get(timeout=wait)
+            except queue.Empty:
+                hedge_at = None
+                hedged = True
+                if self.hedge_budget.withdraw():
+                    # 优先补发给另一个提供商，避免与原请求一起被同一个慢后端拖住
+                    launch(*(fallback.pop(0) if fallback else primary), True)
+                    in_flight += 1
+                    with self._lock:
+                        self.hedges += 1
+                continue
+            in_flight -= 1
+            if error is not None and not isinstance(error, FAILOVER_ERRORS):
+                settle()
+                raise error
+            if error is None:
+                settle()
+                if is_hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return provider.name, value
+            last_error = error
+            if fallback and in_flight == 0:
+                next_provider, next_key = fallback.pop(0)
+                launch(next_provider, next_key, False)
+                in_flight += 1
+                if hedge and not hedged:
+                    hedge_at = time.monotonic() + self.hedge_after(next_provider.name, kind)
+        raise last_error
+
+    def chat(self, user_prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, preferred=None, api_key=None, timeout=30,
+             failover=True, hedge=False, json_mode=False, with_provider=False):
+        """
+        按路由顺序发送非流式请求，某个提供商失败时切换到下一个
+
+        参数:
+        hedge (bool): 首个文本片段慢于该提供商的 p95 时补发对冲请求；对冲时以流式发送，落败的请求随即断开
+        json_mode (bool): 要求以 JSON 对象格式回复
+        with_provider (bool): 同时返回实际应答的提供商名
+
+        返回:
+        str: 模型生成的回复内容（with_provider 时为 (提供商名, 回复内容)）；全部失败时抛出最后一个错误
+        """
+        if not user_prompt:
+            raise ValueError("user_prompt参数不能为空")
+        candidates = self.candidates(preferred, api_key, failover)
+        if hedge:
+            name, result = self._hedged_chat(candidates, user_prompt, system_prompt, timeout, json_mode)
+            return (name, result) if with_provider else result
+
+        def attempt(provider, key):
+            return provider.chat(user_prompt, system_prompt, api_key=key, timeout=timeout, json_mode=json_mode)
+
+        name, result = self._sequential(candidates, attempt, "chat")
+        return (name, result) if with_provider else result
+
+    def _hedged_chat(self, candidates, user_prompt, system_prompt, timeout, json_mode):
+        """
+        对冲的非流式请求：底层以流式发送，使落败的请求能在首个文本片段到达时断开
+
+        非流式请求在整份回复生成完之前无法中止，落败的一方会照常生成并计费；
+        流式发送后只为它付出首个片段之前的开销。首个片段之前照常切换与对冲，
+        之后的错误直接抛出；应答时间按流式请求（首个片段）统计。
+
+        返回:
+        Tuple[str, str]: (实际应答的提供商名, 完整回复)
+        """
+        attempt = self._first_chunk_attempt(user_prompt, system_prompt, timeout, json_mode)
+        name, (first, chunks) = self._race(candidates, attempt, "stream", True)
+        start = time.monotonic()
+        try:
+            return name, first + "".join(chunks)
+        except FAILOVER_ERRORS:
+            self.record(name, time.monotonic() - start, False, "stream")
+            raise
+        finally:
+            chunks.close()
+
+    @staticmethod
+    def _first_chunk_attempt(user_prompt, system_prompt, timeout, json_mode=False):
+        """流式尝试：收到首个文本片段即算成功，返回 (首个片段, 其余片段的迭代器)"""
+        def attempt(provider, key):
+            # 空的流计为失败并切换到下一个提供商，不把空回复当作结果
+            chunks = provider.chat_stream(user_prompt, system_prompt, api_key=key, timeout=timeout,
+                                          json_mode=json_mode)
+            first = next(chunks, None)
+            if first is None:
+                chunks.close()
+                raise ValueError(f"{provider.name} 返回了空回复")
+            return first, chunks
+
+        attempt.discard = lambda value: value[1].close()  # 关闭落败请求的连接
+        return attempt
+
+    def chat_stream(self, user_prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, preferred=None, api_key=None,
+                    timeout=30, failover=True, hedge=False):
+        """
+        流式版本的 chat；只在收到第一个文本片段之前切换提供商或对冲，之后的错误直接抛出
+
+        返回:
+        RoutedStream: 依次产出模型生成的文本增量，其 provider 属性为实际应答的提供商名
+        """
+        if not user_prompt:
+            raise ValueError("user_prompt参数不能为空")
+        return RoutedStream(lambda stream: self._stream(stream, user_prompt, system_prompt, preferred, api_key,
+                                                        timeout, failover, hedge))
+
+    def _stream(self, stream, user_prompt, system_prompt, preferred, api_key, timeout, failover, hedge):
+        """chat_stream 的生成器主体；选定提供商后写入 stream.provider"""
+        attempt = self._first_chunk_attempt(user_prompt, system_prompt, timeout)
+        name, (first, chunks) = self._dispatch(self.candidates(preferred, api_key, failover), attempt, "stream",
+                                               hedge)
+        stream.provider = name
+        start = time.monotonic()
+        try:
+            yield first
+            yield from chunks
+        except FAILOVER_ERRORS:
+            self.record(name, time.monotonic() - start, False, "stream")
+            raise
+        finally:
+            chunks.close()
+
+    async def achat(self, user_prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, preferred=None, api_key=None,
+                    timeout=30, failover=True, executor=None, hedge=False, json_mode=False, with_provider=False):
+        """
+        chat 的 asyncio 版本：每次尝试前先经过该提供商的限流器，再在线程池中发送请求
+
+        对冲时只有第一次尝试经过限流器，切换与补发在同一个线程池任务中完成。
+        参数与 chat 相同，另有:
+        executor (concurrent.futures.Executor): 执行请求的线程池，默认使用事件循环的默认线程池
+        """
+        if not user_prompt:
+            raise ValueError("user_prompt参数不能为空")
+        candidates = self.candidates(preferred, api_key, failover)
+        loop = asyncio.get_running_loop()
+        if hedge:
+            limiter = get_rate_limiter(candidates[0][0].name)
+            if limiter is not None:
+                await limiter.acquire()
+            attempt = functools.partial(self._hedged_chat, candidates, user_prompt, system_prompt, timeout,
+                                        json_mode)
+            name, result = await loop.run_in_executor(executor, attempt)
+            return (name, result) if with_provider else result
+        last_error = None
+        for provider, key in candidates:
+            limiter = get_rate_limiter(provider.name)
+            if limiter is not None:
+                await limiter.acquire()
+            call = functools.partial(provider.chat, user_prompt, system_prompt, api_key=key, timeout=timeout,
+                                     json_mode=json_mode)
+            start = time.monotonic()
+            try:
+                result = await loop.run_in_executor(executor, call)
+            except asyncio.CancelledError:
+                raise  # 调用方取消了等待，不是提供商的失败
+            except BaseException as e:
+                self.record(provider.name, time.monotonic() - start, False)
+                if not isinstance(e, FAILOVER_ERRORS):
+                    raise
+                last_error = e
+                continue
+            self.record(provider.name, time.monotonic() - start, True)
+            return (provider.name, result) if with_provider else result
+        raise last_error
+
+
+# 进程内共享的路由器，统计在所有会话之间累积
+default_router = ProviderRouter()
+
+
+def zhipuai_chat(system_prompt=None, user_prompt=None, api_key=API_KEY_zhipu, timeout=30):
+    """
+    调用智谱 API生成对话回复
+
     参数:
     system_prompt (str): 系统提示词，默认值"你是一个专业的助手"
     user_prompt (str): 用户输入的提示词（必填）
-    api_key (str): DeepSeek API密钥（必填）
-    
+    api_key (str): 智谱 API密钥（必填）
+    timeout (float): 请求超时时间（秒）
+
     返回:
     str: 模型生成的回复内容
     """
-    # 参数校验
-    if not user_prompt:
-        raise ValueError("user_prompt参数不能为空")
-    if not api_key:
-        raise ValueError("api_key参数不能为空")
-    
-    url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    data = {
-        "model": "chatglm-6b",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "stream": False
-    }
-    
-    try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()  # 处理HTTP错误状态码
-        result = response.json()
-        return result['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as e:
-        print(f"请求失败: {str(e)}")
-        raise
-    except KeyError as e:
-        print(f"解析响应失败: {str(e)}")
-        print("原始响应:", response.text)
-        raise
+    return PROVIDERS["智谱"].chat(user_prompt, system_prompt or DEFAULT_SYSTEM_PROMPT, api_key=api_key,
+                                 timeout=timeout)
+
+
+def deepseek_chat_stream(user_prompt=None, system_prompt=DEFAULT_SYSTEM_PROMPT, model='DeepSeek',
+                         api_key=None, timeout=30):
+    """
+    以流式（SSE）方式调用指定提供商，边生成边返回文本片段
+
+    参数与 deepseek_chat 相同；timeout 为建立连接及相邻两个数据块之间的最长等待时间。
+
+    返回:
+    Iterator[str]: 依次产出模型生成的文本增量
+    """
+    return get_provider(model).chat_stream(user_prompt, system_prompt, api_key=api_key, timeout=timeout)
+
+
+def iter_sse_content(lines):
+    """
+    解析 OpenAI 兼容的 SSE 数据流，产出每个 chunk 中 choices[0].delta.content 的文本
+
+    参数:
+    lines (Iterable[bytes]): 按行切分的原始响应（不含换行符）
+    """
+    for raw in lines:
+        # SSE 响应通常不声明 charset，按 UTF-8 自行解码，避免中文乱码
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        if not line.startswith("data:"):
+            continue  # 空行、注释行（": keep-alive"）及 event/id 字段
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+            content = chunk["choices"][0]["delta"].get("content")
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"解析流式响应失败: {str(e)}")
+            print("原始数据:", payload)
+            raise
+        if content:
+            yield content
+
+class AsyncRateLimiter:
+    """
+    令牌桶限流器：平均每秒最多 rate 个请求，允许 burst 个突发
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# 各提供商每秒请求数上限（None 表示不限流），可按账号额度调整
+PROVIDER_RATE_LIMITS = {
+    "DeepSeek": float(os.environ.get("LLM_RATE_LIMIT_DEEPSEEK", 20)),
+    "OpenAI": float(os.environ.get("LLM_RATE_LIMIT_OPENAI", 20)),
+    "智谱": float(os.environ.get("LLM_RATE_LIMIT_ZHIPUAI", 20)),
+}
+
+_rate_limiters = weakref.WeakKeyDictionary()  # 事件循环 -> {提供商: 限流器}
+
+
+def get_rate_limiter(model):
+    """
+    获取某个提供商在当前事件循环中的限流器；未配置限流时返回 None
+    """
+    rate = PROVIDER_RATE_LIMITS.get(model)
+    if not rate:
+        return None
+    limiters = _rate_limiters.setdefault(asyncio.get_running_loop(), {})
+    limiter = limiters.get(model)
+    if limiter is None:
+        limiter = AsyncRateLimiter(rate, burst=max(1, int(rate)))
+        limiters[model] = limiter
+    return limiter
+
+
+async def deepseek_chat_async(user_prompt=None, system_prompt=DEFAULT_SYSTEM_PROMPT, model='DeepSeek',
+                              api_key=None, timeout=30, executor=None):
+    """
+    deepseek_chat 的 asyncio 版本，可在同一事件循环中并发发起多个请求
+
+    请求先经过提供商限流器，再在线程池中通过共享的连接池会话发送，
+    因此不会阻塞事件循环。参数与 deepseek_chat 相同，另有:
+    executor (concurrent.futures.Executor): 执行请求的线程池，默认使用事件循环的默认线程池
+
+    返回:
+    str: 模型生成的回复内容
+    """
+    limiter = get_rate_limiter(model)
+    if limiter is not None:
+        await limiter.acquire()
+    loop = asyncio.get_running_loop()
+    call = functools.partial(deepseek_chat, user_prompt=user_prompt, system_prompt=system_prompt,
+                             model=model, api_key=api_key, timeout=timeout)
+    return await loop.run_in_executor(executor, call)
 
 # # 使用示例
 # response = deepseek_chat(
@@ -140,49 +893,18 @@ def zhipuai_chat(system_prompt=None, user_prompt=None, api_key=API_KEY_zhipu):
 # )
 # print(response)
 
-def deepseek_chat(user_prompt=None,system_prompt="你是一个专业的助手", model = 'DeepSeek',api_key=API_KEY):
+def deepseek_chat(user_prompt=None,system_prompt=DEFAULT_SYSTEM_PROMPT, model = 'DeepSeek',api_key=None, timeout=30):
     """
-    调用DeepSeek API生成对话回复
-    
+    调用指定提供商（默认 DeepSeek）的 API 生成对话回复，不做路由与切换
+
     参数:
     system_prompt (str): 系统提示词，默认值"你是一个专业的助手"
     user_prompt (str): 用户输入的提示词（必填）
-    api_key (str): DeepSeek API密钥（必填）
-    
+    model (str): 提供商名称，见 PROVIDERS
+    api_key (str): API密钥，默认读取该提供商的环境变量
+    timeout (float): 请求超时时间（秒）
+
     返回:
     str: 模型生成的回复内容
     """
-    # 参数校验
-    if not user_prompt:
-        raise ValueError("user_prompt参数不能为空")
-    if not api_key:
-        raise ValueError("api_key参数不能为空")
-    
-    if model == 'DeepSeek':
-        url = "https://api.deepseek.com/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        data = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "stream": False
-        }
-    
-    try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()  # 处理HTTP错误状态码
-        result = response.json()
-        return result['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as e:
-        print(f"请求失败: {str(e)}")
-        raise
-    except KeyError as e:
-        print(f"解析响应失败: {str(e)}")
-        print("原始响应:", response.text)
-        raise
\ No newline at end of file
+    return get_provider(model).chat(user_prompt, system_prompt, api_key=api_key, timeout=timeout)
@@ -0,0 +1,110 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import plotly.graph_objects as go
+import plotly.utils
+
+from batch_reports import scores_hash
+from schema import CompiledSchema
+
+RADIAL_AXIS = dict(visible=True, range=[0, 5])
+
+
+def class_averages(db, compiled: CompiledSchema, subject: str) -> List[Optional[float]]:
+    """Class mean of every item's latest score, from the running aggregates (no history scan)."""
+    stats = db.get_item_stats(subject, "current")
+    averages = []
+    for entry in compiled.items(subject):
+        item_stats = stats.get(entry.path)
+        averages.append(round(item_stats.mean, 2) if item_stats is not None and item_stats.count else None)
+    return averages
+
+
+def _closed(values: List, labels: List[str]):
+    return values + values[:1], labels + labels[:1]
+
+
+def build_radar_figures(compiled: CompiledSchema, subject: str, name: str, scores: Dict,
+                        previous: Optional[Dict] = None,
+                        class_average: Optional[List[Optional[float]]] = None) -> List[Tuple[str, str]]:
+    """(category, figure JSON) per category of subject; previous and class_average are overlaid when given.
+
+    The JSON leaves out the layout template, which plotly fills back in with
+    the default when the figure is rendered; that keeps entries small and
+    cheap to hand to st.plotly_chart.
+    """
+    items = compiled.items(subject)
+    current = compiled.values(subject, scores, 3)
+    overlays = []
+    if previous is not None:
+        overlays.append(("上一轮", compiled.values(subject, previous, 3), "dash"))
+    if class_average is not None:
+        overlays.append(("班级平均", class_average, "dot"))
+
+    figures = []
+    for category, start, stop in compiled.category_ranges(subject):
+        labels = [entry.label for entry in items[start:stop]]
+        r, theta = _closed(current[start:stop], labels)
+        fig = go.Figure(data=go.Scatterpolar(r=r, theta=theta, fill='toself', name="本轮"))
+        for trace_name, values, dash in overlays:
+            r, theta = _closed(values[start:stop], labels)
+            fig.add_trace(go.Scatterpolar(r=r, theta=theta, name=trace_name, line=dict(dash=dash)))
+        fig.update_layout(
+            polar=dict(radialaxis=RADIAL_AXIS),
+            showlegend=bool(overlays),
+            title=f"{name} 的{category}表现"
+        )
+        spec = fig.to_plotly_json()
+        spec["layout"].pop("template", None)
+        figures.append((category, json.dumps(spec, cls=plotly.utils.PlotlyJSONEncoder, ensure_ascii=False)))
+    return figures
+
+
+class RadarFigureCache:
+    """In-memory LRU of serialized radar figures, shared by every session.
+
+    Keyed by (student_id, subject, hash of the rendered round, name, overlay
+    hash), so a new round, a rename or a change in the overlaid data misses
+    naturally and stale entries simply age out.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, List[Tuple[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def figures(self, db, compiled: CompiledSchema, student_id: str, subject: str,
+                overlay: bool = False) -> Optional[List[Tuple[str, str]]]:
+        """(category, figure JSON) for the student's latest round, or None if they have no round."""
+        scores = db.get_latest_scores(student_id, subject)
+        if not scores:
+            return None
+        name = db.students[student_id]["name"]
+        previous = class_average = None
+        overlay_key = None
+        if overlay:
+            previous = db.get_previous_scores(student_id, subject)
+            class_average = class_averages(db, compiled, subject)
+            overlay_key = scores_hash({"previous": previous, "class_average": class_average})
+        key = (student_id, subject, scores_hash(scores), name, overlay_key)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        figures = build_radar_figures(compiled, subject, name, scores, previous, class_average)
+        with self._lock:
+            self._entries[key] = figures
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figures
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+REPORTS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS reports (
+    student_id TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    feedback TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (student_id, subject, round)
+);
+"""
+
+
+class ReportStore:
+    """Persistent report text for every promoted round, keyed by (student_id, subject, round).
+
+    round is the 1-based history position of the round the report was
+    generated for, so it lines up with history_export's round column and
+    reports of rounds with identical scores never collide. Lookups go one
+    student at a time, so readers never hold more than one student's reports.
+    """
+
+    def __init__(self, db_file: str = "reports.db"):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(REPORTS_SCHEMA_SQL)
+
+    def put(self, student_id: str, subject: str, round_number: int, feedback: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reports (student_id, subject, round, feedback, created_at) "
+                "VALUES (?, ?, ?, ?, ?)", (student_id, subject, round_number, feedback, time.time()))
+
+    def get(self, student_id: str, subject: str, round_number: int) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT feedback FROM reports WHERE student_id = ? AND subject = ? AND round = ?",
+                                    (student_id, subject, round_number)).fetchone()
+        return row[0] if row else None
+
+    def for_student(self, student_id: str) -> Dict[Tuple[str, int], str]:
+        """(subject, round) -> feedback for one student."""
+        with self._lock:
+            rows = self.conn.execute("SELECT subject, round, feedback FROM reports WHERE student_id = ?",
+                                     (student_id,)).fetchall()
+        return {(subject, round_number): feedback for subject, round_number, feedback in rows}
+
+    def import_journal(self, journal_file: str) -> int:
+        """Copy batch-journal records that carry a round, streaming; existing reports win. Returns rows added."""
+        added = 0
+        with open(journal_file, "r", encoding="utf-8") as f, self._lock, self.conn:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("round") is None:
+                    continue  # written before rounds were journaled; cannot be placed reliably
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO reports (student_id, subject, round, feedback, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (record["student_id"], record["subject"], record["round"],
+                                               record["feedback"], record.get("finished_at", time.time())))
+                added += cursor.rowcount
+        return added
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,108 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class SchemaItem(NamedTuple):
+    category: str
+    subcategory: Optional[str]  # None for categories that list items directly
+    item: str
+    path: Tuple[str, ...]  # keys leading to the score in a nested scores dict
+
+    @property
+    def label(self) -> str:
+        return f"{self.subcategory}-{self.item}" if self.subcategory else self.item
+
+
+_EMPTY: Dict = {}
+
+
+class CompiledSchema:
+    """EVALUATION_SCHEMA flattened once into ordered SchemaItem tables, one per subject.
+
+    Items keep the schema's declaration order, so consumers can render in a
+    single linear pass and detect category/subcategory boundaries by comparing
+    with the previous item.
+    """
+
+    def __init__(self, schema: Dict):
+        self.schema = schema
+        self.tables: Dict[str, Tuple[SchemaItem, ...]] = {
+            subject: tuple(self._flatten(categories)) for subject, categories in schema.items()
+        }
+        self.ranges: Dict[str, Tuple[Tuple[str, int, int], ...]] = {
+            subject: self._category_ranges(table) for subject, table in self.tables.items()
+        }
+        self.runs: Dict[str, Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ...]] = {
+            subject: self._container_runs(table) for subject, table in self.tables.items()
+        }
+
+    @staticmethod
+    def _flatten(categories: Dict) -> List[SchemaItem]:
+        table = []
+        for category, subcategories in categories.items():
+            if isinstance(subcategories, dict):
+                for subcategory, items in subcategories.items():
+                    for item in items:
+                        table.append(SchemaItem(category, subcategory, item, (category, subcategory, item)))
+            elif isinstance(subcategories, list):
+                for item in subcategories:
+                    table.append(SchemaItem(category, None, item, (category, item)))
+        return table
+
+    @staticmethod
+    def _category_ranges(table: Tuple[SchemaItem, ...]) -> Tuple[Tuple[str, int, int], ...]:
+        ranges = []
+        for index, entry in enumerate(table):
+            if ranges and ranges[-1][0] == entry.category:
+                ranges[-1][2] = index + 1
+            else:
+                ranges.append([entry.category, index, index + 1])
+        return tuple(tuple(r) for r in ranges)
+
+    @staticmethod
+    def _container_runs(table: Tuple[SchemaItem, ...]):
+        runs = []
+        for entry in table:
+            container_path = entry.path[:-1]
+            if runs and runs[-1][1] == container_path:
+                runs[-1][2].append(entry.item)
+            else:
+                runs.append((entry.category, container_path, [entry.item]))
+        return tuple((category, path, tuple(items)) for category, path, items in runs)
+
+    def items(self, subject: str) -> Tuple[SchemaItem, ...]:
+        return self.tables[subject]
+
+    def category_ranges(self, subject: str) -> Tuple[Tuple[str, int, int], ...]:
+        """(category, start, stop) slices of items(subject), in schema order."""
+        return self.ranges[subject]
+
+    def container_runs(self, subject: str) -> Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ...]:
+        """(category, container path, item names) for each run of items sharing one innermost dict."""
+        return self.runs[subject]
+
+    def values(self, subject: str, scores: Optional[Dict], default=None) -> List:
+        """Scores for every item of subject in table order; missing items get default."""
+        if not scores:
+            return [default] * len(self.tables[subject])
+        values = []
+        for _, container_path, items in self.runs[subject]:
+            container = scores
+            for key in container_path:
+                container = container.get(key, _EMPTY)
+            values.extend(container.get(item, default) for item in items)
+        return values
+
+    def nest(self, subject: str, values: List, skip=object()) -> Dict:
+        """Inverse of values(): rebuild the nested scores dict from a flat list.
+
+        Items whose value equals skip (e.g. the default passed to values()) are left out.
+        """
+        scores: Dict = {}
+        for entry, value in zip(self.tables[subject], values):
+            if value == skip:
+                continue
+            node = scores
+            for key in entry.path[:-1]:
+                node = node.setdefault(key, {})
+            node[entry.item] = value
+        return scores
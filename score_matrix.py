@@ -0,0 +1,108 @@
+import warnings
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from schema import CompiledSchema
+
+
+MISSING = 0  # scores are 1-5, so 0 marks an item that was not scored or a padded round
+
+
+class ScoreMatrix:
+    """One subject's score history as an int8 array of shape (students, rounds, items).
+
+    The item axis follows CompiledSchema.items(subject). Students with fewer
+    rounds than the longest history are padded with MISSING at the end;
+    round_counts holds each student's real number of rounds.
+    """
+
+    def __init__(self, subject: str, compiled: CompiledSchema, student_ids: Sequence[str],
+                 data: np.ndarray, round_counts: np.ndarray):
+        self.subject = subject
+        self.compiled = compiled
+        self.student_ids = list(student_ids)
+        self.data = data
+        self.round_counts = round_counts
+        self.index = {sid: i for i, sid in enumerate(self.student_ids)}
+
+    @property
+    def items(self):
+        return self.compiled.items(self.subject)
+
+    @classmethod
+    def from_histories(cls, histories: Dict[str, List[Dict]], compiled: CompiledSchema,
+                       subject: str, last: Optional[int] = None) -> "ScoreMatrix":
+        """Build from {student_id: [nested scores dict, ...]}; last keeps only the newest N rounds."""
+        student_ids = list(histories)
+        n_items = len(compiled.items(subject))
+        rounds_per_student = [h[-last:] if last else h for h in histories.values()]
+        round_counts = np.fromiter((len(h) for h in rounds_per_student), dtype=np.int32,
+                                   count=len(student_ids))
+        max_rounds = int(round_counts.max()) if len(student_ids) else 0
+        data = np.full((len(student_ids), max_rounds, n_items), MISSING, dtype=np.int8)
+        for s, rounds in enumerate(rounds_per_student):
+            if not rounds:
+                continue
+            values = np.asarray([compiled.values(subject, scores, MISSING) for scores in rounds])
+            if values.dtype.kind not in "iu":
+                raise ValueError(f"Student {student_ids[s]} has non-integer {subject} scores")
+            if values.min() < np.iinfo(np.int8).min or values.max() > np.iinfo(np.int8).max:
+                raise ValueError(f"Student {student_ids[s]} has {subject} scores outside the int8 range")
+            data[s, :len(rounds)] = values
+        return cls(subject, compiled, student_ids, data, round_counts)
+
+    @classmethod
+    def from_database(cls, db, compiled: CompiledSchema, subject: str,
+                      student_ids: Optional[Sequence[str]] = None, last: Optional[int] = None) -> "ScoreMatrix":
+        """Build from a StudentDatabase (or SQLiteStudentDatabase) via get_history()."""
+        if student_ids is None:
+            student_ids = list(db.students)
+        histories = {sid: db.get_history(sid, subject) for sid in student_ids}
+        return cls.from_histories(histories, compiled, subject, last=last)
+
+    def to_histories(self) -> Dict[str, List[Dict]]:
+        """Inverse of from_histories: {student_id: [nested scores dict, ...]}, MISSING items omitted."""
+        histories = {}
+        for s, sid in enumerate(self.student_ids):
+            histories[sid] = [
+                self.compiled.nest(self.subject, [int(v) for v in self.data[s, r]], skip=MISSING)
+                for r in range(self.round_counts[s])
+            ]
+        return histories
+
+    def round_from_end(self, offset: int) -> np.ndarray:
+        """(students, items) scores of each student's round `offset` back from the latest; MISSING if absent."""
+        out = np.full((len(self.student_ids), len(self.items)), MISSING, dtype=np.int8)
+        rows = np.nonzero(self.round_counts > offset)[0]
+        out[rows] = self.data[rows, self.round_counts[rows] - 1 - offset]
+        return out
+
+    def latest(self) -> np.ndarray:
+        return self.round_from_end(0)
+
+    def previous(self) -> np.ndarray:
+        return self.round_from_end(1)
+
+    @staticmethod
+    def as_float(scores: np.ndarray) -> np.ndarray:
+        """Scores as float64 with MISSING replaced by NaN, for nan-aware reductions."""
+        out = scores.astype(np.float64)
+        out[scores == MISSING] = np.nan
+        return out
+
+    def deltas(self) -> np.ndarray:
+        """(students, items) latest minus previous round; NaN where either is missing."""
+        return self.as_float(self.latest()) - self.as_float(self.previous())
+
+    def class_mean(self, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-item mean over students (latest round by default), ignoring missing scores."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            return np.nanmean(self.as_float(self.latest() if scores is None else scores), axis=0)
+
+    def percentiles(self, q, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-item percentiles over students; q as in numpy.nanpercentile."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            return np.nanpercentile(self.as_float(self.latest() if scores is None else scores), q, axis=0)
@@ -0,0 +1,421 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from aggregates import ItemStats, ScoreAggregates
+from binary_snapshot import META_KEY
+from student_db import read_students_csv, stripped_id_map
+from student_index import RosterPage, StudentIndex
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    class_name TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL REFERENCES students(student_id),
+    subject TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    scores TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_student_subject_time
+    ON evaluations (student_id, subject, created_at);
+CREATE TABLE IF NOT EXISTS item_stats (
+    scope TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    item TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    total_sq REAL NOT NULL,
+    h1 INTEGER NOT NULL,
+    h2 INTEGER NOT NULL,
+    h3 INTEGER NOT NULL,
+    h4 INTEGER NOT NULL,
+    h5 INTEGER NOT NULL,
+    PRIMARY KEY (scope, subject, item)
+);
+CREATE TABLE IF NOT EXISTS pending (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL REFERENCES students(student_id),
+    subject TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    scores TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_subject_student ON pending (subject, student_id);
+"""
+
+UPSERT_ITEM_STATS_SQL = """
+INSERT INTO item_stats (scope, subject, item, count, total, total_sq, h1, h2, h3, h4, h5)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(scope, subject, item) DO UPDATE SET
+    count = count + excluded.count,
+    total = total + excluded.total,
+    total_sq = total_sq + excluded.total_sq,
+    h1 = h1 + excluded.h1,
+    h2 = h2 + excluded.h2,
+    h3 = h3 + excluded.h3,
+    h4 = h4 + excluded.h4,
+    h5 = h5 + excluded.h5
+"""
+
+
+def _item_stats_rows(aggregates: ScoreAggregates):
+    """Flatten ScoreAggregates into item_stats rows (item paths stored as JSON arrays)."""
+    for scope, subjects in aggregates.stats.items():
+        for subject, items in subjects.items():
+            for path, stats in items.items():
+                yield (scope, subject, json.dumps(path, ensure_ascii=False), stats.count, stats.total,
+                       stats.total_sq, *stats.histogram)
+
+
+class SQLiteStudentDatabase:
+    """StudentDatabase backed by the stdlib sqlite3 module.
+
+    Exposes the same public methods as student_db.StudentDatabase. Only the
+    roster is kept in memory; score rounds stay on disk and the latest and
+    previous rounds are read through the (student_id, subject, created_at)
+    index. Staged questionnaire rounds live in the pending table. On first use
+    an empty database is seeded from students.csv, scores.json and
+    scores_new.json if they exist.
+    """
+
+    def __init__(self, db_file: str = "students.db", csv_file: str = "students.csv",
+                 json_file: str = "scores.json", pending_file: Optional[str] = None):
+        self.db_file = db_file
+        self.csv_file = csv_file
+        self.json_file = json_file
+        self.pending_file = pending_file or os.path.join(os.path.dirname(json_file), "scores_new.json")
+        self.students = {}
+        self.index = StudentIndex()  # name and name-search indexes over students
+        self.version = 0  # bumped on every write; lets callers cache derived data
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA_SQL)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(students)")}
+        if "class_name" not in columns:  # databases created before classes existed
+            self.conn.execute("ALTER TABLE students ADD COLUMN class_name TEXT NOT NULL DEFAULT ''")
+        if self._is_empty():
+            self.import_legacy()
+        else:
+            self._migrate_stripped_ids()
+            if self.conn.execute("SELECT 1 FROM item_stats LIMIT 1").fetchone() is None:
+                self.rebuild_item_stats()
+        self.load_students()
+        self.load_scores()
+
+    def _is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM students LIMIT 1").fetchone() is None
+
+    def _migrate_stripped_ids(self):
+        """Rename students seeded as "101" from a students.csv row "0101" (see stripped_id_map)."""
+        if not os.path.exists(self.csv_file):
+            return
+        csv_ids = [sid.strip() for sid in read_students_csv(self.csv_file)["student_id"]]
+        existing = {row[0] for row in self.conn.execute("SELECT student_id FROM students")}
+        renames = [(padded, legacy) for legacy, padded in stripped_id_map(csv_ids).items()
+                   if legacy in existing and padded not in existing]
+        if not renames:
+            return
+        with self.conn:
+            for table in ("students", "evaluations", "pending"):
+                self.conn.executemany(f"UPDATE {table} SET student_id = ? WHERE student_id = ?", renames)
+
+    def import_legacy(self):
+        """Seed the database from students.csv, scores.json and scores_new.json."""
+        rows = []
+        if os.path.exists(self.csv_file):
+            df = read_students_csv(self.csv_file)
+            classes = df["class"] if "class" in df.columns else [""] * len(df)
+            rows = [(sid.strip(), name, class_name.strip())
+                    for sid, name, class_name in zip(df["student_id"], df["name"], classes)]
+        else:
+            rows = [("001", "张伟", ""), ("002", "李娜", ""), ("003", "王芳", ""), ("004", "刘洋", ""),
+                    ("005", "陈晨", ""), ("006", "杨磊", ""), ("007", "赵静", ""), ("008", "周浩", "")]
+        known = {row[0] for row in rows}
+        stripped = stripped_id_map(known)  # rounds saved under "101" belong to "0101"
+        evaluations = []
+        aggregates = ScoreAggregates()
+        pending_data = None
+        if os.path.exists(self.json_file):
+            with open(self.json_file, "r", encoding="utf-8") as f:
+                scores_data = json.load(f)
+            # Legacy rounds have no timestamps; keep their order with increasing fake times
+            created_at = 0.0
+            for student_id, subjects in scores_data.items():
+                student_id = stripped.get(student_id, student_id)
+                if student_id not in known:
+                    continue
+                for subject, rounds in subjects.items():
+                    previous = None
+                    for scores in rounds:
+                        created_at += 1.0
+                        evaluations.append((student_id, subject, created_at,
+                                            json.dumps(scores, ensure_ascii=False)))
+                        aggregates.add_round(subject, scores, replaced_latest=previous)
+                        previous = scores
+            # StudentDatabase snapshots carry the pending queue as {subject: {student_id: rounds}}
+            meta = scores_data.get(META_KEY, {})
+            if "pending" in meta:
+                pending_data = {}
+                for subject, students in meta["pending"].items():
+                    for student_id, rounds in students.items():
+                        pending_data.setdefault(student_id, {})[subject] = rounds
+        if pending_data is None and os.path.exists(self.pending_file):
+            with open(self.pending_file, "r", encoding="utf-8") as f:
+                pending_data = json.load(f)
+        staged = []
+        for student_id, subjects in (pending_data or {}).items():
+            student_id = stripped.get(student_id, student_id)
+            if student_id not in known:
+                continue
+            for subject, rounds in subjects.items():
+                for scores in rounds:
+                    staged.append((student_id, subject, time.time(), json.dumps(scores, ensure_ascii=False)))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO students (student_id, name, class_name) VALUES (?, ?, ?)", rows)
+            self.conn.executemany(
+                "INSERT INTO evaluations (student_id, subject, created_at, scores) VALUES (?, ?, ?, ?)",
+                evaluations)
+            self.conn.executemany(UPSERT_ITEM_STATS_SQL, _item_stats_rows(aggregates))
+            self.conn.executemany(
+                "INSERT INTO pending (student_id, subject, created_at, scores) VALUES (?, ?, ?, ?)", staged)
+
+    def rebuild_item_stats(self):
+        """Recompute item_stats from every stored evaluation (one full scan)."""
+        aggregates = ScoreAggregates()
+        latest = {}
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "SELECT student_id, subject, scores FROM evaluations ORDER BY created_at, id")
+            for student_id, subject, scores_json in cursor:
+                scores = json.loads(scores_json)
+                aggregates.add_round(subject, scores, replaced_latest=latest.get((student_id, subject)))
+                latest[(student_id, subject)] = scores
+            self.conn.execute("DELETE FROM item_stats")
+            self.conn.executemany(UPSERT_ITEM_STATS_SQL, _item_stats_rows(aggregates))
+
+    def load_students(self):
+        with self._lock:
+            cursor = self.conn.execute("SELECT student_id, name, class_name FROM students ORDER BY rowid")
+            self.students = {sid: {"name": name, "class": class_name} for sid, name, class_name in cursor}
+            self.index.rebuild(self.students)
+
+    def save_students(self):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO students (student_id, name, class_name) VALUES (?, ?, ?) "
+                "ON CONFLICT(student_id) DO UPDATE SET name = excluded.name, class_name = excluded.class_name",
+                [(sid, info["name"], info.get("class", "")) for sid, info in self.students.items()])
+
+    def load_scores(self):
+        # Score history is queried on demand instead of being loaded up front
+        pass
+
+    def save_scores(self):
+        # Every update_scores call is committed immediately
+        pass
+
+    def add_student(self, student_id: str, name: str, class_name: str = ""):
+        if student_id not in self.students:
+            with self._lock, self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO students (student_id, name, class_name) VALUES (?, ?, ?)",
+                                  (student_id, name, class_name))
+            self.students[student_id] = {"name": name, "class": class_name}
+            self.index.add(student_id, name, class_name)
+            self.version += 1
+
+    def rename_student(self, student_id: str, name: str):
+        if student_id not in self.students:
+            raise ValueError(f"Student {student_id} does not exist")
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE students SET name = ? WHERE student_id = ?", (name, student_id))
+        self.index.rename(student_id, self.students[student_id]["name"], name)
+        self.students[student_id]["name"] = name
+        self.version += 1
+
+    def update_scores(self, student_id: str, subject: str, scores: Dict):
+        if student_id not in self.students:
+            raise ValueError(f"Student {student_id} does not exist")
+        with self._lock, self.conn:
+            self._insert_evaluation(student_id, subject, scores)
+            self.version += 1
+
+    def _insert_evaluation(self, student_id: str, subject: str, scores: Dict):
+        # Runs inside the caller's transaction, so item_stats never disagrees with evaluations
+        delta = ScoreAggregates()
+        delta.add_round(subject, scores, replaced_latest=self._nth_latest(student_id, subject, 0))
+        self.conn.execute(
+            "INSERT INTO evaluations (student_id, subject, created_at, scores) VALUES (?, ?, ?, ?)",
+            (student_id, subject, time.time(), json.dumps(scores, ensure_ascii=False)))
+        self.conn.executemany(UPSERT_ITEM_STATS_SQL, _item_stats_rows(delta))
+
+    def enqueue_pending(self, student_id: str, subject: str, scores: Dict):
+        """Stage a questionnaire round until its report is generated."""
+        if student_id not in self.students:
+            raise ValueError(f"Student {student_id} does not exist")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO pending (student_id, subject, created_at, scores) VALUES (?, ?, ?, ?)",
+                (student_id, subject, time.time(), json.dumps(scores, ensure_ascii=False)))
+            self.version += 1
+
+    def get_pending(self, student_id: str, subject: str) -> Optional[Dict]:
+        """Latest staged round for (student_id, subject), or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT scores FROM pending WHERE subject = ? AND student_id = ? ORDER BY id DESC LIMIT 1",
+                (subject, student_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending_students(self, subject: str) -> Dict[str, Dict]:
+        """student_id -> latest staged round, for every student with a pending round in subject."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT student_id, scores FROM pending WHERE subject = ? ORDER BY id", (subject,)).fetchall()
+        return {sid: json.loads(scores) for sid, scores in rows}
+
+    def bulk_import(self, students: List[Tuple[str, str, str]], rounds: List[Tuple[str, str, Dict]]):
+        """Add or update students and append history rounds in one transaction.
+
+        students: (student_id, name, class_name) with "" leaving an existing
+        student's class unchanged; rounds: (student_id, subject, scores) in
+        chronological order. Nothing is written if a round names a student
+        that is neither known nor in students.
+        """
+        known = set(self.students).union(student[0] for student in students)
+        unknown = sorted({sid for sid, _, _ in rounds if sid not in known})
+        if unknown:
+            raise ValueError(f"Unknown students: {', '.join(unknown[:10])}")
+        delta = ScoreAggregates()
+        latest = {}
+        evaluations = []
+        created_at = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO students (student_id, name, class_name) VALUES (?, ?, ?) "
+                "ON CONFLICT(student_id) DO UPDATE SET name = excluded.name, "
+                "class_name = CASE excluded.class_name WHEN '' THEN class_name ELSE excluded.class_name END",
+                students)
+            for student_id, subject, scores in rounds:
+                key = (student_id, subject)
+                if key not in latest:
+                    latest[key] = self._nth_latest(student_id, subject, 0)
+                delta.add_round(subject, scores, replaced_latest=latest[key])
+                latest[key] = scores
+                evaluations.append((student_id, subject, created_at, json.dumps(scores, ensure_ascii=False)))
+            # Equal created_at values keep insertion order through the id tie-breaker
+            self.conn.executemany(
+                "INSERT INTO evaluations (student_id, subject, created_at, scores) VALUES (?, ?, ?, ?)",
+                evaluations)
+            self.conn.executemany(UPSERT_ITEM_STATS_SQL, _item_stats_rows(delta))
+        for student_id, name, class_name in students:
+            info = self.students.setdefault(student_id, {"class": ""})
+            info["name"] = name
+            info["class"] = class_name or info["class"]
+        self.index.rebuild(self.students)
+        self.version += 1
+
+    def promote_pending(self, student_id: str, subject: str, expected_scores: Optional[Dict] = None) -> Dict:
+        """Move the latest staged round into history and clear the student's queue, in one transaction.
+
+        With expected_scores, raises ValueError and leaves the queue alone if the
+        latest staged round is no longer that one. Rounds staged by other
+        processes after the one promoted stay pending.
+        """
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT id, scores FROM pending WHERE subject = ? AND student_id = ? ORDER BY id DESC LIMIT 1",
+                (subject, student_id)).fetchone()
+            if row is None:
+                raise ValueError(f"Student {student_id} has no pending {subject} evaluation")
+            pending_id, scores = row[0], json.loads(row[1])
+            if expected_scores is not None and scores != expected_scores:
+                raise ValueError(f"Student {student_id}'s pending {subject} evaluation changed since it was read")
+            # Delete first: a process that promoted the same round meanwhile leaves nothing to delete
+            deleted = self.conn.execute("DELETE FROM pending WHERE subject = ? AND student_id = ? AND id <= ?",
+                                        (subject, student_id, pending_id)).rowcount
+            if not deleted:
+                raise ValueError(f"Student {student_id}'s pending {subject} evaluation was already promoted")
+            self._insert_evaluation(student_id, subject, scores)
+            self.version += 1
+        return scores
+
+    def _nth_latest(self, student_id: str, subject: str, offset: int) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT scores FROM evaluations WHERE student_id = ? AND subject = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+                (student_id, subject, offset)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_students_by_name(self, name: str) -> List[str]:
+        """Ids of every student with exactly this name, in roster order."""
+        return self.index.by_name(name)
+
+    def search_students(self, query: str, limit: int = 50) -> List[str]:
+        """Ids whose id, name, pinyin or pinyin initials start with query."""
+        return self.index.search(query, limit)
+
+    def pending_student_ids(self, subject: str, student_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        """Ids with a pending evaluation in subject, optionally only among student_ids."""
+        with self._lock:
+            if student_ids is None:
+                rows = self.conn.execute("SELECT DISTINCT student_id FROM pending WHERE subject = ?", (subject,))
+            else:
+                student_ids = list(student_ids)
+                rows = self.conn.execute(
+                    "SELECT DISTINCT student_id FROM pending WHERE subject = ? AND student_id IN "
+                    f"({', '.join('?' * len(student_ids))})", [subject] + student_ids)
+            return {row[0] for row in rows}
+
+    def classes(self) -> List[str]:
+        return self.index.classes()
+
+    def list_students(self, offset: int = 0, limit: int = 50, class_name: Optional[str] = None,
+                      query: Optional[str] = None, pending_subject: Optional[str] = None) -> RosterPage:
+        """One page of student ids, filtered by class, name search and pending evaluation in pending_subject."""
+        only = self.pending_student_ids(pending_subject) if pending_subject is not None else None
+        return self.index.page(offset, limit, class_name=class_name, query=query, only=only)
+
+    def get_latest_scores(self, student_id: str, subject: str) -> Optional[Dict]:
+        return self._nth_latest(student_id, subject, 0)
+
+    def get_previous_scores(self, student_id: str, subject: str) -> Optional[Dict]:
+        return self._nth_latest(student_id, subject, 1)
+
+    def get_item_stats(self, subject: str, scope: str = "current"):
+        """{item path: ItemStats} for subject; scope is "current" (latest rounds) or "history"."""
+        if scope not in ScoreAggregates.SCOPES:
+            raise ValueError(f"Unknown aggregate scope: {scope}")
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT item, count, total, total_sq, h1, h2, h3, h4, h5 FROM item_stats "
+                "WHERE scope = ? AND subject = ?", (scope, subject)).fetchall()
+        return {tuple(json.loads(item)): ItemStats(count, total, total_sq, histogram)
+                for item, count, total, total_sq, *histogram in rows}
+
+    def get_history(self, student_id: str, subject: str):
+        """All rounds for one student and subject, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT scores FROM evaluations WHERE student_id = ? AND subject = ? "
+                "ORDER BY created_at, id", (student_id, subject)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def history_length(self, student_id: str, subject: str) -> int:
+        """Number of promoted rounds for one student and subject, without decoding them."""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM evaluations WHERE student_id = ? AND subject = ?",
+                                     (student_id, subject)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
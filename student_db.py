@@ -0,0 +1,608 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from aggregates import ScoreAggregates
+from binary_snapshot import MAGIC, META_KEY, BinarySnapshot, binary_to_json, json_to_binary, write_snapshot
+from file_store import FileLock, GroupCommit, atomic_write_text
+from student_index import RosterPage, StudentIndex
+
+
+_shared_databases = {}
+_shared_lock = threading.Lock()
+
+DEFAULT_COMPACT_LOG_BYTES = int(os.environ.get("STUDENT_DB_COMPACT_LOG_BYTES", 8 * 1024 * 1024))
+
+
+def read_students_csv(csv_file: str) -> pd.DataFrame:
+    """students.csv as strings, so zero-padded student IDs ("0101") survive a reload."""
+    return pd.read_csv(csv_file, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+
+def snapshot_generation(path: str) -> int:
+    """log_generation recorded in a json or binary snapshot (0 if it has none)."""
+    with open(path, "rb") as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    if is_binary:
+        return BinarySnapshot(path, cache_size=0).meta.get("log_generation", 0)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get(META_KEY, {}).get("log_generation", 0)
+
+
+def stripped_id_map(student_ids: Iterable[str]) -> Dict[str, str]:
+    """Numeric ID with leading zeros stripped -> the real zero-padded ID.
+
+    Older versions parsed students.csv with inferred dtypes, so "0101" was
+    loaded, and its rounds saved, as "101". Loading remaps such keys.
+    """
+    student_ids = set(student_ids)
+    stripped = {}
+    for student_id in student_ids:
+        if student_id.isascii() and student_id.isdigit() and student_id.startswith("0"):
+            legacy = str(int(student_id))
+            if legacy not in student_ids:
+                stripped[legacy] = student_id
+    return stripped
+
+
+class StudentDatabase:
+    """Student roster (students.csv) plus per-subject score history.
+
+    storage="json" rewrites the whole scores.json on every history update.
+    storage="log" treats scores.json as a compacted snapshot and appends each
+    new evaluation as one line to log_file. compact() folds the log back into
+    the snapshot; writes call it automatically once the log reaches
+    compact_log_bytes (None disables this), so startup replay stays short.
+
+    Questionnaire rounds waiting for a report are kept in a pending queue per
+    (student, subject). Enqueues are small log records in both modes; the
+    queue itself is part of the snapshot. A promotion is a single log record
+    in log mode; in json mode it is a compaction, so the round moves into
+    history and out of the queue in one atomic snapshot replace. pending_file
+    (scores_new.json next to json_file by default) is only read once to import
+    legacy staged rounds.
+
+    snapshot_format="binary" keeps the snapshot in scores.bin instead (see
+    binary_snapshot.py). It loads lazily: the file is memory-mapped, startup
+    reads only the header, per-student round positions and stored aggregates,
+    and a student's history is decoded on first access, with at most
+    history_cache_size decoded histories per subject kept in an LRU.
+
+    Every write holds an exclusive lock file (json_file + ".lock") shared by
+    threads and processes, first catches up with changes other writers made,
+    and replaces whole files atomically (temp file + fsync + rename). Log
+    appends are fsynced outside the lock with group commit, so concurrent
+    writers share fsyncs.
+    """
+
+    def __init__(self, csv_file: str = "students.csv", json_file: str = "scores.json",
+                 storage: str = "json", log_file: Optional[str] = None,
+                 pending_file: Optional[str] = None, snapshot_format: str = "json",
+                 history_cache_size: int = 256, compact_log_bytes: Optional[int] = DEFAULT_COMPACT_LOG_BYTES):
+        if storage not in ("json", "log"):
+            raise ValueError(f"Unknown storage mode: {storage}")
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        self.csv_file = csv_file
+        self.json_file = json_file
+        self.storage = storage
+        self.snapshot_format = snapshot_format
+        self.snapshot_file = json_file if snapshot_format == "json" else f"{os.path.splitext(json_file)[0]}.bin"
+        self.history_cache_size = history_cache_size
+        self.compact_log_bytes = compact_log_bytes
+        self.log_file = log_file or f"{os.path.splitext(json_file)[0]}.log"
+        self.pending_file = pending_file or os.path.join(os.path.dirname(json_file), "scores_new.json")
+        self.generation = 0
+        self.version = 0  # bumped on every write; lets callers cache derived data
+        self.students = {}
+        self.pending = {}  # subject -> {student_id: [staged rounds, oldest first]}
+        self.aggregates = ScoreAggregates()
+        self.index = StudentIndex()  # name and name-search indexes over students
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(f"{json_file}.lock")
+        self._commit = GroupCommit(self.log_file)
+        self._log_offset = 0  # bytes of log_file already applied
+        self._transaction_depth = 0  # nesting of _write_transaction in the thread holding _lock
+        self._stripped_ids: Dict[str, str] = {}
+        with self._file_lock:
+            self.load_students()
+            self.load_scores()
+            self._signature = self.file_signature()
+
+    def file_signature(self):
+        """(mtime_ns, size) of the roster, snapshot and pending files, None for missing files.
+
+        The log is tracked separately by _log_offset, since it only grows
+        between compactions and can be caught up incrementally.
+        """
+        signature = []
+        for path in (self.csv_file, self.snapshot_file, self.pending_file):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _log_size(self) -> int:
+        try:
+            return os.path.getsize(self.log_file)
+        except FileNotFoundError:
+            return 0
+
+    def is_stale(self) -> bool:
+        """True if another writer changed a backing file since this instance last synced."""
+        if self.file_signature() != self._signature:
+            return True
+        return self._log_size() != self._log_offset
+
+    def refresh(self):
+        """Catch up with changes made by other writers (threads, sessions or processes)."""
+        with self._lock, self._file_lock:
+            self._sync_from_disk()
+
+    def _sync_from_disk(self):
+        # Callers hold both locks
+        if self.file_signature() != self._signature:
+            self.students = {}
+            self.pending = {}
+            self.generation = 0
+            self._log_offset = 0
+            self.load_students()
+            self.load_scores()
+            self._signature = self.file_signature()
+            self.version += 1
+        elif self._log_size() != self._log_offset:
+            self._replay_log(self._log_offset)
+            self.version += 1
+
+    @contextmanager
+    def _write_transaction(self):
+        """Hold the thread and file locks, with in-memory state caught up with disk.
+
+        Nested transactions (save_scores -> compact) skip the catch-up: the
+        outer one already synced, and files it has rewritten since, such as the
+        roster in bulk_import, would otherwise look like another writer's
+        changes and be reloaded over its unsaved state.
+        """
+        with self._lock, self._file_lock:
+            outermost = self._transaction_depth == 0
+            if outermost:
+                self._sync_from_disk()
+            self._transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._transaction_depth -= 1
+            self.version += 1
+            if outermost:
+                self._signature = self.file_signature()
+
+    def load_students(self):
+        if os.path.exists(self.csv_file):
+            df = read_students_csv(self.csv_file)
+            classes = df["class"] if "class" in df.columns else [""] * len(df)
+            for student_id, name, class_name in zip(df["student_id"], df["name"], classes):
+                self.students[student_id.strip()] = {"name": name, "class": class_name.strip(), "scores": {}}
+        else:
+            default_students = [
+                {"student_id": "001", "name": "张伟"},
+                {"student_id": "002", "name": "李娜"},
+                {"student_id": "003", "name": "王芳"},
+                {"student_id": "004", "name": "刘洋"},
+                {"student_id": "005", "name": "陈晨"},
+                {"student_id": "006", "name": "杨磊"},
+                {"student_id": "007", "name": "赵静"},
+                {"student_id": "008", "name": "周浩"}
+            ]
+            self.students = {s["student_id"]: {"name": s["name"], "class": "", "scores": {}} for s in default_students}
+            self.save_students()
+        self._stripped_ids = stripped_id_map(self.students)
+        self.index.rebuild(self.students)
+
+    def save_students(self):
+        self._stripped_ids = stripped_id_map(self.students)  # a new "101" is no longer an old "0101"
+        df = pd.DataFrame([
+            {"student_id": sid, "name": info["name"], "class": info.get("class", "")}
+            for sid, info in self.students.items()
+        ])
+        if not any(info.get("class") for info in self.students.values()):
+            df = df.drop(columns="class", errors="ignore")  # keep class-less rosters in the original format
+        with self._file_lock:
+            atomic_write_text(self.csv_file, df.to_csv(index=False))
+
+    def load_scores(self):
+        meta = {}
+        self._adopt_newer_snapshot()
+        if self.snapshot_format == "binary":
+            meta = self._load_binary_snapshot()
+        else:
+            if os.path.exists(self.json_file):
+                with open(self.json_file, "r", encoding="utf-8") as f:
+                    scores_data = json.load(f)
+                    meta = scores_data.get(META_KEY, {})
+                    self.generation = meta.get("log_generation", 0)
+                    for student_id, subjects in scores_data.items():
+                        student_id = self._stripped_ids.get(student_id, student_id)
+                        if student_id in self.students:
+                            self.students[student_id]["scores"] = subjects
+            self._rebuild_aggregates()
+        if "pending" in meta:
+            self.pending = {subject: {self._stripped_ids.get(sid, sid): rounds for sid, rounds in students.items()}
+                            for subject, students in meta["pending"].items()}
+        else:
+            self.load_pending()
+        self._replay_log()
+
+    def _adopt_newer_snapshot(self):
+        """Convert the other format's snapshot into ours if it is the newer one.
+
+        After a snapshot_format switch the other file may hold a later
+        generation; loading the stale one would skip that generation's log
+        records and the next compaction would clear them. The binary header
+        is cheap to read, but scores.json is only parsed when its mtime says
+        it may be newer.
+        """
+        if self.snapshot_format == "binary":
+            other, convert = self.json_file, json_to_binary
+        else:
+            other, convert = f"{os.path.splitext(self.json_file)[0]}.bin", binary_to_json
+        if not os.path.exists(other):
+            return
+        if os.path.exists(self.snapshot_file):
+            if self.snapshot_format == "binary" and os.path.getmtime(other) <= os.path.getmtime(self.snapshot_file):
+                return
+            if snapshot_generation(other) <= snapshot_generation(self.snapshot_file):
+                return
+        convert(other, self.snapshot_file)
+
+    def _load_binary_snapshot(self) -> Dict:
+        if not os.path.exists(self.snapshot_file):
+            self._rebuild_aggregates()
+            return {}
+        snapshot = BinarySnapshot(self.snapshot_file, cache_size=self.history_cache_size)
+        meta = snapshot.meta
+        self.generation = meta.get("log_generation", 0)
+        for student_id, subjects in snapshot.histories().items():
+            student_id = self._stripped_ids.get(student_id, student_id)
+            if student_id in self.students:
+                self.students[student_id]["scores"] = subjects
+        if {self._stripped_ids.get(sid, sid) for sid in snapshot.student_ids} <= set(self.students):
+            self.aggregates = snapshot.aggregates()
+        else:
+            self._rebuild_aggregates()  # rounds of removed students must not count
+        return meta
+
+    def _write_snapshot(self, meta: Optional[Dict] = None):
+        histories = {sid: info["scores"] for sid, info in self.students.items()}
+        with self._file_lock:
+            if self.snapshot_format == "binary":
+                # Snapshots always hold the full in-memory state, so its aggregates match
+                write_snapshot(self.snapshot_file, histories, meta, self.aggregates)
+                return
+            if meta is not None:
+                histories[META_KEY] = meta
+            atomic_write_text(self.json_file, json.dumps(histories, ensure_ascii=False, indent=2))
+
+    def load_pending(self):
+        """Read staged rounds from pending_file ({student_id: {subject: [rounds]}})."""
+        self.pending = {}
+        if os.path.exists(self.pending_file):
+            with open(self.pending_file, "r", encoding="utf-8") as f:
+                staged = json.load(f)
+            for student_id, subjects in staged.items():
+                student_id = self._stripped_ids.get(student_id, student_id)
+                for subject, rounds in subjects.items():
+                    if student_id in self.students and rounds:
+                        self.pending.setdefault(subject, {})[student_id] = rounds
+
+    def _rebuild_aggregates(self):
+        self.aggregates = ScoreAggregates()
+        for info in self.students.values():
+            for subject, rounds in info["scores"].items():
+                previous = None
+                for scores in rounds:
+                    self.aggregates.add_round(subject, scores, replaced_latest=previous)
+                    previous = scores
+
+    def save_scores(self):
+        # A compaction also folds pending enqueues from the log into the snapshot (json mode)
+        self.compact()
+
+    def _apply_scores(self, student_id: str, subject: str, scores: Dict):
+        rounds = self.students[student_id]["scores"].setdefault(subject, [])
+        self.aggregates.add_round(subject, scores, replaced_latest=rounds[-1] if rounds else None)
+        rounds.append(scores)
+
+    def _apply_enqueue(self, student_id: str, subject: str, scores: Dict):
+        self.pending.setdefault(subject, {}).setdefault(student_id, []).append(scores)
+
+    def _apply_promote(self, student_id: str, subject: str, scores: Dict):
+        self.pending.get(subject, {}).pop(student_id, None)
+        self._apply_scores(student_id, subject, scores)
+
+    def _replay_log(self, start: int = 0):
+        """Apply log records from byte offset start that belong to the current snapshot generation.
+
+        Called with the file lock held, so no append is in flight: a torn final
+        line can only come from a crash mid-append and is truncated away so the
+        next append starts on a clean line.
+        """
+        if not os.path.exists(self.log_file):
+            self._log_offset = 0
+            return
+        good_offset = start
+        with open(self.log_file, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    break
+                # Records from an older generation are already in the snapshot
+                if record.get("gen", 0) < self.generation:
+                    good_offset += len(raw)
+                    continue
+                if record.get("gen", 0) > self.generation:
+                    # Compacting now would clear rounds that no loaded snapshot holds
+                    raise ValueError(f"{self.log_file} holds generation {record['gen']} records but "
+                                     f"{self.snapshot_file} is at generation {self.generation}; "
+                                     f"restore the newer snapshot before starting")
+                good_offset += len(raw)
+                record["student_id"] = self._stripped_ids.get(record["student_id"], record["student_id"])
+                if record["student_id"] not in self.students:
+                    continue
+                op = record.get("op", "history")
+                if op == "enqueue":
+                    self._apply_enqueue(record["student_id"], record["subject"], record["scores"])
+                elif op == "promote":
+                    self._apply_promote(record["student_id"], record["subject"], record["scores"])
+                else:
+                    self._apply_scores(record["student_id"], record["subject"], record["scores"])
+        if good_offset != os.path.getsize(self.log_file):
+            with open(self.log_file, "r+b") as f:
+                f.truncate(good_offset)
+                os.fsync(f.fileno())
+        self._log_offset = good_offset
+
+    def _log_line(self, student_id: str, subject: str, scores: Dict, op: str = "history") -> bytes:
+        record = {"gen": self.generation, "student_id": student_id, "subject": subject, "scores": scores}
+        if op != "history":
+            record["op"] = op
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _append_log(self, student_id: str, subject: str, scores: Dict, op: str = "history") -> int:
+        """Append one record without fsync; returns a ticket for _commit.wait_durable()."""
+        return self._append_log_lines(self._log_line(student_id, subject, scores, op))
+
+    def _append_log_lines(self, data: bytes) -> int:
+        # Called inside _write_transaction, so the records land exactly at _log_offset
+        fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        self._log_offset += len(data)
+        return self._commit.written()
+
+    def compact(self):
+        """Fold the log into a new snapshot and start an empty log.
+
+        The snapshot carries the next generation number before the log is
+        cleared, so a crash between the two steps never replays old records twice.
+        """
+        with self._write_transaction():
+            next_generation = self.generation + 1
+            self._write_snapshot({"log_generation": next_generation, "pending": self.pending})
+            self.generation = next_generation
+            atomic_write_text(self.log_file, "")
+            self._log_offset = 0
+
+    def _maybe_compact(self):
+        # Checked outside the write transaction; concurrent writers may both compact, which is harmless
+        if self.compact_log_bytes is not None and self._log_offset >= self.compact_log_bytes:
+            self.compact()
+
+    def add_student(self, student_id: str, name: str, class_name: str = ""):
+        with self._write_transaction():
+            if student_id not in self.students:
+                self.students[student_id] = {"name": name, "class": class_name, "scores": {}}
+                self.save_students()
+                self.index.add(student_id, name, class_name)
+
+    def rename_student(self, student_id: str, name: str):
+        with self._write_transaction():
+            if student_id not in self.students:
+                raise ValueError(f"Student {student_id} does not exist")
+            old_name = self.students[student_id]["name"]
+            self.students[student_id]["name"] = name
+            self.save_students()
+            self.index.rename(student_id, old_name, name)
+
+    def update_scores(self, student_id: str, subject: str, scores: Dict):
+        ticket = None
+        with self._write_transaction():
+            if student_id not in self.students:
+                raise ValueError(f"Student {student_id} does not exist")
+            if self.storage == "log":
+                ticket = self._append_log(student_id, subject, scores)
+                self._apply_scores(student_id, subject, scores)
+            else:
+                self._apply_scores(student_id, subject, scores)
+                self.save_scores()
+        if ticket is not None:
+            self._commit.wait_durable(ticket)
+            self._maybe_compact()
+
+    def enqueue_pending(self, student_id: str, subject: str, scores: Dict):
+        """Stage a questionnaire round until its report is generated."""
+        with self._write_transaction():
+            if student_id not in self.students:
+                raise ValueError(f"Student {student_id} does not exist")
+            ticket = self._append_log(student_id, subject, scores, op="enqueue")
+            self._apply_enqueue(student_id, subject, scores)
+        self._commit.wait_durable(ticket)
+        self._maybe_compact()
+
+    def get_pending(self, student_id: str, subject: str) -> Optional[Dict]:
+        """Latest staged round for (student_id, subject), or None."""
+        rounds = self.pending.get(subject, {}).get(student_id)
+        return rounds[-1] if rounds else None
+
+    def pending_students(self, subject: str) -> Dict[str, Dict]:
+        """student_id -> latest staged round, for every student with a pending round in subject."""
+        return {sid: rounds[-1] for sid, rounds in self.pending.get(subject, {}).items() if rounds}
+
+    def bulk_import(self, students: List[Tuple[str, str, str]], rounds: List[Tuple[str, str, Dict]]):
+        """Add or update students and append history rounds in one write.
+
+        students: (student_id, name, class_name) with "" leaving an existing
+        student's class unchanged; rounds: (student_id, subject, scores)
+        in chronological order. Nothing is written if a round names a student
+        that is neither known nor in students. The roster is saved once and all
+        rounds go out in a single log append (or one scores.json rewrite) with
+        one fsync; the roster is written first, so a crash in between can leave
+        new students without scores but never scores without a student.
+        """
+        ticket = None
+        with self._write_transaction():
+            known = set(self.students).union(student[0] for student in students)
+            unknown = sorted({sid for sid, _, _ in rounds if sid not in known})
+            if unknown:
+                raise ValueError(f"Unknown students: {', '.join(unknown[:10])}")
+            roster_changed = False
+            for student_id, name, class_name in students:
+                info = self.students.get(student_id)
+                if info is None:
+                    self.students[student_id] = {"name": name, "class": class_name, "scores": {}}
+                    roster_changed = True
+                elif info["name"] != name or (class_name and info.get("class") != class_name):
+                    info["name"] = name
+                    info["class"] = class_name or info.get("class", "")
+                    roster_changed = True
+            if roster_changed:
+                self.save_students()
+                self.index.rebuild(self.students)
+            if not rounds:
+                return
+            if self.storage == "log":
+                ticket = self._append_log_lines(b"".join(
+                    self._log_line(student_id, subject, scores) for student_id, subject, scores in rounds))
+            for student_id, subject, scores in rounds:
+                self._apply_scores(student_id, subject, scores)
+            if self.storage != "log":
+                self.save_scores()
+        if ticket is not None:
+            self._commit.wait_durable(ticket)
+            self._maybe_compact()
+
+    def promote_pending(self, student_id: str, subject: str, expected_scores: Optional[Dict] = None) -> Dict:
+        """Move the latest staged round into history and clear the student's queue for subject.
+
+        Older staged rounds were superseded by the latest one and are dropped.
+        It is atomic in both modes: a single log record, or one snapshot
+        replace that carries both the history and the queue.
+
+        expected_scores makes this a compare-and-swap: pass the round the report
+        was generated for, and if another session staged a newer round (or
+        promoted this one) meanwhile, ValueError is raised and the queue is left
+        untouched.
+        """
+        ticket = None
+        with self._write_transaction():
+            scores = self.get_pending(student_id, subject)
+            if scores is None:
+                raise ValueError(f"Student {student_id} has no pending {subject} evaluation")
+            if expected_scores is not None and scores != expected_scores:
+                raise ValueError(f"Student {student_id}'s pending {subject} evaluation changed since it was read")
+            if self.storage == "log":
+                ticket = self._append_log(student_id, subject, scores, op="promote")
+                self._apply_promote(student_id, subject, scores)
+            else:
+                self._apply_promote(student_id, subject, scores)
+                self.save_scores()
+        if ticket is not None:
+            self._commit.wait_durable(ticket)
+            self._maybe_compact()
+        return scores
+
+    def find_students_by_name(self, name: str) -> List[str]:
+        """Ids of every student with exactly this name, in roster order."""
+        return self.index.by_name(name)
+
+    def search_students(self, query: str, limit: int = 50) -> List[str]:
+        """Ids whose id, name, pinyin or pinyin initials start with query."""
+        return self.index.search(query, limit)
+
+    def pending_student_ids(self, subject: str, student_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        """Ids with a pending evaluation in subject, optionally only among student_ids."""
+        queued = self.pending.get(subject, {})
+        candidates = queued if student_ids is None else student_ids
+        return {sid for sid in candidates if queued.get(sid)}
+
+    def classes(self) -> List[str]:
+        return self.index.classes()
+
+    def list_students(self, offset: int = 0, limit: int = 50, class_name: Optional[str] = None,
+                      query: Optional[str] = None, pending_subject: Optional[str] = None) -> RosterPage:
+        """One page of student ids, filtered by class, name search and pending evaluation in pending_subject."""
+        only = self.pending_student_ids(pending_subject) if pending_subject is not None else None
+        return self.index.page(offset, limit, class_name=class_name, query=query, only=only)
+
+    def get_latest_scores(self, student_id: str, subject: str) -> Optional[Dict]:
+        if (student_id in self.students and
+                subject in self.students[student_id]["scores"] and
+                self.students[student_id]["scores"][subject]):
+            return self.students[student_id]["scores"][subject][-1]
+        return None
+
+    def get_previous_scores(self, student_id: str, subject: str) -> Optional[Dict]:
+        if (student_id in self.students and
+                subject in self.students[student_id]["scores"] and
+                len(self.students[student_id]["scores"][subject]) > 1):
+            return self.students[student_id]["scores"][subject][-2]
+        return None
+
+    def get_item_stats(self, subject: str, scope: str = "current"):
+        """{item path: ItemStats} for subject; scope is "current" (latest rounds) or "history"."""
+        return self.aggregates.get(subject, scope)
+
+    def get_history(self, student_id: str, subject: str):
+        """All rounds for one student and subject, oldest first."""
+        if student_id in self.students:
+            return list(self.students[student_id]["scores"].get(subject, []))
+        return []
+
+    def history_length(self, student_id: str, subject: str) -> int:
+        """Number of promoted rounds for one student and subject, without decoding them."""
+        if student_id in self.students:
+            return len(self.students[student_id]["scores"].get(subject, ()))
+        return 0
+
+
+def get_shared_database(csv_file: str = "students.csv", json_file: str = "scores.json",
+                        storage: str = "json", snapshot_format: str = "json") -> StudentDatabase:
+    """Process-wide StudentDatabase, refreshed only when its files change on disk.
+
+    Streamlit re-executes the script on every interaction but keeps imported
+    modules, so this turns a full CSV/JSON reload per rerun into a few stat()
+    calls. Writes made through the returned instance do not invalidate it;
+    writes by other processes are caught up with refresh().
+    """
+    key = (os.path.abspath(csv_file), os.path.abspath(json_file), storage, snapshot_format)
+    with _shared_lock:
+        db = _shared_databases.get(key)
+        if db is None:
+            db = StudentDatabase(csv_file, json_file, storage=storage, snapshot_format=snapshot_format)
+            _shared_databases[key] = db
+        elif db.is_stale():
+            db.refresh()
+        return db
@@ -0,0 +1,173 @@
+import bisect
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # pinyin search is optional
+    lazy_pinyin = None
+
+# character -> pinyin, so each distinct character is converted once per process
+_char_pinyin: Dict[str, str] = {}
+
+
+def _pinyin(char: str) -> str:
+    syllable = _char_pinyin.get(char)
+    if syllable is None:
+        syllable = lazy_pinyin(char)[0].lower() if "一" <= char <= "鿿" else char.lower()
+        _char_pinyin[char] = syllable
+    return syllable
+
+
+def search_keys(student_id: str, name: str) -> Set[str]:
+    """Lower-cased keys a student can be found by: id, name, and the name's full pinyin and initials."""
+    name = str(name)
+    keys = {student_id.lower(), name.lower()}
+    if lazy_pinyin is not None:
+        syllables = [_pinyin(char) for char in name if not char.isspace()]
+        keys.add("".join(syllables))
+        keys.add("".join(syllable[:1] for syllable in syllables))
+    keys.discard("")
+    return keys
+
+
+class RosterPage(NamedTuple):
+    student_ids: List[str]  # the requested page, in roster order
+    total: int  # students matching the filters
+
+
+class StudentIndex:
+    """Secondary indexes over a roster, kept up to date on add and rename.
+
+    by_name() is an exact name lookup that keeps every id of a shared name;
+    search() is a prefix search over ids, names and (with pypinyin installed)
+    full pinyin and pinyin initials, e.g. "张", "zhangw" or "zw" for 张伟.
+    Both cost O(log n + matches) instead of a scan of the roster. page()
+    slices the roster, optionally filtered, touching only the students of
+    the narrowest filter.
+    """
+
+    def __init__(self, students: Dict = None):
+        self._lock = threading.Lock()
+        self._ids: List[str] = []  # roster order
+        self._position: Dict[str, int] = {}
+        self._by_class: Dict[str, List[str]] = {}
+        self._class_of: Dict[str, str] = {}
+        self._by_name: Dict[str, List[str]] = {}
+        self._keys: List[tuple] = []  # sorted (key, student_id)
+        self._keys_of: Dict[str, Set[str]] = {}
+        self.rebuild(students or {})
+
+    def rebuild(self, students: Dict):
+        """students: {student_id: {"name": ..., "class": ...}}, in roster order."""
+        ids = list(students)
+        by_class: Dict[str, List[str]] = {}
+        class_of = {student_id: info.get("class", "") for student_id, info in students.items()}
+        by_name: Dict[str, List[str]] = {}
+        keys_of = {}
+        for student_id, info in students.items():
+            by_class.setdefault(class_of[student_id], []).append(student_id)
+            by_name.setdefault(info["name"], []).append(student_id)
+            keys_of[student_id] = search_keys(student_id, info["name"])
+        keys = sorted((key, student_id) for student_id, student_keys in keys_of.items() for key in student_keys)
+        with self._lock:
+            self._ids = ids
+            self._position = {student_id: i for i, student_id in enumerate(ids)}
+            self._by_class = by_class
+            self._class_of = class_of
+            self._by_name = by_name
+            self._keys = keys
+            self._keys_of = keys_of
+
+    def add(self, student_id: str, name: str, class_name: str = ""):
+        with self._lock:
+            self._position[student_id] = len(self._ids)
+            self._ids.append(student_id)
+            self._by_class.setdefault(class_name, []).append(student_id)
+            self._class_of[student_id] = class_name
+            self._by_name.setdefault(name, []).append(student_id)
+            self._keys_of[student_id] = search_keys(student_id, name)
+            for key in self._keys_of[student_id]:
+                bisect.insort(self._keys, (key, student_id))
+
+    def rename(self, student_id: str, old_name: str, new_name: str):
+        with self._lock:
+            ids = self._by_name.get(old_name, [])
+            if student_id in ids:
+                ids.remove(student_id)
+                if not ids:
+                    del self._by_name[old_name]
+            self._by_name.setdefault(new_name, []).append(student_id)
+            for key in search_keys(student_id, old_name):
+                position = bisect.bisect_left(self._keys, (key, student_id))
+                if position < len(self._keys) and self._keys[position] == (key, student_id):
+                    del self._keys[position]
+            self._keys_of[student_id] = search_keys(student_id, new_name)
+            for key in self._keys_of[student_id]:
+                bisect.insort(self._keys, (key, student_id))
+
+    def classes(self) -> List[str]:
+        """Every non-empty class name, sorted."""
+        with self._lock:
+            return sorted(name for name in self._by_class if name)
+
+    def by_name(self, name: str) -> List[str]:
+        with self._lock:
+            return list(self._by_name.get(name, ()))
+
+    def search(self, query: str, limit: Optional[int] = 50) -> List[str]:
+        """Up to limit ids whose id, name or pinyin starts with query, in key order (exact matches first)."""
+        query = query.strip().lower()
+        results = []
+        if not query:
+            return results
+        seen = set()
+        with self._lock:
+            position = bisect.bisect_left(self._keys, (query,))
+            while position < len(self._keys) and (limit is None or len(results) < limit):
+                key, student_id = self._keys[position]
+                if not key.startswith(query):
+                    break
+                if student_id not in seen:
+                    seen.add(student_id)
+                    results.append(student_id)
+                position += 1
+        return results
+
+    def page(self, offset: int, limit: int, class_name: Optional[str] = None, query: Optional[str] = None,
+             only: Optional[Set[str]] = None) -> RosterPage:
+        """One page of the roster, filtered by class, search query and/or an id set (e.g. pending students).
+
+        Unfiltered or by class alone this is a list slice; otherwise the
+        students of the narrowest filter are checked against the others, so
+        the cost follows that filter's size rather than the roster's.
+        """
+        query = (query or "").strip().lower()
+        with self._lock:
+            filters = {}  # filter -> (size, candidate ids)
+            if query:
+                start = bisect.bisect_left(self._keys, (query,))
+                stop = bisect.bisect_left(self._keys, (query + "\uffff",))
+                filters["query"] = (stop - start, lambda: {student_id for _, student_id in self._keys[start:stop]})
+            if only is not None:
+                filters["only"] = (len(only), lambda: only)
+            if class_name is not None:
+                members = self._by_class.get(class_name, [])
+                if not filters:
+                    return RosterPage(members[offset:offset + limit], len(members))
+                filters["class"] = (len(members), lambda: members)
+            if not filters:
+                return RosterPage(self._ids[offset:offset + limit], len(self._ids))
+
+            driver = min(filters, key=lambda name: filters[name][0])
+            matches = [
+                student_id for student_id in filters[driver][1]()
+                if student_id in self._class_of
+                and (driver == "class" or class_name is None or self._class_of[student_id] == class_name)
+                and (driver == "only" or only is None or student_id in only)
+                and (driver == "query" or not query
+                     or any(key.startswith(query) for key in self._keys_of[student_id]))
+            ]
+            if driver != "class":
+                matches.sort(key=self._position.__getitem__)
+        return RosterPage(matches[offset:offset + limit], len(matches))
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with open(os.path.join(ROOT, "EVALUATION_SCHEMA.json"), "r", encoding="utf-8") as f:
+    SCHEMA = json.load(f)
+SUBJECT = "语文" if "语文" in SCHEMA else next(iter(SCHEMA))
+
+
+def make_scores(value: int, subject: str = SUBJECT) -> dict:
+    """A full round for subject with every item scored value."""
+    scores = {}
+    for category, subcategories in SCHEMA[subject].items():
+        if isinstance(subcategories, dict):
+            scores[category] = {subcategory: {item: value for item in items}
+                                for subcategory, items in subcategories.items()}
+        else:
+            scores[category] = {item: value for item in subcategories}
+    return scores
+
+
+@pytest.fixture
+def schema():
+    return SCHEMA
+
+
+@pytest.fixture
+def subject():
+    return SUBJECT
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """students.csv with three students, one of them with a zero-padded ID."""
+    path = tmp_path / "students.csv"
+    path.write_text("student_id,name\n0101,张伟\nS2,李娜\nS3,王芳\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    return str(tmp_path / "scores.json")
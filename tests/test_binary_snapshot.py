@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from binary_snapshot import META_KEY, binary_to_json, json_to_binary
+from conftest import make_scores
+from student_db import StudentDatabase
+
+
+def stats_fields(stats):
+    return {path: (item.count, item.total, item.total_sq, item.histogram) for path, item in stats.items()}
+
+
+def fill(db, subject):
+    db.update_scores("0101", subject, make_scores(1))
+    db.update_scores("0101", subject, make_scores(5))
+    db.update_scores("S3", subject, make_scores(3))
+    db.enqueue_pending("S2", subject, make_scores(2))
+
+
+def test_json_binary_round_trip(tmp_path, csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file)
+    fill(db, subject)
+    db.compact()
+    with open(json_file, "r", encoding="utf-8") as f:
+        original = json.load(f)
+
+    json_to_binary(json_file, str(tmp_path / "scores.bin"))
+    binary_to_json(str(tmp_path / "scores.bin"), str(tmp_path / "back.json"))
+    with open(tmp_path / "back.json", "r", encoding="utf-8") as f:
+        assert json.load(f) == original
+    assert original[META_KEY]["pending"] == {subject: {"S2": [make_scores(2)]}}
+
+
+def test_binary_database_matches_json_database(tmp_path, csv_file, subject):
+    databases = {}
+    for snapshot_format in ("json", "binary"):
+        json_file = str(tmp_path / f"{snapshot_format}.json")
+        fill(StudentDatabase(csv_file, json_file, storage="log", snapshot_format=snapshot_format), subject)
+        db = StudentDatabase(csv_file, json_file, storage="log", snapshot_format=snapshot_format)
+        db.compact()
+        databases[snapshot_format] = StudentDatabase(csv_file, json_file, storage="log",
+                                                     snapshot_format=snapshot_format)
+    json_db, binary_db = databases["json"], databases["binary"]
+    for student_id in json_db.students:
+        assert binary_db.get_history(student_id, subject) == json_db.get_history(student_id, subject)
+    assert binary_db.get_pending("S2", subject) == make_scores(2)
+    for scope in ("current", "history"):
+        assert (stats_fields(binary_db.get_item_stats(subject, scope))
+                == stats_fields(json_db.get_item_stats(subject, scope)))
+
+
+@pytest.mark.parametrize("first, second", [("binary", "json"), ("json", "binary")])
+def test_switching_snapshot_format_keeps_newer_rounds(csv_file, json_file, subject, first, second):
+    # Each format has written a snapshot; `first` wrote the later one and has log records on top
+    old = StudentDatabase(csv_file, json_file, storage="log", snapshot_format=second)
+    old.update_scores("S2", subject, make_scores(1))
+    old.compact()
+    db = StudentDatabase(csv_file, json_file, storage="log", snapshot_format=first)
+    db.update_scores("S2", subject, make_scores(2))
+    db.compact()
+    db.update_scores("S2", subject, make_scores(3))
+
+    switched = StudentDatabase(csv_file, json_file, storage="log", snapshot_format=second)
+    assert switched.history_length("S2", subject) == 3
+    switched.compact()
+    reloaded = StudentDatabase(csv_file, json_file, storage="log", snapshot_format=second)
+    assert reloaded.history_length("S2", subject) == 3
+    assert reloaded.get_latest_scores("S2", subject) == make_scores(3)
+
+
+def test_log_newer_than_every_snapshot_is_refused(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file, storage="log")
+    db.compact()
+    db.update_scores("S2", subject, make_scores(4))
+    os.remove(json_file)  # e.g. an older backup restored over, or the snapshot lost
+
+    with pytest.raises(ValueError):
+        StudentDatabase(csv_file, json_file, storage="log")
+    assert os.path.getsize(db.log_file) > 0
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from bulk_import import bulk_import, scores_template
+from conftest import make_scores
+from schema import CompiledSchema
+from sqlite_db import SQLiteStudentDatabase
+from student_db import StudentDatabase
+
+
+def write_scores_file(path, compiled, subject, rows):
+    n_items = len(compiled.items(subject))
+    lines = [f"{student_id}," + ",".join([str(value)] * n_items) for student_id, value in rows]
+    path.write_text(scores_template(compiled, subject) + "\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def compiled(schema):
+    return CompiledSchema(schema)
+
+
+def test_roster_and_rounds_are_committed_with_zero_padded_ids(tmp_path, csv_file, json_file, compiled, subject):
+    roster = tmp_path / "roster.csv"
+    roster.write_text("student_id,name,class\n0102,赵敏,一班\n", encoding="utf-8")
+    scores = write_scores_file(tmp_path / "scores.csv", compiled, subject, [("0102", 2), ("0102", 4)])
+    db = StudentDatabase(csv_file, json_file)
+
+    report = bulk_import(db, compiled, roster=str(roster), scores=scores, subject=subject)
+    assert report.errors == []
+    assert (report.students, report.rounds) == (1, 2)
+
+    reloaded = StudentDatabase(csv_file, json_file)
+    assert "0102" in reloaded.students and "102" not in reloaded.students
+    assert reloaded.history_length("0102", subject) == 2
+    assert reloaded.get_latest_scores("0102", subject) == make_scores(4)
+
+
+def test_an_invalid_row_commits_nothing(tmp_path, csv_file, json_file, compiled, subject):
+    scores = write_scores_file(tmp_path / "scores.csv", compiled, subject, [("S2", 3), ("S3", 7), ("S9", 3)])
+    db = StudentDatabase(csv_file, json_file)
+
+    report = bulk_import(db, compiled, scores=scores, subject=subject)
+    assert any(line == 3 and "1-5" in message for _, line, message in report.errors)
+    assert any("S9" in message for _, _, message in report.errors)
+    assert report.rounds == 0
+    assert StudentDatabase(csv_file, json_file).history_length("S2", subject) == 0
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_rounds_saved_under_stripped_ids_are_remapped(tmp_path, csv_file, json_file, subject, backend):
+    # Older versions loaded students.csv row "0101" as 101 and saved its rounds under "101"
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump({"101": {subject: [make_scores(3)]}}, f, ensure_ascii=False)
+    if backend == "sqlite":
+        db = SQLiteStudentDatabase(str(tmp_path / "students.db"), csv_file, json_file)
+    else:
+        db = StudentDatabase(csv_file, json_file)
+    assert "101" not in db.students
+    assert db.get_latest_scores("0101", subject) == make_scores(3)
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from student_db import StudentDatabase
+
+SUBJECT = "语文"
+PROCESSES, THREADS, WRITES = 3, 2, 20
+
+
+def worker(directory: str, storage: str, snapshot_format: str, process_index: int):
+    db = StudentDatabase(os.path.join(directory, "students.csv"), os.path.join(directory, "scores.json"),
+                         storage=storage, snapshot_format=snapshot_format)
+
+    def run(thread_index: int):
+        own_id = f"w{process_index}-{thread_index}"
+        for i in range(WRITES):
+            # Binary snapshots store scores as 1..255
+            scores = {"stress": {"writer": process_index * THREADS + thread_index + 1, "seq": i + 1}}
+            if i % 2:
+                db.update_scores("S2", SUBJECT, scores)  # every writer shares this student
+            else:
+                db.enqueue_pending(own_id, SUBJECT, scores)
+                db.promote_pending(own_id, SUBJECT, expected_scores=scores)
+            if storage == "log" and process_index == 0 and thread_index == 0 and i % 10 == 9:
+                db.compact()
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.parametrize("storage, snapshot_format", [("json", "json"), ("log", "json"), ("log", "binary")])
+def test_concurrent_writers_lose_and_duplicate_nothing(tmp_path, csv_file, json_file, storage, snapshot_format):
+    setup = StudentDatabase(csv_file, json_file, storage=storage, snapshot_format=snapshot_format)
+    for p in range(PROCESSES):
+        for t in range(THREADS):
+            setup.add_student(f"w{p}-{t}", f"写入者{p}-{t}")
+
+    # spawn, not fork: forking a process whose threads may hold locks is unsafe
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=worker, args=(str(tmp_path), storage, snapshot_format, p))
+                 for p in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0] * PROCESSES
+
+    db = StudentDatabase(csv_file, json_file, storage=storage, snapshot_format=snapshot_format)
+    seen = [(scores["stress"]["writer"], scores["stress"]["seq"])
+            for student_id in db.students for scores in db.get_history(student_id, SUBJECT)]
+    assert len(seen) == len(set(seen)) == PROCESSES * THREADS * WRITES
+    assert db.history_length("S2", SUBJECT) == PROCESSES * THREADS * WRITES // 2
+    assert not db.pending_students(SUBJECT)
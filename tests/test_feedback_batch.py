@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from conftest import make_scores
+from feedback import FeedbackGenerator, parse_batch_reply
+from student_db import StudentDatabase
+
+
+class FakeRouter:
+    """Stands in for ProviderRouter.achat: batched (json_mode) prompts get batch_reply(prompt)."""
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.batch_calls = 0
+        self.single_calls = 0
+
+    async def achat(self, prompt, json_mode=False, **kwargs):
+        if json_mode:
+            self.batch_calls += 1
+            return "DeepSeek", self.batch_reply(prompt)
+        self.single_calls += 1
+        return "DeepSeek", "单独反馈"
+
+
+def reports(*entries):
+    return json.dumps({"reports": [{"student_id": sid, "feedback": text} for sid, text in entries]},
+                      ensure_ascii=False)
+
+
+@pytest.fixture
+def db(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file)
+    for value, student_id in enumerate(["0101", "S2", "S3"], start=2):
+        db.update_scores(student_id, subject, make_scores(value))
+    return db
+
+
+def generate(schema, subject, db, router, batch_size=3):
+    generator = FeedbackGenerator(schema, {subject: "{score_details}"}, router=router)
+    results = generator.generate_feedback_batch(["0101", "S2", "S3"], subject, db, "DeepSeek", "k",
+                                                batch_size=batch_size)
+    return {result.student_id: result for result in results}
+
+
+def test_one_request_serves_the_whole_batch(schema, subject, db):
+    router = FakeRouter(lambda prompt: "```json\n" + reports(("0101", "甲"), ("S2", "乙"), ("S3", "丙")) + "\n```")
+    results = generate(schema, subject, db, router)
+    assert {sid: result.feedback for sid, result in results.items()} == {"0101": "甲", "S2": "乙", "S3": "丙"}
+    assert (router.batch_calls, router.single_calls) == (1, 0)
+
+
+def test_malformed_batch_reply_falls_back_to_single_requests(schema, subject, db):
+    router = FakeRouter(lambda prompt: '{"reports": [{"student_id": "0101", "feedback": "甲"')  # cut off
+    results = generate(schema, subject, db, router)
+    assert all(result.feedback == "单独反馈" for result in results.values()) and len(results) == 3
+    assert (router.batch_calls, router.single_calls) == (1, 3)
+
+
+def test_students_missing_from_the_reply_are_regenerated(schema, subject, db):
+    router = FakeRouter(lambda prompt: reports(("0101", "甲"), ("S2", " "), ("S9", "陌生"), ("0101", "重复")))
+    results = generate(schema, subject, db, router)
+    assert {sid: result.feedback for sid, result in results.items()} == {"0101": "甲", "S2": "单独反馈",
+                                                                        "S3": "单独反馈"}
+    assert router.single_calls == 2
+
+
+def test_failed_batch_request_falls_back_to_single_requests(schema, subject, db):
+    def fail(prompt):
+        raise ValueError("DeepSeek 返回了空回复")
+
+    router = FakeRouter(fail)
+    results = generate(schema, subject, db, router)
+    assert all(result.error is None and result.feedback == "单独反馈" for result in results.values())
+    assert (router.batch_calls, router.single_calls) == (1, 3)
+
+
+def test_parse_batch_reply_ignores_text_around_the_json():
+    reply = "好的：\n" + reports(("1", "甲"), ("2", "乙")) + "\n以上。"
+    assert parse_batch_reply(reply, ["1", "2"]) == {"1": "甲", "2": "乙"}
+    assert parse_batch_reply("不是 JSON", ["1"]) == {}
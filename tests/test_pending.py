@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from conftest import make_scores
+from sqlite_db import SQLiteStudentDatabase
+from student_db import StudentDatabase
+
+
+@pytest.fixture(params=["json", "log", "sqlite"])
+def open_db(request, tmp_path, csv_file, json_file):
+    """Opens (or reopens) the same database in the parametrized backend."""
+    def open_db():
+        if request.param == "sqlite":
+            return SQLiteStudentDatabase(str(tmp_path / "students.db"), csv_file, json_file)
+        return StudentDatabase(csv_file, json_file, storage=request.param)
+    return open_db
+
+
+def test_promote_moves_the_latest_round_into_history(open_db, subject):
+    db = open_db()
+    db.enqueue_pending("S2", subject, make_scores(2))
+    db.enqueue_pending("S2", subject, make_scores(4))
+    assert db.promote_pending("S2", subject, expected_scores=make_scores(4)) == make_scores(4)
+
+    reloaded = open_db()
+    assert reloaded.get_pending("S2", subject) is None
+    assert reloaded.history_length("S2", subject) == 1
+    assert reloaded.get_latest_scores("S2", subject) == make_scores(4)
+
+
+def test_promote_refuses_a_round_that_changed_since_it_was_read(open_db, subject):
+    db = open_db()
+    db.enqueue_pending("S2", subject, make_scores(2))
+    read = db.get_pending("S2", subject)
+    open_db().enqueue_pending("S2", subject, make_scores(5))  # another session
+
+    with pytest.raises(ValueError):
+        db.promote_pending("S2", subject, expected_scores=read)
+    reloaded = open_db()
+    assert reloaded.get_pending("S2", subject) == make_scores(5)
+    assert reloaded.history_length("S2", subject) == 0
+
+
+def test_promote_refuses_a_round_that_was_already_promoted(open_db, subject):
+    db = open_db()
+    db.enqueue_pending("S2", subject, make_scores(3))
+    read = db.get_pending("S2", subject)
+    open_db().promote_pending("S2", subject, expected_scores=read)
+
+    with pytest.raises(ValueError):
+        db.promote_pending("S2", subject, expected_scores=read)
+    assert open_db().history_length("S2", subject) == 1
+
+
+def test_json_mode_enqueue_appends_to_the_log(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file)
+    db.update_scores("S3", subject, make_scores(1))
+    with open(json_file, "rb") as f:
+        snapshot = f.read()
+
+    db.enqueue_pending("S2", subject, make_scores(4))
+    with open(json_file, "rb") as f:
+        assert f.read() == snapshot
+    assert os.path.getsize(db.log_file) > 0
+    assert StudentDatabase(csv_file, json_file).get_pending("S2", subject) == make_scores(4)
+
+
+def test_legacy_staging_file_is_imported(open_db, tmp_path, subject):
+    with open(tmp_path / "scores_new.json", "w", encoding="utf-8") as f:
+        json.dump({"S3": {subject: [make_scores(2)]}}, f, ensure_ascii=False)
+    assert open_db().get_pending("S3", subject) == make_scores(2)
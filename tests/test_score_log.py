@@ -0,0 +1,58 @@
+import os
+
+from conftest import make_scores
+from student_db import StudentDatabase
+
+
+def test_log_mode_replays_rounds_on_reload(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file, storage="log")
+    db.update_scores("S2", subject, make_scores(3))
+    db.update_scores("S2", subject, make_scores(4))
+
+    reloaded = StudentDatabase(csv_file, json_file, storage="log")
+    assert reloaded.history_length("S2", subject) == 2
+    assert reloaded.get_latest_scores("S2", subject) == make_scores(4)
+    assert reloaded.get_previous_scores("S2", subject) == make_scores(3)
+
+
+def test_torn_last_line_is_truncated(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file, storage="log")
+    db.update_scores("S2", subject, make_scores(3))
+    intact = os.path.getsize(db.log_file)
+    with open(db.log_file, "ab") as f:
+        f.write(b'{"student_id": "S2", "subject": "')  # crash mid-append
+
+    reloaded = StudentDatabase(csv_file, json_file, storage="log")
+    assert reloaded.history_length("S2", subject) == 1
+    assert os.path.getsize(reloaded.log_file) == intact
+
+    reloaded.update_scores("S2", subject, make_scores(5))
+    again = StudentDatabase(csv_file, json_file, storage="log")
+    assert again.history_length("S2", subject) == 2
+    assert again.get_latest_scores("S2", subject) == make_scores(5)
+
+
+def test_records_from_an_older_generation_are_not_applied_twice(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file, storage="log")
+    db.update_scores("S2", subject, make_scores(3))
+    db.update_scores("S2", subject, make_scores(4))
+    with open(db.log_file, "rb") as f:
+        folded = f.read()
+    db.compact()
+    # A crash after the new snapshot was written but before the log was cleared
+    with open(db.log_file, "wb") as f:
+        f.write(folded)
+
+    reloaded = StudentDatabase(csv_file, json_file, storage="log")
+    assert reloaded.generation == 1
+    assert reloaded.history_length("S2", subject) == 2
+
+
+def test_log_compacts_once_past_the_threshold(csv_file, json_file, subject):
+    db = StudentDatabase(csv_file, json_file, storage="log", compact_log_bytes=1)
+    db.update_scores("S2", subject, make_scores(3))
+    assert db.generation == 1
+    assert os.path.getsize(db.log_file) == 0
+
+    reloaded = StudentDatabase(csv_file, json_file, storage="log")
+    assert reloaded.history_length("S2", subject) == 1